@@ -1,14 +1,8 @@
 # Tools_agent/alerts_tool.py
-# Tools_agent/alerts_tool.py
-
-import os
-from tavily import TavilyClient
-
-# Setup Tavily client
-import streamlit as st
 
-tavily_api_key = st.secrets["tavily"]["TAVILY_API_KEY"]
-client = TavilyClient(api_key=tavily_api_key)
+from Tools_agent.config import get_tavily_client
+from Tools_agent.output_budget import budget_output
+from Tools_agent.tavily_cache import cached_search
 
 def search_medication_alerts(query: str) -> str:
     """Search for medication alerts, recalls, or safety warnings."""
@@ -16,7 +10,7 @@ def search_medication_alerts(query: str) -> str:
     search_query = f"{query} Medikament Warnung Rückruf Sicherheit site:fda.gov OR site:ema.europa.eu OR site:pharmazeutische-zeitung.de"
 
     try:
-        results = client.search(query=search_query, search_depth="advanced", include_answer=True)
+        results = cached_search(get_tavily_client(), "alerts", search_query, search_depth="advanced", include_answer=True)
 
         answer = results.get("answer")
         urls = [r["url"] for r in results.get("results", [])]
@@ -24,7 +18,7 @@ def search_medication_alerts(query: str) -> str:
         if answer:
             response = f"⚠️ **Gefundene Warnungen/Sicherheitsinfos zu '{query}':**\n\n{answer}\n\n🔗 Quellen:\n"
             response += "\n".join(f"- {url}" for url in urls[:5])
-            return response
+            return budget_output("MedicationAlertsTool", response)
         else:
             # If no answer but links exist, still show them
             if urls:
@@ -0,0 +1,136 @@
+# Tools_agent/answer_cache.py
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from Tools_agent.name_resolver import canonical_medication, normalize_text
+from Tools_agent.tracing import record_cache
+
+ANSWER_CACHE_PATH = os.getenv("ANSWER_CACHE_PATH", "data/answer_cache.sqlite")
+ANSWER_CACHE_TTL = int(os.getenv("ANSWER_CACHE_TTL", str(24 * 3600)))
+# Expired rows are deleted on write, at most this often
+ANSWER_CACHE_PURGE_SECONDS = int(os.getenv("ANSWER_CACHE_PURGE_SECONDS", "600"))
+
+def query_key(question_type, input_type, medication_name, mode="agent", fast_path=True):
+    """Cache key of a structured query and the canonical medication it is about.
+
+    The mode and whether the fast path may answer are part of the key, since
+    they produce different answers to the same question.
+    """
+    medication = canonical_medication(medication_name)
+    payload = json.dumps([normalize_text(question_type), normalize_text(input_type), medication, mode, bool(fast_path)])
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest(), medication
+
+# === Final Answer Cache ===
+class AnswerCache:
+    """Final answers and steps of agent runs, keyed on the normalized query (see ``query_key``)."""
+
+    def __init__(self, path=ANSWER_CACHE_PATH, ttl=ANSWER_CACHE_TTL, purge_interval=ANSWER_CACHE_PURGE_SECONDS):
+        self.path = path
+        self.ttl = ttl
+        self.purge_interval = purge_interval
+        self._lock = threading.Lock()
+        self._conn = None
+        self._last_purge = 0.0
+        self._counters = {"hits": 0, "misses": 0, "invalidated": 0, "expired": 0}
+
+    def _db(self):
+        if self._conn is None:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS answer_cache ("
+                "key TEXT PRIMARY KEY, medication TEXT, created_at REAL, answer TEXT, steps TEXT)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS answer_cache_medication ON answer_cache (medication)")
+            conn.execute("CREATE INDEX IF NOT EXISTS answer_cache_created_at ON answer_cache (created_at)")
+            conn.commit()
+            self._conn = conn
+        return self._conn
+
+    def get(self, question_type, input_type, medication_name, mode="agent", fast_path=True):
+        """Return the cached result with ``cached`` and ``cache_age_seconds``, or None."""
+        key, _ = query_key(question_type, input_type, medication_name, mode, fast_path)
+        with self._lock:
+            try:
+                row = self._db().execute(
+                    "SELECT created_at, answer, steps FROM answer_cache WHERE key = ?", (key,)
+                ).fetchone()
+            except sqlite3.Error as e:
+                print(f"❗ Fehler beim Lesen des Antwort-Caches: {e}")
+                row = None
+
+            age = time.time() - row[0] if row is not None else None
+            if row is None or age > self.ttl:
+                self._counters["misses"] += 1
+                record_cache("answers", False)
+                return None
+            self._counters["hits"] += 1
+            record_cache("answers", True)
+
+        return {
+            "final_answer": row[1],
+            "steps": json.loads(row[2]),
+            "cached": True,
+            "cache_age_seconds": round(age, 1),
+        }
+
+    def set(self, question_type, input_type, medication_name, result, mode="agent", fast_path=True):
+        key, medication = query_key(question_type, input_type, medication_name, mode, fast_path)
+        with self._lock:
+            try:
+                self._purge_expired()
+                self._db().execute(
+                    "INSERT OR REPLACE INTO answer_cache (key, medication, created_at, answer, steps) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    (
+                        key,
+                        medication,
+                        time.time(),
+                        result["final_answer"],
+                        json.dumps(result.get("steps", []), ensure_ascii=False, default=str),
+                    ),
+                )
+                self._db().commit()
+            except sqlite3.Error as e:
+                print(f"❗ Fehler beim Schreiben des Antwort-Caches: {e}")
+
+    def _purge_expired(self):
+        """Delete rows past the TTL; runs on write, at most every ``purge_interval`` seconds."""
+        now = time.time()
+        if now - self._last_purge < self.purge_interval:
+            return
+        self._last_purge = now
+        self._counters["expired"] += self._db().execute(
+            "DELETE FROM answer_cache WHERE created_at < ?", (now - self.ttl,)
+        ).rowcount
+
+    def invalidate(self, medication_name):
+        """Drop all cached answers about one medication (aliases included); returns the count."""
+        medication = canonical_medication(medication_name)
+        with self._lock:
+            try:
+                deleted = self._db().execute(
+                    "DELETE FROM answer_cache WHERE medication = ?", (medication,)
+                ).rowcount
+                self._db().commit()
+            except sqlite3.Error as e:
+                print(f"❗ Fehler beim Leeren des Antwort-Caches: {e}")
+                return 0
+            self._counters["invalidated"] += deleted
+        return deleted
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._counters)
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = stats["hits"] / lookups if lookups else 0.0
+        stats["ttl_seconds"] = self.ttl
+        return stats
+
+answer_cache = AnswerCache()
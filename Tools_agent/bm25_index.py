@@ -0,0 +1,282 @@
+# Tools_agent/bm25_index.py
+"""BM25 index over the chunks of the FAISS index, saved next to it as bm25.pkl.
+
+    python -m Tools_agent.bm25_index      # build bm25.pkl for data/faiss_index
+
+Only the posting lists, chunk lengths and ids are saved, no chunk texts:
+search results are docstore ids, whose texts come from the serving text
+store or the docstore. Every ingestion updates the file; an index folder
+without one (written before BM25 was added) gets it from this command or
+from compiling the serving index, never while answering a request.
+"""
+
+import argparse
+import math
+import os
+import pickle
+import re
+import sys
+import threading
+import time
+
+from Tools_agent.faiss_tool import FAISS_FOLDER, FAISS_RELOAD_CHECK_SECONDS, faiss_folder_signature, load_faiss_index
+from Tools_agent.name_resolver import normalize_text
+
+BM25_FILE = "bm25.pkl"
+BM25_K1 = float(os.getenv("BM25_K1", "1.2"))
+BM25_B = float(os.getenv("BM25_B", "0.75"))
+
+# Frequent function words; leaving them out keeps the posting lists that a query walks short
+STOPWORDS = frozenset("""
+    der die das den dem des ein eine einer eines einem einen und oder nicht mit von zu zur zum fur bei im in
+    ist sind wird werden auf aus als an am auch nach vor uber unter wie wenn bis so sich es sie er kann
+    the a an and or of to in on for with is are be by as at from this that it not
+""".split())
+
+_DOSE = re.compile(r"^(\d+)([a-z]+)$")
+
+def tokenize(text):
+    """Normalized word tokens; a dose written together ("400mg") also yields "400" and "mg"."""
+    tokens = []
+    for token in re.findall(r"\w+", normalize_text(text)):
+        if token in STOPWORDS:
+            continue
+        tokens.append(token)
+        dose = _DOSE.match(token)
+        if dose:
+            tokens.extend(dose.groups())
+    return tokens
+
+# === Inverted Index ===
+class BM25Index:
+    """Okapi BM25 over the chunks of the FAISS docstore, keyed by the same docstore ids.
+
+    Chunks are added and removed one by one, so keeping it in sync with the
+    docstore only tokenizes what changed; the distinct terms of each row
+    are kept so a chunk can be removed without its text. For searching, the
+    posting list of each query term is turned into numpy arrays of rows and
+    precomputed weights on first use; any change drops those again.
+    """
+
+    def __init__(self, k1=BM25_K1, b=BM25_B):
+        self.k1 = k1
+        self.b = b
+        self.rows = {}       # docstore id -> row
+        self.ids = []        # row -> docstore id, None once removed
+        self.lengths = []    # row -> number of tokens
+        self.terms = []      # row -> distinct terms, () once removed
+        self.postings = {}   # term -> {row: term frequency}
+        self.total_length = 0
+        self._compiled = {}
+        self._length_array = None
+
+    def __len__(self):
+        return len(self.rows)
+
+    def _changed(self):
+        self._compiled = {}
+        self._length_array = None
+
+    def add(self, doc_id, text):
+        if doc_id in self.rows:
+            self.remove(doc_id)
+        row = len(self.ids)
+        tokens = tokenize(text)
+        counts = {}
+        for token in tokens:
+            # Interned, so every row shares one string per term (also in the pickle)
+            token = sys.intern(token)
+            counts[token] = counts.get(token, 0) + 1
+        for term, tf in counts.items():
+            self.postings.setdefault(term, {})[row] = tf
+        self.rows[doc_id] = row
+        self.ids.append(doc_id)
+        self.lengths.append(len(tokens))
+        self.terms.append(tuple(counts))
+        self.total_length += len(tokens)
+        self._changed()
+
+    def remove(self, doc_id):
+        row = self.rows.pop(doc_id, None)
+        if row is None:
+            return
+        for term in self.terms[row]:
+            posting = self.postings.get(term)
+            if posting is not None:
+                posting.pop(row, None)
+                if not posting:
+                    del self.postings[term]
+        self.ids[row] = None
+        self.terms[row] = ()
+        self.total_length -= self.lengths[row]
+        self.lengths[row] = 0
+        self._changed()
+
+    def sync(self, documents):
+        """Make the index hold exactly ``documents`` (docstore id -> Document); returns (added, removed)."""
+        removed = [doc_id for doc_id in self.rows if doc_id not in documents]
+        for doc_id in removed:
+            self.remove(doc_id)
+        added = [doc_id for doc_id in documents if doc_id not in self.rows]
+        for doc_id in added:
+            self.add(doc_id, documents[doc_id].page_content)
+        # Removed rows stay as holes; rebuild once they outnumber the live ones
+        if len(self.ids) > 2 * len(self.rows) + 1000:
+            self._compact()
+        return len(added), len(removed)
+
+    def _compact(self):
+        """Renumber the live rows so removed ones no longer take space."""
+        live = [row for row, doc_id in enumerate(self.ids) if doc_id is not None]
+        renumbered = {row: new_row for new_row, row in enumerate(live)}
+        self.postings = {term: {renumbered[row]: tf for row, tf in posting.items()}
+                         for term, posting in self.postings.items()}
+        self.ids = [self.ids[row] for row in live]
+        self.lengths = [self.lengths[row] for row in live]
+        self.terms = [self.terms[row] for row in live]
+        self.rows = {doc_id: row for row, doc_id in enumerate(self.ids)}
+        self._changed()
+
+    def _term(self, term):
+        """(rows, weights) of one term: its idf times the length-normalized term frequency."""
+        compiled = self._compiled.get(term)
+        if compiled is None and term in self.postings:
+            import numpy as np
+
+            if self._length_array is None:
+                self._length_array = np.asarray(self.lengths, dtype=np.float32)
+            posting = self.postings[term]
+            rows = np.fromiter(posting.keys(), dtype=np.int64, count=len(posting))
+            tf = np.fromiter(posting.values(), dtype=np.float32, count=len(posting))
+            n = len(self.rows)
+            idf = math.log(1 + (n - len(posting) + 0.5) / (len(posting) + 0.5))
+            average = self.total_length / n if n else 1.0
+            norm = self.k1 * (1 - self.b + self.b * self._length_array[rows] / average)
+            compiled = self._compiled[term] = (rows, (idf * tf * (self.k1 + 1) / (tf + norm)).astype(np.float32))
+        return compiled
+
+    def search(self, query, k=10):
+        """[(docstore id, score)] of the ``k`` best matching chunks, best first."""
+        import numpy as np
+
+        terms = [self._term(term) for term in set(tokenize(query))]
+        terms = [term for term in terms if term is not None]
+        if not terms:
+            return []
+        scores = np.zeros(len(self.ids), dtype=np.float32)
+        for rows, weights in terms:
+            scores[rows] += weights
+        k = min(k, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(self.ids[row], float(scores[row])) for row in top if scores[row] > 0]
+
+    # === Persistence ===
+    def save(self, folder):
+        state = {key: getattr(self, key) for key in ("k1", "b", "rows", "ids", "lengths", "terms", "postings", "total_length")}
+        path = os.path.join(folder, BM25_FILE)
+        with open(f"{path}.tmp-{os.getpid()}", "wb") as f:
+            pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(f"{path}.tmp-{os.getpid()}", path)
+
+    @classmethod
+    def load(cls, folder):
+        """The index saved in ``folder``, or an empty one if there is none (then ``sync`` builds it)."""
+        index = cls()
+        try:
+            with open(os.path.join(folder, BM25_FILE), "rb") as f:
+                state = pickle.load(f)
+        except FileNotFoundError:
+            return index
+        index.__dict__.update(state)
+        return index
+
+def build_index_file(folder=FAISS_FOLDER, vs=None):
+    """Build and save the BM25 index of the FAISS index in ``folder`` unless it has one.
+
+    Runs offline (CLI, serving index compilation); returns the number of
+    chunks indexed, or None if there was nothing to do.
+    """
+    if os.path.exists(os.path.join(folder, BM25_FILE)):
+        return None
+    vs = vs or load_faiss_index(folder)
+    if vs is None:
+        return None
+    start = time.perf_counter()
+    index = BM25Index()
+    index.sync(vs.docstore._dict)
+    index.save(folder)
+    print(f"🔤 BM25 Index aus dem Docstore aufgebaut: {len(index)} Abschnitte in {time.perf_counter() - start:.1f}s")
+    return len(index)
+
+# === Resident Index ===
+class ResidentBM25:
+    """The BM25 index of the FAISS folder, reloaded when the folder or bm25.pkl is replaced.
+
+    It is written into the same folder by faiss_tool.save_faiss_index. An
+    index folder without it is searched by vector only until
+    build_index_file has run; nothing is built here.
+    """
+
+    def __init__(self, folder=FAISS_FOLDER, check_interval=FAISS_RELOAD_CHECK_SECONDS):
+        self.folder = folder
+        self.check_interval = check_interval
+        self._index = None
+        self._signature = None
+        self._last_check = 0.0
+        self._lock = threading.Lock()
+
+    def _folder_signature(self):
+        """FAISS folder signature plus the bm25.pkl (mtime, size), or None while the folder is replaced."""
+        signature = faiss_folder_signature(self.folder)
+        if signature is None:
+            return None
+        try:
+            stat = os.stat(os.path.join(self.folder, BM25_FILE))
+        except OSError:
+            return signature, None
+        return signature, (stat.st_mtime_ns, stat.st_size)
+
+    def get(self):
+        if time.monotonic() - self._last_check < self.check_interval:
+            return self._index
+        with self._lock:
+            if time.monotonic() - self._last_check < self.check_interval:
+                return self._index
+            signature = self._folder_signature()
+            if signature is not None and signature != self._signature:
+                if signature[1] is None:
+                    print(f"⚠️ Kein BM25 Index in {self.folder}, nur Vektorsuche. "
+                          f"Aufbauen mit: python -m Tools_agent.bm25_index")
+                    index = None
+                else:
+                    index = BM25Index.load(self.folder)
+                self._index = index
+                self._signature = signature
+            self._last_check = time.monotonic()
+        return self._index
+
+    def swap(self, index):
+        """Install the index that was just saved with the FAISS index."""
+        with self._lock:
+            self._index = index
+            self._signature = self._folder_signature()
+            self._last_check = time.monotonic()
+
+    def stats(self):
+        index = self._index
+        if index is None:
+            return {"loaded": False}
+        return {"loaded": True, "chunks": len(index), "terms": len(index.postings)}
+
+lexical_index = ResidentBM25()
+
+def main():
+    parser = argparse.ArgumentParser(description="BM25 Index für einen FAISS Index aufbauen, falls er fehlt.")
+    parser.add_argument("--folder", default=FAISS_FOLDER, help="Ordner des FAISS Index")
+    args = parser.parse_args()
+    if build_index_file(args.folder) is None:
+        print(f"ℹ️ Nichts zu tun: {args.folder} hat bereits einen BM25 Index oder keinen FAISS Index.")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,213 @@
+# Tools_agent/bulk_ingest.py
+"""Bulk ingestion of a directory of PDFs into the FAISS index.
+
+    python -m Tools_agent.bulk_ingest data/pdfs --workers 4 --batch-size 512
+
+Re-ingesting a folder updates changed PDFs in place: chunks of a file that
+are no longer part of its new text are removed, as with an upload.
+"""
+
+import argparse
+import os
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+# Pages a worker extracts per task, so large PDFs come back in pieces
+PAGE_BATCH = int(os.getenv("BULK_INGEST_PAGE_BATCH", "32"))
+
+def extract_pages(path, start, count):
+    """Runs in a worker process: ``(page count, [(page_number, text)])`` for up to ``count`` pages from ``start``."""
+    import fitz
+    with fitz.open(path) as doc:
+        stop = min(start + count, doc.page_count)
+        return doc.page_count, [(number + 1, doc[number].get_text()) for number in range(start, stop)]
+
+def find_pdfs(folder):
+    paths = []
+    for root, _, files in os.walk(folder):
+        paths.extend(os.path.join(root, name) for name in files if name.lower().endswith(".pdf"))
+    return sorted(paths)
+
+def iter_pdf_pages(paths, workers, page_batch=PAGE_BATCH):
+    """Yield ``(path, pages, complete)`` per batch of up to ``page_batch`` pages, as batches finish.
+
+    ``complete`` is None until the last batch of a file, then True if all of
+    its pages were read. The first batch of a file reports its page count,
+    the remaining batches are queued before new files are started; at most
+    ``2 * workers`` batches are in flight.
+    """
+    paths = iter(paths)
+    follow_ups = deque()
+    remaining, failed = {}, set()
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = {}
+
+        def submit_next():
+            if follow_ups:
+                path, start = follow_ups.popleft()
+            else:
+                path, start = next(paths, None), 0
+                if path is None:
+                    return
+            pending[pool.submit(extract_pages, path, start, page_batch)] = (path, start)
+
+        for _ in range(2 * workers):
+            submit_next()
+
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                path, start = pending.pop(future)
+                try:
+                    page_count, pages = future.result()
+                except Exception as e:
+                    print(f"❗ Fehler beim Lesen von {path} (ab Seite {start + 1}): {e}")
+                    page_count, pages = None, []
+                    failed.add(path)
+                if start == 0:
+                    starts = range(page_batch, page_count or 0, page_batch)
+                    follow_ups.extend((path, batch_start) for batch_start in starts)
+                    remaining[path] = len(starts) + 1
+                remaining[path] -= 1
+                submit_next()
+
+                complete = None
+                if not remaining[path]:
+                    del remaining[path]
+                    complete = path not in failed
+                    failed.discard(path)
+                yield path, pages, complete
+
+def ingest_directory(folder, workers=None, batch_size=512, checkpoint_chunks=50000):
+    """Extract, split, embed and add all PDFs below ``folder`` to the FAISS index.
+
+    Chunks are embedded in batches of ``batch_size`` and the index is saved
+    every ``checkpoint_chunks`` new chunks. Chunks already in the index are
+    skipped, so an interrupted run can simply be restarted. Once all pages
+    of a file are read, its chunks that the new text no longer contains are
+    removed (not for files that could only be read in part).
+    """
+    from Tools_agent import bm25_index, faiss_tool
+    from Tools_agent.embedding_backend import check_index_embeddings
+    from Tools_agent.faiss_index import compile_if_enabled
+
+    workers = workers or os.cpu_count() or 1
+    paths = find_pdfs(folder)
+    stats = {"files": 0, "pages": 0, "chunks": 0, "skipped": 0, "removed": 0}
+    start = time.perf_counter()
+
+    with faiss_tool.IndexWriteLock():
+        check_index_embeddings(faiss_tool.FAISS_FOLDER, faiss_tool.get_embedding_model())
+        current = faiss_tool.faiss_store.get(force_check=True)
+        vs = faiss_tool.copy_vectorstore(current) if current is not None else None
+        # Kept across checkpoints, so each save only tokenizes the chunks added since the last one
+        bm25 = bm25_index.BM25Index.load(faiss_tool.FAISS_FOLDER)
+        known_ids = set(vs.docstore._dict) if vs is not None else set()
+        # Chunk ids per document before this run, and those its new text still has
+        previous_ids = {}
+        for docstore_id, document in (vs.docstore._dict.items() if vs is not None else ()):
+            previous_ids.setdefault(document.metadata.get("doc_id"), set()).add(docstore_id)
+        current_ids = {}
+        stale_ids = []
+        batch = []
+        unsaved = 0
+
+        def remove_stale():
+            if stale_ids:
+                vs.delete(stale_ids)
+                known_ids.difference_update(stale_ids)
+                stats["removed"] += len(stale_ids)
+                stale_ids.clear()
+
+        def flush():
+            nonlocal vs
+            ids = [docstore_id for docstore_id, _ in batch]
+            texts = [document.page_content for _, document in batch]
+            metadatas = [document.metadata for _, document in batch]
+            embedding_model = faiss_tool.get_embedding_model()
+            vectors = embedding_model.embed_documents(texts)
+            if vs is None:
+                from langchain_community.vectorstores import FAISS
+                vs = FAISS.from_embeddings(
+                    list(zip(texts, vectors)), embedding_model, metadatas=metadatas, ids=ids
+                )
+            else:
+                vs.add_embeddings(list(zip(texts, vectors)), metadatas=metadatas, ids=ids)
+            stats["chunks"] += len(batch)
+            batch.clear()
+
+        for path, pages, complete in iter_pdf_pages(paths, workers):
+            doc_id = faiss_tool.document_id(path, folder)
+            source = os.path.basename(path)
+            seen = current_ids.setdefault(doc_id, set())
+            for page_number, text in pages:
+                stats["pages"] += 1
+                for document in faiss_tool.page_documents(text, doc_id, source, page_number):
+                    docstore_id = faiss_tool.chunk_id(doc_id, document.metadata["content_hash"])
+                    seen.add(docstore_id)
+                    if docstore_id in known_ids:
+                        stats["skipped"] += 1
+                        continue
+                    known_ids.add(docstore_id)
+                    batch.append((docstore_id, document))
+                    if len(batch) >= batch_size:
+                        unsaved += len(batch)
+                        flush()
+                    if unsaved >= checkpoint_chunks:
+                        remove_stale()
+                        faiss_tool.save_faiss_index(vs, bm25=bm25)
+                        unsaved = 0
+            if complete is None:
+                continue
+            seen = current_ids.pop(doc_id)
+            if complete:
+                stale_ids.extend(previous_ids.pop(doc_id, set()) - seen)
+            stats["files"] += 1
+            if stats["files"] % 100 == 0:
+                _print_progress(stats, time.perf_counter() - start, len(paths))
+
+        if batch:
+            flush()
+        remove_stale()
+        if stats["chunks"] or stats["removed"]:
+            faiss_tool.save_faiss_index(vs, bm25=bm25)
+            faiss_tool.faiss_store.swap(vs)
+            bm25_index.lexical_index.swap(bm25)
+            compile_if_enabled(vs)
+
+    elapsed = time.perf_counter() - start
+    stats["seconds"] = round(elapsed, 2)
+    stats["pages_per_second"] = round(stats["pages"] / elapsed, 1) if elapsed else 0.0
+    stats["chunks_per_second"] = round(stats["chunks"] / elapsed, 1) if elapsed else 0.0
+    try:
+        import resource
+        stats["max_rss_mb"] = round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+    except ImportError:  # Windows
+        stats["max_rss_mb"] = None
+    return stats
+
+def _print_progress(stats, elapsed, total_files):
+    print(
+        f"📄 {stats['files']}/{total_files} PDFs, {stats['pages']} Seiten, {stats['chunks']} Abschnitte "
+        f"({stats['pages'] / elapsed:.1f} Seiten/s, {stats['chunks'] / elapsed:.1f} Abschnitte/s)"
+    )
+
+def main():
+    parser = argparse.ArgumentParser(description="PDFs aus einem Ordner in den FAISS Index laden.")
+    parser.add_argument("folder", help="Ordner mit PDF-Dateien (wird rekursiv durchsucht)")
+    parser.add_argument("--workers", type=int, default=None, help="Anzahl Prozesse für die Textextraktion")
+    parser.add_argument("--batch-size", type=int, default=512, help="Abschnitte pro Embedding-Anfrage")
+    parser.add_argument("--checkpoint-chunks", type=int, default=50000, help="Index nach so vielen neuen Abschnitten speichern")
+    args = parser.parse_args()
+
+    stats = ingest_directory(args.folder, args.workers, args.batch_size, args.checkpoint_chunks)
+    print(
+        f"✅ {stats['files']} PDFs, {stats['pages']} Seiten, {stats['chunks']} neue Abschnitte "
+        f"({stats['skipped']} übersprungen, {stats['removed']} entfernt) in {stats['seconds']}s: "
+        f"{stats['pages_per_second']} Seiten/s, {stats['chunks_per_second']} Abschnitte/s, "
+        f"max. RSS {stats['max_rss_mb']} MB"
+    )
+
+if __name__ == "__main__":
+    main()
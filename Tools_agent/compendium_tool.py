@@ -1,16 +1,13 @@
 # Tools_agent/compendium_tool.py
 
-from tavily import TavilyClient
-import os
-import streamlit as st
-
-api_key_tavily = st.secrets["tavily"]["TAVILY_API_KEY"]
-client = TavilyClient(api_key=api_key_tavily)
+from Tools_agent.config import get_tavily_client
+from Tools_agent.output_budget import budget_output
+from Tools_agent.tavily_cache import cached_search
 
 def get_compendium_info(medication: str) -> str:
     """Search medication info via Compendium.ch"""
     query = f"site:compendium.ch {medication}"
-    results = client.search(query=query, search_depth="advanced", include_answer=True)
+    results = cached_search(get_tavily_client(), "compendium", query, search_depth="advanced", include_answer=True)
     
     answer = results.get("answer")
     urls = [r["url"] for r in results.get("results", [])]
@@ -21,4 +18,4 @@ def get_compendium_info(medication: str) -> str:
             "\n".join(f"- {url}" for url in urls[:3])
         )
     
-    return f"**Info:** {answer}\n\n🔗 Links:\n" + "\n".join(f"- {url}" for url in urls[:3])
+    return budget_output("CompendiumTool", f"**Info:** {answer}\n\n🔗 Links:\n" + "\n".join(f"- {url}" for url in urls[:3]))
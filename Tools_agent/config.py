@@ -0,0 +1,57 @@
+# Tools_agent/config.py
+
+import os
+import threading
+
+# Environment variable checked first for each (section, key) of .streamlit/secrets.toml
+SECRET_ENV_NAMES = {
+    ("openai", "OPENAI_KEY"): "OPENAI_KEY",
+    ("tavily", "TAVILY_API_KEY"): "TAVILY_API_KEY",
+    ("openfda", "OPENFDA_API_KEY"): "OPENFDA_API_KEY",
+}
+
+class MissingSecretError(RuntimeError):
+    pass
+
+def _streamlit_secret(section, key):
+    # Only imported when the environment does not provide the value
+    try:
+        import streamlit as st
+        return st.secrets[section][key]
+    except Exception:
+        return None
+
+def get_secret(section, key, required=True):
+    """Read a secret from the environment, falling back to Streamlit's secrets.toml."""
+    env_name = SECRET_ENV_NAMES.get((section, key), key)
+    value = os.getenv(env_name) or _streamlit_secret(section, key)
+    if not value and required:
+        raise MissingSecretError(
+            f"Secret fehlt: Umgebungsvariable {env_name} oder [{section}] {key} in .streamlit/secrets.toml setzen."
+        )
+    return value or None
+
+# === Shared Clients ===
+_clients = {}
+_clients_lock = threading.Lock()
+
+def shared_client(name, factory):
+    """Return the process-wide client ``name``, building it with ``factory()`` on first use."""
+    client = _clients.get(name)
+    if client is None:
+        with _clients_lock:
+            client = _clients.get(name)
+            if client is None:
+                client = _clients[name] = factory()
+    return client
+
+def override_client(name, client):
+    """Replace a shared client, e.g. with a stand-in for benchmarks."""
+    with _clients_lock:
+        _clients[name] = client
+
+def get_tavily_client():
+    def build():
+        from tavily import TavilyClient
+        return TavilyClient(api_key=get_secret("tavily", "TAVILY_API_KEY"))
+    return shared_client("tavily", build)
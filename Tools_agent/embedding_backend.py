@@ -0,0 +1,103 @@
+# Tools_agent/embedding_backend.py
+
+import json
+import os
+
+from langchain_core.embeddings import Embeddings
+
+from Tools_agent.config import get_secret
+
+# "openai" (API, the default) or "local" (sentence-transformers on the CPU, works offline)
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "openai")
+OPENAI_EMBEDDING_MODEL = os.getenv("OPENAI_EMBEDDING_MODEL", "text-embedding-ada-002")
+# Multilingual, so German chunks and questions land close together; a local path works too.
+# With HF_HUB_OFFLINE=1 an already downloaded model loads without network access.
+LOCAL_EMBEDDING_MODEL = os.getenv("LOCAL_EMBEDDING_MODEL", "sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2")
+# Torch CPU threads (0: torch default); the setting applies to the whole process
+EMBEDDING_THREADS = int(os.getenv("EMBEDDING_THREADS", "0"))
+EMBEDDING_BATCH_SIZE = int(os.getenv("EMBEDDING_BATCH_SIZE", "64"))
+# "1": dynamic int8 quantization of the linear layers, faster on the CPU at slightly different vectors
+EMBEDDING_INT8 = os.getenv("EMBEDDING_INT8", "0") == "1"
+
+EMBEDDING_META_FILE = "embedding.json"
+
+# === Local Backend ===
+class LocalEmbeddings(Embeddings):
+    """sentence-transformers model run in-process on the CPU; texts are encoded in batches."""
+
+    def __init__(self, model_name=LOCAL_EMBEDDING_MODEL, threads=EMBEDDING_THREADS, batch_size=EMBEDDING_BATCH_SIZE,
+                 int8=EMBEDDING_INT8):
+        import torch
+        from sentence_transformers import SentenceTransformer
+
+        if threads:
+            torch.set_num_threads(threads)
+        self.model_name = model_name
+        self.batch_size = batch_size
+        self.int8 = int8
+        self._model = SentenceTransformer(model_name, device="cpu")
+        if int8:
+            quantization = getattr(torch, "ao", torch).quantization
+            self._model = quantization.quantize_dynamic(self._model, {torch.nn.Linear}, dtype=torch.qint8)
+        self._model.eval()
+        # Also the namespace of the embedding cache, so int8 and float vectors are kept apart
+        self.model = f"{os.path.basename(model_name.rstrip('/'))}{'-int8' if int8 else ''}"
+
+    def _encode(self, texts):
+        return self._model.encode(texts, batch_size=self.batch_size, normalize_embeddings=True,
+                                  convert_to_numpy=True, show_progress_bar=False)
+
+    def embed_documents(self, texts):
+        return self._encode(list(texts)).tolist() if texts else []
+
+    def embed_query(self, text):
+        return self._encode([text])[0].tolist()
+
+    def identity(self):
+        return {"backend": "local", "model": self.model_name, "int8": self.int8}
+
+def build_embeddings(backend=EMBEDDING_BACKEND):
+    """The uncached embeddings of the configured backend."""
+    if backend == "local":
+        return LocalEmbeddings()
+    if backend == "openai":
+        from langchain_openai import OpenAIEmbeddings
+        return OpenAIEmbeddings(model=OPENAI_EMBEDDING_MODEL, openai_api_key=get_secret("openai", "OPENAI_KEY"))
+    raise ValueError(f"Unbekanntes Embedding-Backend '{backend}', erwartet: openai, local")
+
+# === Index Metadata ===
+class EmbeddingMismatchError(RuntimeError):
+    pass
+
+def embedding_identity(embeddings):
+    """What produced the vectors: backend, model and quantization, without the cache wrapper."""
+    embeddings = getattr(embeddings, "underlying", embeddings)
+    if hasattr(embeddings, "identity"):
+        return embeddings.identity()
+    backend = "openai" if type(embeddings).__name__ == "OpenAIEmbeddings" else type(embeddings).__name__
+    return {"backend": backend, "model": getattr(embeddings, "model", None)}
+
+def write_embedding_meta(folder, embeddings, dimension):
+    with open(os.path.join(folder, EMBEDDING_META_FILE), "w", encoding="utf-8") as f:
+        json.dump({**embedding_identity(embeddings), "dimension": dimension}, f)
+
+def read_embedding_meta(folder):
+    """The recorded identity of an index folder, or None (no index, or written before it was recorded)."""
+    try:
+        with open(os.path.join(folder, EMBEDDING_META_FILE), encoding="utf-8") as f:
+            meta = json.load(f)
+    except (OSError, ValueError):
+        return None
+    meta.pop("dimension", None)
+    return meta
+
+def check_index_embeddings(folder, embeddings):
+    """Raise EmbeddingMismatchError if the index in ``folder`` was built with other embeddings."""
+    recorded = read_embedding_meta(folder)
+    current = embedding_identity(embeddings)
+    if recorded is not None and recorded != current:
+        raise EmbeddingMismatchError(
+            f"FAISS Index in {folder} wurde mit {recorded} erstellt, konfiguriert ist {current}. "
+            "Ordner entfernen und mit python -m Tools_agent.bulk_ingest neu aufbauen "
+            "oder EMBEDDING_BACKEND anpassen."
+        )
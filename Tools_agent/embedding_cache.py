@@ -0,0 +1,188 @@
+# Tools_agent/embedding_cache.py
+
+import hashlib
+import json
+import os
+import re
+import threading
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+from Tools_agent.tracing import record_cache
+
+try:
+    import fcntl
+except ImportError:  # Windows: no cross-process locking, single writer assumed
+    fcntl = None
+
+EMBEDDING_CACHE_FOLDER = os.getenv("EMBEDDING_CACHE_FOLDER", "data/embedding_cache")
+
+def content_key(text, kind="document"):
+    """Stable key for a text; query and document embeddings are kept apart."""
+    return hashlib.sha256(f"{kind}\0{text}".encode("utf-8")).hexdigest()
+
+# === On-disk Vector Store ===
+class EmbeddingCache:
+    """Append-only float32 matrix on disk, read through a memory map, plus a key file.
+
+    ``vectors.f32`` holds one row per cached text and ``keys.txt`` the key of
+    each row. Vectors are written before their keys, so a key on disk always
+    points at a complete row, also when several processes write at once.
+    """
+
+    def __init__(self, folder):
+        self.folder = folder
+        self._vectors_path = os.path.join(folder, "vectors.f32")
+        self._keys_path = os.path.join(folder, "keys.txt")
+        self._meta_path = os.path.join(folder, "meta.json")
+        self._lock = threading.Lock()
+        self._rows = {}
+        self._keys_offset = 0
+        self._dim = None
+        self._mmap = None
+        os.makedirs(folder, exist_ok=True)
+        with self._lock:
+            self._read_meta()
+            self._sync_keys()
+
+    def _read_meta(self):
+        if self._dim is None and os.path.exists(self._meta_path):
+            with open(self._meta_path, "r", encoding="utf-8") as f:
+                self._dim = json.load(f)["dim"]
+
+    def _sync_keys(self):
+        """Pick up rows appended since the last read, also by other processes."""
+        if not os.path.exists(self._keys_path):
+            return
+        with open(self._keys_path, "r", encoding="ascii") as f:
+            f.seek(self._keys_offset)
+            chunk = f.read()
+        # Ignore a trailing key that is still being written
+        complete = chunk[:chunk.rfind("\n") + 1]
+        for key in complete.splitlines():
+            self._rows.setdefault(key, len(self._rows))
+        self._keys_offset += len(complete)
+
+    def _matrix(self):
+        rows = len(self._rows)
+        if self._mmap is None or self._mmap.shape[0] < rows:
+            self._mmap = np.memmap(self._vectors_path, dtype=np.float32, mode="r", shape=(rows, self._dim))
+        return self._mmap
+
+    def __len__(self):
+        return len(self._rows)
+
+    def get_many(self, keys):
+        """Return ``{key: vector}`` for all keys that are cached."""
+        with self._lock:
+            if any(key not in self._rows for key in keys):
+                self._sync_keys()
+            hits = {key: self._rows[key] for key in keys if key in self._rows}
+            if not hits:
+                return {}
+            # Opened while the cache was empty: another process has written the dimension since
+            self._read_meta()
+            matrix = self._matrix()
+            return {key: np.array(matrix[row]) for key, row in hits.items()}
+
+    def put_many(self, items):
+        """Append ``(key, vector)`` pairs that are not cached yet."""
+        if not items:
+            return
+        with self._lock:
+            with open(os.path.join(self.folder, ".lock"), "w") as lock_file:
+                if fcntl is not None:
+                    fcntl.flock(lock_file, fcntl.LOCK_EX)
+                self._read_meta()
+                self._sync_keys()
+
+                new_items = {}
+                for key, vector in items:
+                    if key not in self._rows:
+                        new_items[key] = vector
+                if not new_items:
+                    return
+
+                matrix = np.asarray(list(new_items.values()), dtype=np.float32)
+                if self._dim is None:
+                    self._dim = matrix.shape[1]
+                    with open(self._meta_path, "w", encoding="utf-8") as f:
+                        json.dump({"dim": self._dim}, f)
+
+                # Truncate to the last complete row in case a writer died half-way
+                expected_bytes = len(self._rows) * self._dim * 4
+                with open(self._vectors_path, "ab") as f:
+                    f.truncate(expected_bytes)
+                    f.write(matrix.tobytes())
+                    f.flush()
+                    os.fsync(f.fileno())
+                with open(self._keys_path, "a", encoding="ascii") as f:
+                    f.write("".join(f"{key}\n" for key in new_items))
+                self._sync_keys()
+
+# === LangChain Embeddings Wrapper ===
+class CachedEmbeddings(Embeddings):
+    """Wrap an embeddings model so each distinct text is embedded only once.
+
+    Only the texts missing from the cache are sent to the underlying model,
+    in a single batch per call.
+    """
+
+    def __init__(self, underlying, namespace=None, folder=EMBEDDING_CACHE_FOLDER):
+        self.underlying = underlying
+        namespace = namespace or getattr(underlying, "model", None) or type(underlying).__name__
+        self.namespace = re.sub(r"[^A-Za-z0-9_.-]", "_", namespace)
+        self.cache = EmbeddingCache(os.path.join(folder, self.namespace))
+        self._stats_lock = threading.Lock()
+        self._counters = {"hits": 0, "misses": 0, "embedding_calls": 0, "calls_saved": 0}
+
+    def _count(self, hits, misses, called):
+        with self._stats_lock:
+            self._counters["hits"] += hits
+            self._counters["misses"] += misses
+            if called:
+                self._counters["embedding_calls"] += 1
+            else:
+                self._counters["calls_saved"] += 1
+
+    def embed_documents(self, texts):
+        keys = [content_key(text) for text in texts]
+        cached = self.cache.get_many(keys)
+
+        missing = {}
+        for key, text in zip(keys, texts):
+            if key not in cached:
+                missing.setdefault(key, text)
+
+        if missing:
+            vectors = self.underlying.embed_documents(list(missing.values()))
+            fresh = list(zip(missing.keys(), vectors))
+            self.cache.put_many(fresh)
+            cached.update((key, np.asarray(vector, dtype=np.float32)) for key, vector in fresh)
+
+        self._count(len(texts) - len(missing), len(missing), bool(missing))
+        record_cache("embeddings", not missing)
+        return [cached[key].tolist() for key in keys]
+
+    def embed_query(self, text):
+        key = content_key(text, kind="query")
+        cached = self.cache.get_many([key])
+        record_cache("embeddings", key in cached)
+        if key in cached:
+            self._count(1, 0, False)
+            return cached[key].tolist()
+
+        vector = self.underlying.embed_query(text)
+        self.cache.put_many([(key, vector)])
+        self._count(0, 1, True)
+        return vector
+
+    def stats(self):
+        with self._stats_lock:
+            stats = dict(self._counters)
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = stats["hits"] / lookups if lookups else 0.0
+        stats["cached_vectors"] = len(self.cache)
+        stats["namespace"] = self.namespace
+        return stats
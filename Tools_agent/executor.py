@@ -0,0 +1,31 @@
+# Tools_agent/executor.py
+
+import asyncio
+import contextvars
+import functools
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+TOOL_EXECUTOR_WORKERS = int(os.getenv("TOOL_EXECUTOR_WORKERS", "16"))
+FANOUT_EXECUTOR_WORKERS = int(os.getenv("FANOUT_EXECUTOR_WORKERS", "32"))
+
+# Shared, bounded pool for blocking tool calls (Tavily, requests, FAISS, SQLite)
+tool_executor = ThreadPoolExecutor(max_workers=TOOL_EXECUTOR_WORKERS, thread_name_prefix="tool")
+
+# Separate pool for fan-out sources: a source that times out keeps running in
+# its thread, and must not take threads away from the agent's tool calls
+fanout_executor = ThreadPoolExecutor(max_workers=FANOUT_EXECUTOR_WORKERS, thread_name_prefix="fanout")
+
+async def run_blocking(func, *args, executor=None, **kwargs):
+    """Run a blocking call on the tool pool (or ``executor``) without blocking the event loop."""
+    loop = asyncio.get_running_loop()
+    ctx = contextvars.copy_context()
+    call = functools.partial(ctx.run, func, *args, **kwargs)
+    return await loop.run_in_executor(executor or tool_executor, call)
+
+def to_async(func):
+    """Async variant of a blocking tool function, for ``Tool(coroutine=...)``."""
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        return await run_blocking(func, *args, **kwargs)
+    return wrapper
@@ -0,0 +1,351 @@
+# Tools_agent/faiss_index.py
+"""Compiled FAISS serving index (IVF-Flat, IVF-PQ or HNSW), opened memory-mapped.
+
+    python -m Tools_agent.faiss_index --type ivfpq       # data/faiss_index -> data/faiss_serving
+    python -m Tools_agent.faiss_index --type hnsw --hnsw-m 32
+
+The LangChain flat index in data/faiss_index stays the source of truth for
+ingestion (chunks are added and removed by id). From it, a read-only
+serving copy is compiled:
+
+- index.faiss, opened with IO_FLAG_MMAP | IO_FLAG_READ_ONLY, so all worker
+  processes share its pages through the page cache
+- texts.bin + offsets.npy: chunk texts and metadata as JSON records,
+  addressed by row instead of a pickled docstore; ids.npy + id_rows.npy
+  find the row of a docstore id (for BM25 hits)
+- meta.json: index type, search parameters and the signature of the
+  source index it was compiled from; a stale copy is not used
+
+With FAISS_INDEX_TYPE set to ivfflat, ivfpq or hnsw, every ingestion
+recompiles it; "flat" (the default) keeps searching the LangChain index.
+Compiling also builds the BM25 index of the source folder if it has none.
+"""
+
+import argparse
+import json
+import os
+import shutil
+import threading
+import time
+
+FAISS_SERVING_FOLDER = os.getenv("FAISS_SERVING_FOLDER", "data/faiss_serving")
+FAISS_INDEX_TYPE = os.getenv("FAISS_INDEX_TYPE", "flat")
+INDEX_TYPES = ("flat", "ivfflat", "ivfpq", "hnsw")
+
+# IVF: number of lists (0: about 4 * sqrt(N)) and lists visited per query
+FAISS_NLIST = int(os.getenv("FAISS_NLIST", "0"))
+FAISS_NPROBE = int(os.getenv("FAISS_NPROBE", "16"))
+# PQ: sub-quantizers (0: one per 16 dimensions; more raise recall, size and build time) and bits per code
+FAISS_PQ_M = int(os.getenv("FAISS_PQ_M", "0"))
+FAISS_PQ_BITS = int(os.getenv("FAISS_PQ_BITS", "8"))
+# HNSW: graph degree and beam widths while building / searching
+FAISS_HNSW_M = int(os.getenv("FAISS_HNSW_M", "32"))
+FAISS_EF_CONSTRUCTION = int(os.getenv("FAISS_EF_CONSTRUCTION", "200"))
+FAISS_EF_SEARCH = int(os.getenv("FAISS_EF_SEARCH", "64"))
+# Vectors used to train IVF centroids and PQ codebooks
+FAISS_TRAIN_SAMPLE = int(os.getenv("FAISS_TRAIN_SAMPLE", "100000"))
+
+ADD_BATCH = 65536
+SERVING_FILES = ("index.faiss", "texts.bin", "offsets.npy", "ids.npy", "id_rows.npy", "meta.json")
+
+# === Index Construction ===
+def factory_string(kind, n, d, nlist=FAISS_NLIST, pq_m=FAISS_PQ_M, pq_bits=FAISS_PQ_BITS, hnsw_m=FAISS_HNSW_M):
+    """faiss.index_factory description of an index type for ``n`` vectors of dimension ``d``."""
+    if kind == "flat":
+        return "Flat"
+    if kind == "hnsw":
+        return f"HNSW{hnsw_m},Flat"
+    # At least ~39 training points per list, otherwise k-means warns and the lists degrade
+    nlist = nlist or int(4 * n ** 0.5)
+    nlist = max(1, min(nlist, n // 39))
+    if kind == "ivfflat":
+        return f"IVF{nlist},Flat"
+    if kind == "ivfpq":
+        pq_m = pq_m or max(1, d // 16)
+        while d % pq_m:
+            pq_m -= 1
+        return f"IVF{nlist},PQ{pq_m}x{pq_bits}"
+    raise ValueError(f"Unbekannter Indextyp '{kind}', erwartet: {', '.join(INDEX_TYPES)}")
+
+def build_index(vectors, kind, train_sample=FAISS_TRAIN_SAMPLE, seed=0, **params):
+    """Build an index over ``vectors`` (an array, or a callable ``(start, count) -> array`` plus ``params['n']``)."""
+    import faiss
+    import numpy as np
+
+    if callable(vectors):
+        read, n = vectors, params.pop("n")
+    else:
+        array = np.ascontiguousarray(vectors, dtype=np.float32)
+        read, n = (lambda start, count: array[start:start + count]), len(array)
+    d = read(0, 1).shape[1]
+
+    if kind == "ivfpq" and n < 2 ** params.get("pq_bits", FAISS_PQ_BITS) * 39:
+        print(f"⚠️ Zu wenige Vektoren ({n}) für IVF-PQ, verwende IVF-Flat.")
+        kind = "ivfflat"
+    ef_construction = params.pop("ef_construction", FAISS_EF_CONSTRUCTION)
+    index = faiss.index_factory(d, factory_string(kind, n, d, **params), faiss.METRIC_L2)
+    if kind == "hnsw":
+        index.hnsw.efConstruction = ef_construction
+
+    if not index.is_trained:
+        rng = np.random.default_rng(seed)
+        rows = np.sort(rng.choice(n, size=min(n, train_sample), replace=False))
+        index.train(np.vstack([read(int(row), 1) for row in rows]) if callable(vectors) else read(0, n)[rows])
+
+    for start in range(0, n, ADD_BATCH):
+        index.add(np.ascontiguousarray(read(start, min(ADD_BATCH, n - start)), dtype=np.float32))
+    return index, kind
+
+def apply_search_params(index, kind, nprobe=FAISS_NPROBE, ef_search=FAISS_EF_SEARCH):
+    import faiss
+
+    if kind in ("ivfflat", "ivfpq"):
+        faiss.extract_index_ivf(index).nprobe = nprobe
+    elif kind == "hnsw":
+        index.hnsw.efSearch = ef_search
+
+# === Offset-Addressed Text Store ===
+class TextStore:
+    """Chunk records (text and metadata) as JSON lines in one file, found through an offset array.
+
+    All files are memory-mapped, so opening the store costs nothing and
+    only the records that are read are paged in. The sorted record ids
+    with their rows find a record by id through a binary search.
+    """
+
+    def __init__(self, folder):
+        import mmap
+        import numpy as np
+
+        self.offsets = np.load(os.path.join(folder, "offsets.npy"), mmap_mode="r")
+        self._file = open(os.path.join(folder, "texts.bin"), "rb")
+        size = os.fstat(self._file.fileno()).st_size
+        self._data = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if size else b""
+        try:
+            self._ids = np.load(os.path.join(folder, "ids.npy"), mmap_mode="r")
+            self._id_rows = np.load(os.path.join(folder, "id_rows.npy"), mmap_mode="r")
+        except FileNotFoundError:
+            # Compiled before records could be found by id: recompile for hybrid search
+            self._ids = self._id_rows = None
+
+    @staticmethod
+    def write(folder, records):
+        """Write ``records`` (dicts with an ``id``, in index row order); returns the number written."""
+        import numpy as np
+
+        offsets, ids = [0], []
+        with open(os.path.join(folder, "texts.bin"), "wb") as f:
+            for record in records:
+                data = json.dumps(record, ensure_ascii=False).encode("utf-8")
+                f.write(data)
+                offsets.append(offsets[-1] + len(data))
+                ids.append(str(record["id"]))
+        np.save(os.path.join(folder, "offsets.npy"), np.asarray(offsets, dtype=np.uint64))
+        ids = np.asarray(ids, dtype=str)
+        order = np.argsort(ids, kind="stable")
+        np.save(os.path.join(folder, "ids.npy"), ids[order])
+        np.save(os.path.join(folder, "id_rows.npy"), order.astype(np.int64))
+        return len(offsets) - 1
+
+    def get(self, row):
+        start, end = int(self.offsets[row]), int(self.offsets[row + 1])
+        return json.loads(bytes(self._data[start:end]).decode("utf-8"))
+
+    def find(self, record_id):
+        """The record with id ``record_id``, or None."""
+        import numpy as np
+
+        if self._ids is None or not len(self._ids):
+            return None
+        i = int(np.searchsorted(self._ids, str(record_id)))
+        if i < len(self._ids) and self._ids[i] == str(record_id):
+            return self.get(int(self._id_rows[i]))
+        return None
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def close(self):
+        if self._data:
+            self._data.close()
+        self._file.close()
+
+# === Compiler ===
+def _source_records(vs):
+    for row in range(vs.index.ntotal):
+        docstore_id = vs.index_to_docstore_id[row]
+        document = vs.docstore.search(docstore_id)
+        yield {"id": docstore_id, "text": document.page_content, "metadata": document.metadata}
+
+def compile_serving_index(vs=None, kind=FAISS_INDEX_TYPE, source_folder=None, output_folder=FAISS_SERVING_FOLDER,
+                          **params):
+    """Compile the LangChain index ``vs`` (default: the one saved in ``source_folder``) into a serving index."""
+    import faiss
+    from Tools_agent.bm25_index import build_index_file
+    from Tools_agent.embedding_backend import embedding_identity
+    from Tools_agent.faiss_tool import FAISS_FOLDER, faiss_folder_signature, load_faiss_index
+
+    source_folder = source_folder or FAISS_FOLDER
+    start = time.perf_counter()
+    signature = faiss_folder_signature(source_folder)
+    vs = vs or load_faiss_index(source_folder)
+    if vs is None or vs.index.ntotal == 0:
+        print("⚠️ Kein FAISS Index zum Kompilieren vorhanden.")
+        return None
+    build_index_file(source_folder, vs)
+
+    search_params = {"nprobe": params.pop("nprobe", FAISS_NPROBE), "ef_search": params.pop("ef_search", FAISS_EF_SEARCH)}
+    index, kind = build_index(vs.index.reconstruct_n, kind, n=vs.index.ntotal, **params)
+
+    parent = os.path.dirname(os.path.abspath(output_folder))
+    os.makedirs(parent, exist_ok=True)
+    tmp_folder = f"{output_folder}.tmp-{os.getpid()}-{threading.get_ident()}"
+    old_folder = f"{output_folder}.old-{os.getpid()}-{threading.get_ident()}"
+    os.makedirs(tmp_folder)
+    faiss.write_index(index, os.path.join(tmp_folder, "index.faiss"))
+    TextStore.write(tmp_folder, _source_records(vs))
+    meta = {
+        "kind": kind,
+        "vectors": index.ntotal,
+        "dimension": index.d,
+        "normalize_L2": bool(getattr(vs, "_normalize_L2", False)),
+        "embedding": embedding_identity(vs.embedding_function),
+        "source_signature": signature,
+        "compiled_at": time.time(),
+        **search_params,
+    }
+    with open(os.path.join(tmp_folder, "meta.json"), "w", encoding="utf-8") as f:
+        json.dump(meta, f)
+
+    if os.path.exists(output_folder):
+        os.rename(output_folder, old_folder)
+    os.rename(tmp_folder, output_folder)
+    shutil.rmtree(old_folder, ignore_errors=True)
+
+    meta["seconds"] = round(time.perf_counter() - start, 2)
+    meta["index_bytes"] = os.path.getsize(os.path.join(output_folder, "index.faiss"))
+    return meta
+
+def compile_if_enabled(vs):
+    """Recompile the serving index after an ingestion, if FAISS_INDEX_TYPE asks for one."""
+    if FAISS_INDEX_TYPE == "flat":
+        return None
+    try:
+        return compile_serving_index(vs)
+    except Exception as e:
+        print(f"❗ FAISS Serving-Index konnte nicht kompiliert werden: {e}")
+        return None
+
+# === Serving ===
+class ServingIndex:
+    """The compiled index of one folder, memory-mapped and reopened when it is replaced."""
+
+    def __init__(self, folder=FAISS_SERVING_FOLDER, source_folder=None):
+        self.folder = folder
+        self.source_folder = source_folder
+        self._lock = threading.Lock()
+        self._state = None
+        self._signature = None
+
+    def _meta_signature(self):
+        try:
+            stat = os.stat(os.path.join(self.folder, "meta.json"))
+        except OSError:
+            return None
+        return (stat.st_ino, stat.st_mtime_ns)
+
+    def _open(self):
+        signature = self._meta_signature()
+        if signature is None:
+            return None
+        if signature != self._signature:
+            with self._lock:
+                if signature != self._signature:
+                    import faiss
+
+                    with open(os.path.join(self.folder, "meta.json"), encoding="utf-8") as f:
+                        meta = json.load(f)
+                    index = faiss.read_index(os.path.join(self.folder, "index.faiss"),
+                                             faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY)
+                    apply_search_params(index, meta["kind"], meta["nprobe"], meta["ef_search"])
+                    # The previous state is left to the garbage collector; searches may still use it
+                    self._state = (meta, index, TextStore(self.folder))
+                    self._signature = signature
+        return self._state
+
+    def available(self, embedding=None):
+        """True if a compiled index exists, was built from the current source index and, if given,
+        with the ``embedding`` identity (see embedding_backend.embedding_identity)."""
+        from Tools_agent.faiss_tool import FAISS_FOLDER, faiss_folder_signature
+
+        try:
+            state = self._open()
+        except Exception as e:
+            print(f"❗ FAISS Serving-Index konnte nicht geöffnet werden: {e}")
+            return False
+        if state is None:
+            return False
+        if embedding is not None and state[0].get("embedding") != embedding:
+            return False
+        current = faiss_folder_signature(self.source_folder or FAISS_FOLDER)
+        return current is None or json.loads(json.dumps(current)) == state[0]["source_signature"]
+
+    def search(self, vector, k=3):
+        """Records of the ``k`` nearest chunks to an embedded query, nearest first."""
+        import numpy as np
+
+        meta, index, texts = self._open()
+        query = np.asarray([vector], dtype=np.float32)
+        if meta["normalize_L2"]:
+            query /= np.linalg.norm(query, axis=1, keepdims=True)
+        distances, rows = index.search(query, k)
+        return [
+            {**texts.get(int(row)), "score": float(distance)}
+            for distance, row in zip(distances[0], rows[0]) if row >= 0
+        ]
+
+    def records(self, ids):
+        """Records of the chunks with these docstore ids, skipping ids not in the index."""
+        texts = self._open()[2]
+        records = (texts.find(record_id) for record_id in ids)
+        return [record for record in records if record is not None]
+
+    def stats(self):
+        state = self._state
+        if state is None:
+            return {"loaded": False}
+        meta = state[0]
+        return {"loaded": True, **{key: meta.get(key) for key in ("kind", "vectors", "dimension", "nprobe", "ef_search", "embedding")}}
+
+serving_index = ServingIndex()
+
+def main():
+    parser = argparse.ArgumentParser(description="FAISS Serving-Index (IVF/HNSW, mmap) aus dem Ingestion-Index kompilieren.")
+    parser.add_argument("--type", choices=INDEX_TYPES, default=FAISS_INDEX_TYPE if FAISS_INDEX_TYPE != "flat" else "ivfflat")
+    parser.add_argument("--source", default=None, help="Ordner des LangChain-Index (Standard: data/faiss_index)")
+    parser.add_argument("--output", default=FAISS_SERVING_FOLDER)
+    parser.add_argument("--nlist", type=int, default=FAISS_NLIST)
+    parser.add_argument("--nprobe", type=int, default=FAISS_NPROBE)
+    parser.add_argument("--pq-m", type=int, default=FAISS_PQ_M)
+    parser.add_argument("--pq-bits", type=int, default=FAISS_PQ_BITS)
+    parser.add_argument("--hnsw-m", type=int, default=FAISS_HNSW_M)
+    parser.add_argument("--ef-construction", type=int, default=FAISS_EF_CONSTRUCTION)
+    parser.add_argument("--ef-search", type=int, default=FAISS_EF_SEARCH)
+    parser.add_argument("--train-sample", type=int, default=FAISS_TRAIN_SAMPLE)
+    args = parser.parse_args()
+
+    params = {"nprobe": args.nprobe, "ef_search": args.ef_search, "train_sample": args.train_sample,
+              "ef_construction": args.ef_construction}
+    if args.type in ("ivfflat", "ivfpq"):
+        params["nlist"] = args.nlist
+    if args.type == "ivfpq":
+        params.update(pq_m=args.pq_m, pq_bits=args.pq_bits)
+    if args.type == "hnsw":
+        params["hnsw_m"] = args.hnsw_m
+    meta = compile_serving_index(kind=args.type, source_folder=args.source, output_folder=args.output, **params)
+    if meta:
+        print(f"✅ {meta['kind']}-Index mit {meta['vectors']} Vektoren in {meta['seconds']}s kompiliert "
+              f"({meta['index_bytes'] / 1e6:.1f} MB): {args.output}")
+
+if __name__ == "__main__":
+    main()
@@ -1,51 +1,450 @@
 # Tools_agent/faiss_tool.py
 
-import faiss
+# faiss, fitz, numpy, the LangChain vector store and the embedding backends are
+# imported where they are used, so importing this module (and starting the API)
+# stays cheap.
 import os
-import pickle
-import numpy as np
-from langchain_openai import OpenAIEmbeddings
-from langchain.vectorstores import FAISS
-from langchain.text_splitter import RecursiveCharacterTextSplitter
-
-# Tools_agent/faiss_tool.py
-
-import faiss
-import os
-import pickle
-import numpy as np
-from langchain_openai import OpenAIEmbeddings
-from langchain.vectorstores import FAISS
-from langchain.text_splitter import RecursiveCharacterTextSplitter
-import fitz  
-import streamlit as st
+import hashlib
+import shutil
+import threading
+import time
+from langchain_core.documents import Document
+from Tools_agent.config import shared_client
+from Tools_agent.singleflight import coalesce, tool_flight
+from Tools_agent.tracing import metrics
 
 FAISS_FOLDER = "data/faiss_index"
-openai_api_key = st.secrets["openai"]["OPENAI_KEY"]
-embedding_model = OpenAIEmbeddings(openai_api_key=openai_api_key)
+FAISS_FILES = ("index.faiss", "index.pkl")
+FAISS_RELOAD_CHECK_SECONDS = float(os.getenv("FAISS_RELOAD_CHECK_SECONDS", "2"))
+FAISS_TOP_K = int(os.getenv("FAISS_TOP_K", "3"))
+# "0": dense vector search only, without BM25 and fusion
+HYBRID_SEARCH = os.getenv("HYBRID_SEARCH", "1") != "0"
+# Candidates taken from each retriever before reciprocal rank fusion
+HYBRID_CANDIDATES = int(os.getenv("HYBRID_CANDIDATES", "20"))
+RRF_K = int(os.getenv("RRF_K", "60"))
+# Optional local cross-encoder for the fused candidates, e.g. cross-encoder/mmarco-mMiniLMv2-L12-H384-v1
+RERANKER_MODEL = os.getenv("RERANKER_MODEL", "")
+RERANK_CANDIDATES = int(os.getenv("RERANK_CANDIDATES", "10"))
 
-def load_faiss_index():
+def get_embedding_model():
+    """Shared cached embeddings of the configured backend (EMBEDDING_BACKEND), built on first use."""
+    def build():
+        from Tools_agent.embedding_backend import build_embeddings
+        from Tools_agent.embedding_cache import CachedEmbeddings
+        return CachedEmbeddings(build_embeddings())
+    return shared_client("embeddings", build)
+
+def load_faiss_index(folder=FAISS_FOLDER):
+    from langchain_community.vectorstores import FAISS
     try:
-        return FAISS.load_local(FAISS_FOLDER, embeddings=embedding_model, allow_dangerous_deserialization=True)
+        return FAISS.load_local(folder, embeddings=get_embedding_model(), allow_dangerous_deserialization=True)
     except Exception:
         return None
 
-def search_faiss(query):
-    vs = load_faiss_index()
+def faiss_folder_signature(folder=FAISS_FOLDER):
+    """(name, mtime, size) of the index files, or None while one of them is missing."""
+    signature = []
+    for name in FAISS_FILES:
+        try:
+            stat = os.stat(os.path.join(folder, name))
+        except OSError:
+            return None
+        signature.append((name, stat.st_mtime_ns, stat.st_size))
+    return tuple(signature)
+
+# === Resident FAISS Store ===
+class ResidentFAISSStore:
+    """Keep one FAISS store in memory per process and hot-reload it when the index folder changes.
+
+    Readers always get a fully loaded store: a new index is loaded next to the
+    current one and only then swapped in with a single reference assignment.
+    """
+
+    def __init__(self, folder=FAISS_FOLDER, check_interval=FAISS_RELOAD_CHECK_SECONDS):
+        self.folder = folder
+        self.check_interval = check_interval
+        self._vs = None
+        self._signature = None
+        self._last_check = 0.0
+        self._lock = threading.Lock()
+        self.load_seconds = None
+        self.loaded_at = None
+        self.reloads = 0
+        self.error = None
+        self._docstore_stats = (0, 0)
+
+    def _folder_signature(self):
+        return faiss_folder_signature(self.folder)
+
+    def get(self, force_check=False):
+        """Return the resident store, reloading it first if the files on disk changed."""
+        if not force_check and time.monotonic() - self._last_check < self.check_interval:
+            return self._vs
+
+        with self._lock:
+            if not force_check and time.monotonic() - self._last_check < self.check_interval:
+                return self._vs
+            signature = self._folder_signature()
+            # A missing file means the folder is being replaced: keep serving the current store
+            if signature is not None and signature != self._signature:
+                self._load(signature)
+            self._last_check = time.monotonic()
+        return self._vs
+
+    def _load(self, signature):
+        from Tools_agent.embedding_backend import EmbeddingMismatchError, check_index_embeddings
+        try:
+            check_index_embeddings(self.folder, get_embedding_model())
+        except EmbeddingMismatchError as e:
+            # Searching with other embeddings than the index was built with returns noise
+            print(f"❗ {e}")
+            self.error = str(e)
+            self._signature = signature
+            return
+        start = time.perf_counter()
+        vs = load_faiss_index(self.folder)
+        elapsed = time.perf_counter() - start
+        if vs is None:
+            print("❗ FAISS Index konnte nicht geladen werden, behalte bisherigen Index.")
+            return
+        if self._folder_signature() != signature:
+            # Files changed while loading, the next check picks up the finished version
+            return
+        self._install(vs, signature, elapsed)
+        metrics.observe("faiss_load_seconds", elapsed, help="Loading the FAISS index from disk")
+        print(f"📚 FAISS Index geladen in {elapsed:.2f}s ({self.stats()['resident_bytes'] / 1e6:.1f} MB)")
+
+    def _install(self, vs, signature, load_seconds):
+        # Counted once per load or swap, so stats() (scraped by /metrics) stays cheap
+        documents = vs.docstore._dict.values()
+        self._docstore_stats = (len(documents), sum(len(doc.page_content.encode("utf-8")) for doc in documents))
+        self._vs = vs
+        self._signature = signature
+        self.load_seconds = load_seconds
+        self.loaded_at = time.time()
+        self.reloads += 1
+        self.error = None
+
+    def swap(self, vs):
+        """Install an already built store, e.g. right after it was written by an upload."""
+        with self._lock:
+            self._install(vs, self._folder_signature(), 0.0)
+            self._last_check = time.monotonic()
+
+    def stats(self):
+        """Report load time and approximate resident size of the current store."""
+        from Tools_agent.embedding_backend import embedding_identity
+        vs = self._vs
+        if vs is None:
+            return {"loaded": False, "reloads": self.reloads, "error": self.error}
+
+        index = vs.index
+        try:
+            index_bytes = os.path.getsize(os.path.join(self.folder, "index.faiss"))
+        except OSError:
+            index_bytes = index.ntotal * index.d * 4
+        documents, docstore_bytes = self._docstore_stats
+        return {
+            "loaded": True,
+            "vectors": index.ntotal,
+            "documents": documents,
+            "dimension": index.d,
+            "load_seconds": self.load_seconds,
+            "loaded_at": self.loaded_at,
+            "reloads": self.reloads,
+            "index_bytes": index_bytes,
+            "docstore_bytes": docstore_bytes,
+            "resident_bytes": index_bytes + docstore_bytes,
+            "embedding": embedding_identity(vs.embedding_function),
+        }
+
+faiss_store = ResidentFAISSStore()
+
+def save_faiss_index(vs, folder=FAISS_FOLDER, bm25=None):
+    """Write the index and its BM25 index to a temporary folder and move it into place in one step.
+
+    ``bm25`` is brought in sync with the docstore first (default: the one
+    saved in ``folder``), so only new chunks are tokenized; it is returned.
+    """
+    from Tools_agent.bm25_index import BM25Index
+    from Tools_agent.embedding_backend import write_embedding_meta
+    parent = os.path.dirname(os.path.abspath(folder))
+    os.makedirs(parent, exist_ok=True)
+    suffix = f"{os.getpid()}-{threading.get_ident()}"
+    tmp_folder = f"{folder}.tmp-{suffix}"
+    old_folder = f"{folder}.old-{suffix}"
+
+    vs.save_local(tmp_folder)
+    write_embedding_meta(tmp_folder, vs.embedding_function, vs.index.d)
+    bm25 = bm25 if bm25 is not None else BM25Index.load(folder)
+    bm25.sync(vs.docstore._dict)
+    bm25.save(tmp_folder)
+    if os.path.exists(folder):
+        os.rename(folder, old_folder)
+    os.rename(tmp_folder, folder)
+    shutil.rmtree(old_folder, ignore_errors=True)
+    return bm25
+
+# === Hybrid Retrieval ===
+def dense_candidates(query, k):
+    """[(docstore id, text)] of the ``k`` nearest chunks by embedding, or None without an index."""
+    from Tools_agent.embedding_backend import embedding_identity
+    from Tools_agent.faiss_index import serving_index
+    embeddings = get_embedding_model()
+    if serving_index.available(embedding_identity(embeddings)):
+        return [(record["id"], record["text"]) for record in serving_index.search(embeddings.embed_query(query), k)]
+
+    vs = faiss_store.get()
     if not vs:
+        return None
+    import faiss
+    import numpy as np
+    vector = np.asarray([embeddings.embed_query(query)], dtype=np.float32)
+    if vs._normalize_L2:
+        faiss.normalize_L2(vector)
+    _, rows = vs.index.search(vector, k)
+    ids = [vs.index_to_docstore_id[row] for row in rows[0] if row >= 0]
+    return [(docstore_id, vs.docstore.search(docstore_id).page_content) for docstore_id in ids]
+
+def chunk_texts(ids):
+    """{docstore id: text} of the given chunks, from the serving text store or the resident docstore."""
+    from Tools_agent.embedding_backend import embedding_identity
+    from Tools_agent.faiss_index import serving_index
+    if not ids:
+        return {}
+    if serving_index.available(embedding_identity(get_embedding_model())):
+        return {record["id"]: record["text"] for record in serving_index.records(ids)}
+    vs = faiss_store.get()
+    if not vs:
+        return {}
+    documents = vs.docstore._dict
+    return {docstore_id: documents[docstore_id].page_content for docstore_id in ids if docstore_id in documents}
+
+def reciprocal_rank_fusion(rankings, k=RRF_K):
+    """Merge ranked id lists: each id scores the sum of 1 / (k + rank) over the lists it appears in."""
+    scores = {}
+    for ranking in rankings:
+        for rank, doc_id in enumerate(ranking, start=1):
+            scores[doc_id] = scores.get(doc_id, 0.0) + 1.0 / (k + rank)
+    return sorted(scores, key=scores.get, reverse=True)
+
+def get_reranker():
+    def build():
+        from sentence_transformers import CrossEncoder
+        return CrossEncoder(RERANKER_MODEL, device="cpu")
+    return shared_client("reranker", build)
+
+def rerank(query, chunks):
+    """``chunks`` [(docstore id, text)] ordered by the cross-encoder's relevance to ``query``."""
+    scores = get_reranker().predict([(query, text) for _, text in chunks])
+    return [chunk for _, chunk in sorted(zip(scores, chunks), key=lambda pair: -pair[0])]
+
+def retrieve(query, k=FAISS_TOP_K, hybrid=HYBRID_SEARCH, reranker=bool(RERANKER_MODEL)):
+    """[(docstore id, text)] of the ``k`` best chunks, or None without an index.
+
+    With ``hybrid`` the dense and BM25 candidates are fused by reciprocal
+    rank, so exact drug names, doses and ATC codes are found even when the
+    embedding misses them; ``reranker`` reorders the fused candidates.
+    """
+    from Tools_agent import bm25_index
+    dense = dense_candidates(query, HYBRID_CANDIDATES if hybrid or reranker else k)
+    if dense is None:
+        return None
+    texts = dict(dense)
+    ranking = [docstore_id for docstore_id, _ in dense]
+
+    if hybrid:
+        lexical = bm25_index.lexical_index.get()
+        matches = [docstore_id for docstore_id, _ in lexical.search(query, HYBRID_CANDIDATES)] if lexical else []
+        texts.update(chunk_texts([docstore_id for docstore_id in matches if docstore_id not in texts]))
+        ranking = reciprocal_rank_fusion([ranking, matches])
+    # A BM25 hit without text belongs to a chunk that was removed since
+    chunks = [(docstore_id, texts[docstore_id]) for docstore_id in ranking if docstore_id in texts]
+    if reranker:
+        chunks = rerank(query, chunks[:RERANK_CANDIDATES])
+    return chunks[:k]
+
+@coalesce(tool_flight)
+def search_faiss(query):
+    chunks = retrieve(query)
+    if chunks is None:
         return "❗ Kein FAISS Index verfügbar."
-    retriever = vs.as_retriever(search_kwargs={"k": 3})
-    docs = retriever.get_relevant_documents(query)
-    return "\n\n".join(d.page_content for d in docs)
+    return "\n\n".join(text for _, text in chunks)
+
+# === Incremental Ingestion ===
+_text_splitter = None
+
+def get_text_splitter():
+    global _text_splitter
+    if _text_splitter is None:
+        from langchain.text_splitter import RecursiveCharacterTextSplitter
+        _text_splitter = RecursiveCharacterTextSplitter(chunk_size=500, chunk_overlap=50)
+    return _text_splitter
+
+# Serializes writers in this process; the lock file does the same across processes
+_write_lock = threading.Lock()
+
+def content_hash(text):
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()[:32]
+
+def chunk_id(doc_id, text_hash):
+    return f"{doc_id}:{text_hash}"
+
+def document_id(path, root=None):
+    """Id of an ingested file: its path relative to the ingested folder, with "/" separators.
+
+    Bulk ingestion passes the folder as ``root``; an upload has no root, so
+    its name is the id. A file at the top of the folder and an upload of
+    the same name are the same document; files in subfolders keep their
+    own ids (upload with that id as ``doc_id`` to replace one).
+    """
+    if root is not None:
+        path = os.path.relpath(path, root)
+    return os.path.normpath(path).replace(os.sep, "/").lstrip("/")
+
+def page_documents(page_text, doc_id, source, page_number):
+    """Split one page into chunk documents carrying their source metadata."""
+    return [
+        Document(
+            page_content=chunk,
+            metadata={
+                "doc_id": doc_id,
+                "source": source,
+                "page": page_number,
+                "chunk_offset": chunk_offset,
+                "content_hash": content_hash(chunk),
+            },
+        )
+        for chunk_offset, chunk in enumerate(get_text_splitter().split_text(page_text))
+    ]
+
+def pdf_to_documents(pdf_bytes, doc_id, source):
+    import fitz
+    doc = fitz.open(stream=pdf_bytes, filetype="pdf")
+    documents = []
+    for page_number, page in enumerate(doc, start=1):
+        documents.extend(page_documents(page.get_text(), doc_id, source, page_number))
+    return documents
+
+def copy_vectorstore(vs):
+    """Independent copy of a store, so the resident one stays untouched while writing."""
+    import faiss
+    from langchain_community.docstore.in_memory import InMemoryDocstore
+    from langchain_community.vectorstores import FAISS
+    return FAISS(
+        embedding_function=vs.embedding_function,
+        index=faiss.clone_index(vs.index),
+        docstore=InMemoryDocstore(dict(vs.docstore._dict)),
+        index_to_docstore_id=dict(vs.index_to_docstore_id),
+        normalize_L2=vs._normalize_L2,
+        distance_strategy=vs.distance_strategy,
+    )
+
+def document_chunk_ids(vs, doc_id):
+    return [
+        docstore_id for docstore_id, document in vs.docstore._dict.items()
+        if document.metadata.get("doc_id") == doc_id
+    ]
+
+class IndexWriteLock:
+    """Serialize index writers, within this process and across processes."""
+
+    def __init__(self, folder=FAISS_FOLDER):
+        self.path = f"{folder}.lock"
+
+    def __enter__(self):
+        _write_lock.acquire()
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self._file = open(self.path, "w")
+        try:
+            import fcntl
+            fcntl.flock(self._file, fcntl.LOCK_EX)
+        except ImportError:
+            pass
+        return self
+
+    def __exit__(self, *exc):
+        self._file.close()
+        _write_lock.release()
+
+def _apply_changes(change):
+    """Run ``change(vs)`` on a copy of the latest index, then save and swap it in.
+
+    ``change`` receives the copy (or None if there is no index yet) and returns
+    the store to save, or None if nothing changed.
+    """
+    from Tools_agent import bm25_index
+    from Tools_agent.embedding_backend import check_index_embeddings
+    from Tools_agent.faiss_index import compile_if_enabled
+    with IndexWriteLock():
+        check_index_embeddings(FAISS_FOLDER, get_embedding_model())
+        current = faiss_store.get(force_check=True)
+        vs = change(copy_vectorstore(current) if current is not None else None)
+        if vs is not None:
+            bm25 = save_faiss_index(vs)
+            faiss_store.swap(vs)
+            bm25_index.lexical_index.swap(bm25)
+            compile_if_enabled(vs)
+
+def add_documents_to_faiss(documents, doc_id, replace=True):
+    """Add the chunks of one document; only chunks not yet indexed for it are embedded.
+
+    With ``replace`` the document's chunks that are no longer part of it are
+    removed, so re-uploading a changed file updates it in place.
+    """
+    chunks = {}
+    for document in documents:
+        chunks.setdefault(chunk_id(doc_id, document.metadata["content_hash"]), document)
+    result = {"added": 0, "skipped": 0, "removed": 0}
+
+    def change(vs):
+        existing = set(document_chunk_ids(vs, doc_id)) if vs is not None else set()
+        new_ids = [docstore_id for docstore_id in chunks if docstore_id not in existing]
+        stale_ids = [docstore_id for docstore_id in existing if docstore_id not in chunks] if replace else []
+        result.update(added=len(new_ids), skipped=len(chunks) - len(new_ids), removed=len(stale_ids))
+
+        if not new_ids and not stale_ids:
+            return None
+        if vs is None:
+            from langchain_community.vectorstores import FAISS
+            return FAISS.from_documents([chunks[i] for i in new_ids], get_embedding_model(), ids=new_ids)
+        if stale_ids:
+            vs.delete(stale_ids)
+        if new_ids:
+            vs.add_documents([chunks[i] for i in new_ids], ids=new_ids)
+        return vs
+
+    _apply_changes(change)
+    return result
+
+def delete_document_from_faiss(doc_id):
+    """Remove all chunks of one document from the index; returns the number removed."""
+    removed = []
+
+    def change(vs):
+        if vs is None:
+            return None
+        removed.extend(document_chunk_ids(vs, doc_id))
+        if not removed:
+            return None
+        vs.delete(removed)
+        return vs
+
+    _apply_changes(change)
+    return len(removed)
 
-def upload_pdf_to_faiss(uploaded_file):
-    """Extract text from PDF, split, embed, store FAISS"""
-    doc = fitz.open(stream=uploaded_file.read(), filetype="pdf")
-    text = "\n".join(page.get_text() for page in doc)
+def upload_pdf_to_faiss(uploaded_file, doc_id=None):
+    """Extract text from PDF page by page, split, embed new chunks and add them to the FAISS index.
 
-    text_splitter = RecursiveCharacterTextSplitter(chunk_size=500, chunk_overlap=50)
-    documents = text_splitter.create_documents([text])
+    ``doc_id`` defaults to ``document_id`` of the file name; the document's
+    previous chunks are replaced.
+    """
+    source = getattr(uploaded_file, "name", None) or "upload.pdf"
+    doc_id = doc_id or document_id(source)
+    documents = pdf_to_documents(uploaded_file.read(), doc_id, source)
 
-    vs = FAISS.from_documents(documents, embedding_model)
-    vs.save_local(FAISS_FOLDER)
-    return "✅ PDF verarbeitet und FAISS Index aktualisiert!"
+    result = add_documents_to_faiss(documents, doc_id)
+    return (
+        "✅ PDF verarbeitet und FAISS Index aktualisiert! "
+        f"({result['added']} neue, {result['skipped']} unveränderte, {result['removed']} entfernte Abschnitte)"
+    )
@@ -0,0 +1,96 @@
+# Tools_agent/fanout.py
+
+import asyncio
+import os
+import time
+
+from langchain_core.messages import HumanMessage, SystemMessage
+
+from Tools_agent.compendium_tool import get_compendium_info
+from Tools_agent.faiss_tool import search_faiss
+from Tools_agent.openfda_tool import search_openfda
+from Tools_agent.tavily_tool import smart_tavily_answer
+from Tools_agent.alerts_tool import search_medication_alerts
+from Tools_agent.executor import fanout_executor, run_blocking
+from Tools_agent.tracing import capture_cache_events
+
+# name -> (tool function, what it is queried with, timeout in seconds)
+FANOUT_SOURCES = {
+    "CompendiumTool": (get_compendium_info, "medication", float(os.getenv("FANOUT_TIMEOUT_COMPENDIUM", "15"))),
+    "OpenFDATool": (search_openfda, "medication", float(os.getenv("FANOUT_TIMEOUT_OPENFDA", "12"))),
+    "FAISSRetrieverTool": (search_faiss, "medication", float(os.getenv("FANOUT_TIMEOUT_FAISS", "5"))),
+    "TavilySearchTool": (smart_tavily_answer, "question", float(os.getenv("FANOUT_TIMEOUT_TAVILY", "15"))),
+    "MedicationAlertsTool": (search_medication_alerts, "medication", float(os.getenv("FANOUT_TIMEOUT_ALERTS", "15"))),
+}
+
+# Evidence per source handed to the LLM is cut to this many characters
+FANOUT_EVIDENCE_CHARS = int(os.getenv("FANOUT_EVIDENCE_CHARS", "4000"))
+
+FANOUT_SYSTEM_MESSAGE = (
+    "Du bist ein klinischer Assistent. Beantworte die Frage ausschliesslich anhand der "
+    "bereitgestellten Quellen. Nenne die verwendeten Quellen. "
+    "Antworte auf Deutsch und präzise."
+)
+
+async def _fetch_source(name, func, tool_input, timeout, tracer=None):
+    start = time.perf_counter()
+    cache_events = capture_cache_events()
+    try:
+        output = await asyncio.wait_for(run_blocking(func, tool_input, executor=fanout_executor), timeout)
+    except asyncio.TimeoutError:
+        print(f"⏱️ {name} hat das Zeitlimit von {timeout:g}s überschritten, Quelle wird ignoriert.")
+        if tracer is not None:
+            tracer.add_tool_span(name, start, len(tool_input), cache_events=cache_events, error="timeout")
+        return None
+    except Exception as e:
+        print(f"❗ Fehler bei {name}: {e}")
+        if tracer is not None:
+            tracer.add_tool_span(name, start, len(tool_input), cache_events=cache_events, error=str(e))
+        return None
+
+    if tracer is not None:
+        tracer.add_tool_span(name, start, len(tool_input), len(str(output or "")), cache_events)
+
+    if not output:
+        return None
+    output = str(output)
+    return {
+        "thought": "Fan-out",
+        "tool": name,
+        "input": tool_input,
+        "output": output,
+        "links": [w for w in output.split() if w.startswith("http")],
+        "seconds": round(time.perf_counter() - start, 3),
+    }
+
+async def gather_evidence(question, medication_name, sources=None, tracer=None):
+    """Query all sources concurrently; failed, empty or timed out sources are dropped."""
+    sources = sources or FANOUT_SOURCES
+    inputs = {"medication": medication_name, "question": question}
+    results = await asyncio.gather(*(
+        _fetch_source(name, func, inputs[input_kind], timeout, tracer)
+        for name, (func, input_kind, timeout) in sources.items()
+    ))
+    return [result for result in results if result is not None]
+
+def build_fanout_messages(question, evidence):
+    blocks = [
+        f"### Quelle: {item['tool']}\n{item['output'][:FANOUT_EVIDENCE_CHARS]}"
+        for item in evidence
+    ]
+    context = "\n\n".join(blocks) if blocks else "Keine Quellen verfügbar."
+    return [
+        SystemMessage(content=FANOUT_SYSTEM_MESSAGE),
+        HumanMessage(content=f"Frage: {question}\n\n{context}"),
+    ]
+
+async def answer_with_fanout(llm, question, medication_name, sources=None, tracer=None):
+    """Fetch all sources in parallel and answer with a single LLM call."""
+    evidence = await gather_evidence(question, medication_name, sources, tracer)
+    config = {"callbacks": [tracer]} if tracer is not None else None
+    response = await llm.ainvoke(build_fanout_messages(question, evidence), config=config)
+    return {"final_answer": response.content, "steps": evidence}
+
+def run_fanout(llm, question, medication_name, sources=None, tracer=None):
+    """Blocking variant of answer_with_fanout for callers without an event loop (Streamlit)."""
+    return asyncio.run(answer_with_fanout(llm, question, medication_name, sources, tracer))
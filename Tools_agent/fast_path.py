@@ -0,0 +1,82 @@
+# Tools_agent/fast_path.py
+
+import asyncio
+import os
+import time
+
+from langchain_core.messages import HumanMessage, SystemMessage
+
+from Tools_agent.executor import run_blocking
+from Tools_agent.openfda_tool import FIELD_MAPPING, find_local_sections, sections_for
+from Tools_agent.tracing import capture_cache_events, metrics
+
+# Set to "0" to always run the agent
+FAST_PATH_ENABLED = os.getenv("FAST_PATH_ENABLED", "1") != "0"
+# "0" answers with the label sections as they are, without any LLM call
+FAST_PATH_SUMMARIZE = os.getenv("FAST_PATH_SUMMARIZE", "1") != "0"
+FAST_PATH_MAX_LABELS = int(os.getenv("FAST_PATH_MAX_LABELS", "2"))
+# Section text handed to the summarizing LLM call is cut to this many characters
+FAST_PATH_EVIDENCE_CHARS = int(os.getenv("FAST_PATH_EVIDENCE_CHARS", "3000"))
+
+FAST_PATH_SYSTEM_MESSAGE = (
+    "Du bist ein klinischer Assistent. Beantworte die Frage ausschliesslich anhand der "
+    "folgenden Abschnitte aus US-Fachinformationen (OpenFDA). Übersetze sinngemäss ins Deutsche, "
+    "fasse kurz zusammen und erfinde nichts dazu. Nenne OpenFDA als Quelle."
+)
+
+def format_sections(term, labels):
+    blocks = ["\n\n".join(rendered for _, rendered in sections) for sections in labels]
+    return f"🔎 OpenFDA: {term}\n\n" + "\n\n---\n\n".join(blocks)
+
+def build_fast_path_messages(question, evidence):
+    return [
+        SystemMessage(content=FAST_PATH_SYSTEM_MESSAGE),
+        HumanMessage(content=f"Frage: {question}\n\n{evidence[:FAST_PATH_EVIDENCE_CHARS]}"),
+    ]
+
+async def answer_fast_path(llm, question_type, medication_name, question, tracer=None, summarize=FAST_PATH_SUMMARIZE):
+    """Answer a menu question straight from the local label sections, or return None to use the agent.
+
+    Only taken when the medication is a known name (alias, ingredient or label
+    name); a guessed spelling correction goes to the agent instead. Makes at
+    most one LLM call (summary and translation of the sections), none with
+    ``summarize=False``.
+    """
+    fields = sections_for(question_type) if FAST_PATH_ENABLED else None
+    if not fields:
+        return None
+
+    start = time.perf_counter()
+    cache_events = capture_cache_events()
+    term, labels = await run_blocking(find_local_sections, medication_name, fields, FAST_PATH_MAX_LABELS,
+                                      exact_only=True)
+    if not labels:
+        metrics.inc("fast_path_total", outcome="miss", help="Menu questions answered by the fast path")
+        if tracer is not None:
+            tracer.add_tool_span("FastPathLookup", start, len(medication_name), 0, cache_events)
+        return None
+
+    evidence = format_sections(term, labels)
+    if tracer is not None:
+        tracer.add_tool_span("FastPathLookup", start, len(medication_name), len(evidence), cache_events)
+    metrics.inc("fast_path_total", outcome="hit", help="Menu questions answered by the fast path")
+
+    step = {
+        "thought": f"Fast Path: Abschnitte {', '.join(FIELD_MAPPING[field] for field in fields)}",
+        "tool": "OpenFDATool",
+        "input": term,
+        "output": evidence,
+        "links": [],
+        "seconds": round(time.perf_counter() - start, 3),
+    }
+    if summarize:
+        config = {"callbacks": [tracer]} if tracer is not None else None
+        response = await llm.ainvoke(build_fast_path_messages(question, evidence), config=config)
+        final_answer = response.content
+    else:
+        final_answer = evidence
+    return {"final_answer": final_answer, "steps": [step], "route": "fast_path"}
+
+def run_fast_path(llm, question_type, medication_name, question, tracer=None, summarize=FAST_PATH_SUMMARIZE):
+    """Blocking variant of answer_fast_path for callers without an event loop (Streamlit)."""
+    return asyncio.run(answer_fast_path(llm, question_type, medication_name, question, tracer, summarize))
@@ -0,0 +1,275 @@
+# Tools_agent/fda_store.py
+"""Compact, precompiled store of the local FDA labels.
+
+    python -m Tools_agent.fda_store                      # data/dataset.json -> data/fda_labels.sqlite
+    python -m Tools_agent.fda_store --source other.json --output other.sqlite
+
+Only the FIELD_MAPPING sections are kept, already rendered exactly as
+``format_full_fda_entry`` renders them and addressable by (label, section).
+Identical section texts (common across repackaged labels) are stored once,
+zlib-compressed. The distinct label names get an FTS5 trigram index, so
+substring lookups need neither the JSON nor an in-memory index.
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from collections import OrderedDict
+
+FDA_STORE_PATH = os.getenv("FDA_STORE_PATH", "data/fda_labels.sqlite")
+FDA_STORE_VERSION = "1"
+# Decompressed section texts kept in memory (LRU)
+FDA_STORE_TEXT_CACHE = int(os.getenv("FDA_STORE_TEXT_CACHE", "4096"))
+
+# === Compiler ===
+def compile_store(source_path, output_path=FDA_STORE_PATH):
+    """Compile a dataset.json into a store, written next to ``output_path`` and moved into place."""
+    from Tools_agent.openfda_tool import (
+        NO_SECTIONS_MESSAGE, load_local_fda_data, render_sections, searchable_text,
+    )
+
+    start = time.perf_counter()
+    source_stat = os.stat(source_path)
+    entries = load_local_fda_data(source_path)
+
+    os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+    tmp_path = f"{output_path}.tmp-{os.getpid()}"
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+
+    conn = sqlite3.connect(tmp_path)
+    conn.executescript("""
+        PRAGMA journal_mode=OFF;
+        PRAGMA synchronous=OFF;
+        CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT);
+        CREATE TABLE names (name_id INTEGER PRIMARY KEY, text TEXT);
+        CREATE VIRTUAL TABLE names_fts USING fts5(text, content='names', content_rowid='name_id',
+                                                  tokenize='trigram case_sensitive 1');
+        CREATE TABLE labels (offset INTEGER PRIMARY KEY, label_id TEXT, name_id INTEGER);
+        CREATE TABLE section_texts (text_id INTEGER PRIMARY KEY, body BLOB);
+        CREATE TABLE sections (offset INTEGER, position INTEGER, field TEXT, text_id INTEGER,
+                               PRIMARY KEY (offset, position)) WITHOUT ROWID;
+    """)
+
+    name_ids = {}
+    text_ids = {}
+    section_count = 0
+
+    def text_id(rendered):
+        digest = hashlib.blake2b(rendered.encode("utf-8"), digest_size=16).digest()
+        if digest not in text_ids:
+            text_ids[digest] = len(text_ids)
+            conn.execute(
+                "INSERT INTO section_texts (text_id, body) VALUES (?, ?)",
+                (text_ids[digest], zlib.compress(rendered.encode("utf-8"), 6)),
+            )
+        return text_ids[digest]
+
+    with conn:
+        for offset, entry in enumerate(entries):
+            text = searchable_text(entry)
+            name_id = name_ids.get(text)
+            if name_id is None:
+                name_id = name_ids[text] = len(name_ids)
+                conn.execute("INSERT INTO names (name_id, text) VALUES (?, ?)", (name_id, text))
+            conn.execute(
+                "INSERT INTO labels (offset, label_id, name_id) VALUES (?, ?, ?)",
+                (offset, entry.get("id") or entry.get("set_id"), name_id),
+            )
+            sections = render_sections(entry)
+            conn.executemany(
+                "INSERT INTO sections (offset, position, field, text_id) VALUES (?, ?, ?, ?)",
+                [(offset, position, field, text_id(rendered)) for position, field, rendered in sections],
+            )
+            section_count += len(sections)
+
+        conn.execute("CREATE INDEX labels_name ON labels (name_id)")
+        conn.execute("CREATE INDEX labels_label_id ON labels (label_id)")
+        conn.execute("INSERT INTO names_fts (names_fts) VALUES ('rebuild')")
+        conn.executemany("INSERT INTO meta (key, value) VALUES (?, ?)", [
+            ("version", FDA_STORE_VERSION),
+            ("source_mtime", repr(source_stat.st_mtime)),
+            ("source_size", str(source_stat.st_size)),
+            ("labels", str(len(entries))),
+            ("no_sections_message", NO_SECTIONS_MESSAGE),
+        ])
+    conn.execute("VACUUM")
+    conn.close()
+    os.replace(tmp_path, output_path)
+
+    return {
+        "labels": len(entries),
+        "names": len(name_ids),
+        "sections": section_count,
+        "distinct_sections": len(text_ids),
+        "source_bytes": source_stat.st_size,
+        "store_bytes": os.path.getsize(output_path),
+        "seconds": round(time.perf_counter() - start, 2),
+    }
+
+# === Reader ===
+class FDALabelStore:
+    """Read-only access to a compiled store; reopened when the file is replaced.
+
+    The store counts as stale (and is not used) when the source dataset it
+    was compiled from has changed since. Without a source file next to it,
+    the store is used as is.
+    """
+
+    def __init__(self, path=FDA_STORE_PATH, source_path="data/dataset.json"):
+        self.path = path
+        self.source_path = source_path
+        self._lock = threading.Lock()
+        self._conn = None
+        self._signature = None
+        self._meta = {}
+        self._texts = OrderedDict()
+
+    def _store_signature(self):
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return None
+        return (stat.st_ino, stat.st_mtime, stat.st_size)
+
+    def _open(self):
+        """Return the connection, reopening it if the store file was replaced; None if there is no store."""
+        signature = self._store_signature()
+        if signature is None:
+            return None
+        if signature != self._signature:
+            if self._conn is not None:
+                self._conn.close()
+            conn = sqlite3.connect(f"file:{os.path.abspath(self.path)}?mode=ro", uri=True, check_same_thread=False)
+            conn.execute("PRAGMA mmap_size=268435456")
+            self._meta = dict(conn.execute("SELECT key, value FROM meta").fetchall())
+            self._conn = conn
+            self._signature = signature
+            self._texts.clear()
+        return self._conn
+
+    def available(self):
+        """True if a store exists and matches the current source dataset (if there is one)."""
+        with self._lock:
+            if self._open() is None or self._meta.get("version") != FDA_STORE_VERSION:
+                return False
+            meta = self._meta
+        try:
+            stat = os.stat(self.source_path)
+        except OSError:
+            return True
+        return repr(stat.st_mtime) == meta.get("source_mtime") and str(stat.st_size) == meta.get("source_size")
+
+    def search_offsets(self, query):
+        """Offsets of all labels whose names contain ``query`` (case-insensitive), in source order."""
+        query = query.lower()
+        if len(query) >= 3:
+            # The trigram index narrows down the names, instr keeps exact substring semantics
+            names = "SELECT rowid FROM names_fts WHERE names_fts MATCH ? AND instr(text, ?) > 0"
+            params = ('"' + query.replace('"', '""') + '"', query)
+        else:
+            names = "SELECT name_id FROM names WHERE instr(text, ?) > 0"
+            params = (query,)
+
+        with self._lock:
+            conn = self._open()
+            if conn is None:
+                return []
+            return [row[0] for row in conn.execute(
+                f"SELECT offset FROM labels WHERE name_id IN ({names}) ORDER BY offset", params
+            )]
+
+    def sections(self, offset, fields=None):
+        """Pre-rendered sections of one label as [(field, rendered)], in FIELD_MAPPING order."""
+        with self._lock:
+            conn = self._open()
+            if conn is None:
+                return []
+            rows = conn.execute(
+                "SELECT s.field, s.text_id, t.body FROM sections s JOIN section_texts t ON t.text_id = s.text_id "
+                "WHERE s.offset = ? ORDER BY s.position",
+                (offset,),
+            ).fetchall()
+            return [
+                (field, self._text(text_id, body))
+                for field, text_id, body in rows
+                if fields is None or field in fields
+            ]
+
+    def _text(self, text_id, body):
+        """Decompressed section text, from a small LRU cache; call with the lock held."""
+        text = self._texts.get(text_id)
+        if text is None:
+            text = self._texts[text_id] = zlib.decompress(body).decode("utf-8")
+            if len(self._texts) > FDA_STORE_TEXT_CACHE:
+                self._texts.popitem(last=False)
+        else:
+            self._texts.move_to_end(text_id)
+        return text
+
+    def render(self, offset):
+        """The label exactly as format_full_fda_entry renders it."""
+        sections = self.sections(offset)
+        if sections:
+            return "\n\n".join(rendered for _, rendered in sections)
+        return self._meta.get("no_sections_message", "")
+
+    def search(self, query):
+        """Rendered labels matching ``query``, identical to formatting the in-memory search results."""
+        offsets = self.search_offsets(query)
+        if not offsets:
+            return []
+        with self._lock:
+            conn = self._open()
+            if conn is None:
+                return []
+            # All matches in one query instead of one per label
+            rows = conn.execute(
+                "SELECT s.offset, s.text_id, t.body FROM labels l "
+                "JOIN sections s ON s.offset = l.offset JOIN section_texts t ON t.text_id = s.text_id "
+                "WHERE l.offset IN (SELECT value FROM json_each(?)) ORDER BY s.offset, s.position",
+                (json.dumps(offsets),),
+            ).fetchall()
+            no_sections = self._meta.get("no_sections_message", "")
+            rendered = {}
+            for offset, text_id, body in rows:
+                rendered.setdefault(offset, []).append(self._text(text_id, body))
+        return ["\n\n".join(rendered[offset]) if offset in rendered else no_sections for offset in offsets]
+
+    def version(self):
+        """Changes whenever the store file is replaced."""
+        return self._store_signature()
+
+    def names(self):
+        """All distinct label name strings (lowercased brand, generic and substance names)."""
+        with self._lock:
+            conn = self._open()
+            if conn is None:
+                return []
+            return [row[0] for row in conn.execute("SELECT text FROM names")]
+
+    def __len__(self):
+        with self._lock:
+            return int(self._meta.get("labels", 0)) if self._open() is not None else 0
+
+fda_label_store = FDALabelStore()
+
+def main():
+    parser = argparse.ArgumentParser(description="Lokale FDA-Daten in einen kompakten Speicher kompilieren.")
+    parser.add_argument("--source", default="data/dataset.json")
+    parser.add_argument("--output", default=FDA_STORE_PATH)
+    args = parser.parse_args()
+
+    stats = compile_store(args.source, args.output)
+    print(
+        f"✅ {stats['labels']} Labels ({stats['names']} Namen, {stats['sections']} Abschnitte) in "
+        f"{stats['seconds']}s kompiliert: {stats['source_bytes'] / 1e6:.1f} MB -> {stats['store_bytes'] / 1e6:.1f} MB"
+    )
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,371 @@
+# Tools_agent/name_resolver.py
+"""Resolve medication names (brands, typos, INN vs. USAN) to canonical active ingredients.
+
+    python -m Tools_agent.name_resolver Dafalgan "acetylsalicylsäure" ibuprofn
+
+Names are compared after normalize_text (umlauts spelled out, diacritics
+and punctuation dropped). A name that is known (alias, ingredient or
+label name) resolves to exactly that ingredient. Otherwise a close known
+name is only accepted as a spelling correction: similar length, edit
+similarity of at least SPELLING_MATCH_THRESHOLD and clearly ahead of the
+next ingredient. Anything else resolves to nothing, since lorazepam and
+diazepam look alike but are different drugs.
+"""
+
+import argparse
+import re
+import threading
+import time
+import unicodedata
+
+# Trigram similarity that makes a known name a candidate for a spelling correction
+NAME_MATCH_THRESHOLD = 0.45
+# A correction needs this edit similarity (1 - distance / length) ...
+SPELLING_MATCH_THRESHOLD = 0.8
+# ... and this lead over the closest name of another ingredient
+SPELLING_MATCH_MARGIN = 0.1
+
+# Brand names and alternative names -> active ingredient, in normalized form.
+# The canonical name is the German/INN spelling; FDA_NAMES maps it to the US label names.
+MEDICATION_ALIASES = {
+    # Paracetamol
+    "dafalgan": "paracetamol",
+    "dafalgan odis": "paracetamol",
+    "panadol": "paracetamol",
+    "ben-u-ron": "paracetamol",
+    "tylenol": "paracetamol",
+    "acetalgin": "paracetamol",
+    "acetaminophen": "paracetamol",
+    # Ibuprofen
+    "algifor": "ibuprofen",
+    "brufen": "ibuprofen",
+    "advil": "ibuprofen",
+    "irfen": "ibuprofen",
+    "dismenol": "ibuprofen",
+    "motrin": "ibuprofen",
+    "nurofen": "ibuprofen",
+    "spedifen": "ibuprofen",
+    # Diclofenac
+    "voltaren": "diclofenac",
+    "voltaren dolo": "diclofenac",
+    "olfen": "diclofenac",
+    "ecofenac": "diclofenac",
+    "inflamac": "diclofenac",
+    # Acetylsalicylsäure
+    "aspirin": "acetylsalicylsaeure",
+    "aspirin cardio": "acetylsalicylsaeure",
+    "alcacyl": "acetylsalicylsaeure",
+    "tiatral": "acetylsalicylsaeure",
+    "acetylsalicylic acid": "acetylsalicylsaeure",
+    "ass": "acetylsalicylsaeure",
+    # Metamizol
+    "novalgin": "metamizol",
+    "minalgin": "metamizol",
+    "metamizole": "metamizol",
+    "dipyrone": "metamizol",
+    # Mefenaminsäure
+    "ponstan": "mefenaminsaeure",
+    "mefenamic acid": "mefenaminsaeure",
+    # Naproxen
+    "aleve": "naproxen",
+    "apranax": "naproxen",
+    "proxen": "naproxen",
+    "naprosyn": "naproxen",
+    # Antihistamines
+    "zyrtec": "cetirizin",
+    "cetirizine": "cetirizin",
+    "xyzal": "levocetirizin",
+    "levocetirizine": "levocetirizin",
+    "claritine": "loratadin",
+    "claritin": "loratadin",
+    "loratadine": "loratadin",
+    "telfast": "fexofenadin",
+    "allegra": "fexofenadin",
+    "fexofenadine": "fexofenadin",
+    "aerius": "desloratadin",
+    "clarinex": "desloratadin",
+    "desloratadine": "desloratadin",
+    # Gastrointestinal
+    "imodium": "loperamid",
+    "loperamide": "loperamid",
+    "antramups": "omeprazol",
+    "omed": "omeprazol",
+    "prilosec": "omeprazol",
+    "omeprazole": "omeprazol",
+    "nexium": "esomeprazol",
+    "esomeprazole": "esomeprazol",
+    "pantozol": "pantoprazol",
+    "protonix": "pantoprazol",
+    "pantoprazole": "pantoprazol",
+    "motilium": "domperidon",
+    "domperidone": "domperidon",
+    # Cardiovascular
+    "sortis": "atorvastatin",
+    "lipitor": "atorvastatin",
+    "crestor": "rosuvastatin",
+    "zocor": "simvastatin",
+    "norvasc": "amlodipin",
+    "amlodipine": "amlodipin",
+    "beloc": "metoprolol",
+    "beloc zok": "metoprolol",
+    "lopressor": "metoprolol",
+    "toprol": "metoprolol",
+    "concor": "bisoprolol",
+    "zestril": "lisinopril",
+    "reniten": "enalapril",
+    "vasotec": "enalapril",
+    "triatec": "ramipril",
+    "altace": "ramipril",
+    "cosaar": "losartan",
+    "cozaar": "losartan",
+    "diovan": "valsartan",
+    "lasix": "furosemid",
+    "furosemide": "furosemid",
+    "eliquis": "apixaban",
+    "xarelto": "rivaroxaban",
+    "marcoumar": "phenprocoumon",
+    "coumadin": "warfarin",
+    "plavix": "clopidogrel",
+    # Diabetes and thyroid
+    "glucophage": "metformin",
+    "euthyrox": "levothyroxin",
+    "eltroxin": "levothyroxin",
+    "synthroid": "levothyroxin",
+    "levothyroxine": "levothyroxin",
+    # Antibiotics
+    "co-amoxi": "amoxicillin-clavulansaeure",
+    "augmentin": "amoxicillin-clavulansaeure",
+    "amoxicillin clavulanate": "amoxicillin-clavulansaeure",
+    "clamoxyl": "amoxicillin",
+    "amoxil": "amoxicillin",
+    "ciproxin": "ciprofloxacin",
+    "cipro": "ciprofloxacin",
+    "zithromax": "azithromycin",
+    "klacid": "clarithromycin",
+    "biaxin": "clarithromycin",
+    "bactrim": "cotrimoxazol",
+    "sulfamethoxazole trimethoprim": "cotrimoxazol",
+    "co-trimoxazole": "cotrimoxazol",
+    # Psychiatry and neurology
+    "cipralex": "escitalopram",
+    "lexapro": "escitalopram",
+    "seropram": "citalopram",
+    "celexa": "citalopram",
+    "zoloft": "sertralin",
+    "sertraline": "sertralin",
+    "fluctine": "fluoxetin",
+    "prozac": "fluoxetin",
+    "fluoxetine": "fluoxetin",
+    "remeron": "mirtazapin",
+    "mirtazapine": "mirtazapin",
+    "temesta": "lorazepam",
+    "ativan": "lorazepam",
+    "valium": "diazepam",
+    "stilnox": "zolpidem",
+    "ambien": "zolpidem",
+    "lyrica": "pregabalin",
+    "neurontin": "gabapentin",
+    "tramal": "tramadol",
+    "ultram": "tramadol",
+    # Respiratory
+    "ventolin": "salbutamol",
+    "albuterol": "salbutamol",
+    "proair": "salbutamol",
+    "singulair": "montelukast",
+}
+
+# Canonical name -> names used on US (OpenFDA) labels, where they differ (USAN vs. INN/German spelling)
+FDA_NAMES = {
+    "paracetamol": ["acetaminophen"],
+    "acetylsalicylsaeure": ["aspirin"],
+    "metamizol": ["dipyrone"],
+    "mefenaminsaeure": ["mefenamic acid"],
+    "cetirizin": ["cetirizine"],
+    "levocetirizin": ["levocetirizine"],
+    "loratadin": ["loratadine"],
+    "fexofenadin": ["fexofenadine"],
+    "desloratadin": ["desloratadine"],
+    "loperamid": ["loperamide"],
+    "omeprazol": ["omeprazole"],
+    "esomeprazol": ["esomeprazole"],
+    "pantoprazol": ["pantoprazole"],
+    "domperidon": ["domperidone"],
+    "amlodipin": ["amlodipine"],
+    "furosemid": ["furosemide"],
+    "levothyroxin": ["levothyroxine"],
+    "amoxicillin-clavulansaeure": ["amoxicillin and clavulanate potassium", "clavulanate"],
+    "cotrimoxazol": ["sulfamethoxazole and trimethoprim"],
+    "sertralin": ["sertraline"],
+    "fluoxetin": ["fluoxetine"],
+    "mirtazapin": ["mirtazapine"],
+    "salbutamol": ["albuterol"],
+}
+
+_UMLAUTS = str.maketrans({"ä": "ae", "ö": "oe", "ü": "ue", "ß": "ss"})
+
+def normalize_text(text):
+    """Case-fold, spell out umlauts, drop other diacritics and punctuation, collapse whitespace."""
+    text = text.casefold().translate(_UMLAUTS)
+    text = unicodedata.normalize("NFKD", text)
+    text = "".join(ch for ch in text if not unicodedata.combining(ch))
+    text = re.sub(r"[^\w\s-]", " ", text)
+    return " ".join(text.split())
+
+def canonical_medication(name):
+    """Exact alias lookup only: the canonical ingredient of a known name, else the normalized name."""
+    normalized = normalize_text(name)
+    return MEDICATION_ALIASES.get(normalized, normalized)
+
+def edit_similarity(a, b):
+    """1 - Levenshtein distance / length of the longer string."""
+    if a == b:
+        return 1.0
+    previous = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, start=1):
+        current = [i]
+        for j, char_b in enumerate(b, start=1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (char_a != char_b)))
+        previous = current
+    return 1 - previous[-1] / max(len(a), len(b))
+
+def _grams(text):
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+# === Resolver ===
+class NameResolver:
+    """Trigram index over all known medication names.
+
+    The vocabulary is the alias table plus, optionally, the names found in
+    the local label data: ``names_source`` returns ``(version, load_names)``
+    and the index is rebuilt (calling ``load_names()``) when the version
+    changes.
+    """
+
+    def __init__(self, names_source=None, threshold=NAME_MATCH_THRESHOLD):
+        self.names_source = names_source
+        self.threshold = threshold
+        self._lock = threading.Lock()
+        self._version = object()
+        self._state = (set(), [], {}, {})
+
+    def _index(self):
+        version, load_names = self.names_source() if self.names_source else (None, tuple)
+        if version == self._version:
+            return self._state
+        with self._lock:
+            if version == self._version:
+                return self._state
+            vocabulary = set(MEDICATION_ALIASES) | set(MEDICATION_ALIASES.values())
+            for fda_names in FDA_NAMES.values():
+                vocabulary.update(fda_names)
+            for name in load_names():
+                # Label name strings list several names; single words are what users type
+                vocabulary.update(word for word in normalize_text(name).split() if len(word) >= 4)
+
+            terms = sorted(vocabulary)
+            sizes, postings = {}, {}
+            for term_id, term in enumerate(terms):
+                grams = _grams(term)
+                sizes[term_id] = len(grams)
+                for gram in grams:
+                    postings.setdefault(gram, []).append(term_id)
+            self._state = (vocabulary, terms, sizes, postings)
+            self._version = version
+        return self._state
+
+    def similar(self, name, limit=5):
+        """Known names closest to ``name`` as [(term, score)], best first (score = trigram Dice coefficient)."""
+        normalized = normalize_text(name)
+        if not normalized:
+            return []
+        _, terms, sizes, postings = self._index()
+        grams = _grams(normalized)
+        shared = {}
+        for gram in grams:
+            for term_id in postings.get(gram, ()):
+                shared[term_id] = shared.get(term_id, 0) + 1
+
+        scored = []
+        for term_id, count in shared.items():
+            score = 2 * count / (len(grams) + sizes[term_id])
+            if score >= self.threshold:
+                scored.append((terms[term_id], round(score, 3)))
+        scored.sort(key=lambda item: (-item[1], item[0]))
+        return scored[:limit]
+
+    def spelling_correction(self, text):
+        """``(canonical, score)`` if ``text`` is a misspelling of exactly one known ingredient, else None."""
+        best = {}
+        for term, _ in self.similar(text, limit=10):
+            canonical = MEDICATION_ALIASES.get(term, term)
+            score = edit_similarity(text, term)
+            # Dropping or adding more than a fifth of the letters is not a typo
+            if abs(len(term) - len(text)) <= max(1, len(text) // 5) and score > best.get(canonical, 0.0):
+                best[canonical] = score
+        ranked = sorted(best.items(), key=lambda item: (-item[1], item[0]))
+        if not ranked or ranked[0][1] < SPELLING_MATCH_THRESHOLD:
+            return None
+        if len(ranked) > 1 and ranked[0][1] - ranked[1][1] < SPELLING_MATCH_MARGIN:
+            return None
+        return ranked[0][0], round(ranked[0][1], 3)
+
+    def resolve(self, name, limit=3):
+        """Canonical ingredients for ``name`` as [(canonical, score)]; score 1.0 means a known name.
+
+        Tries the whole name first, then its single words (e.g. "Dafalgan 500 mg
+        Tabletten"). Known names win over spelling corrections; at most one
+        correction is returned, and nothing if the name is not recognized.
+        """
+        normalized = normalize_text(name)
+        if not normalized:
+            return []
+        vocabulary = self._index()[0]
+        candidates = [normalized] + [word for word in normalized.split() if len(word) >= 4 and word != normalized]
+
+        exact = []
+        for candidate in candidates:
+            if candidate in vocabulary:
+                canonical = MEDICATION_ALIASES.get(candidate, candidate)
+                if canonical not in exact:
+                    exact.append(canonical)
+            if candidate == normalized and exact:
+                break
+        if exact:
+            return [(canonical, 1.0) for canonical in exact[:limit]]
+
+        for candidate in candidates:
+            correction = self.spelling_correction(candidate)
+            if correction is not None:
+                return [correction]
+        return []
+
+    def fda_terms(self, name, limit=3, exact_only=False):
+        """Names to search the US label data with, for the ingredients ``name`` resolves to.
+
+        With ``exact_only`` spelling corrections are left out.
+        """
+        terms = []
+        for canonical, score in self.resolve(name, limit=limit):
+            if exact_only and score < 1.0:
+                continue
+            for term in FDA_NAMES.get(canonical, [canonical]):
+                if term not in terms:
+                    terms.append(term)
+        return terms
+
+name_resolver = NameResolver()
+
+def main():
+    parser = argparse.ArgumentParser(description="Medikamentennamen auf Wirkstoffe auflösen.")
+    parser.add_argument("names", nargs="+")
+    args = parser.parse_args()
+
+    for name in args.names:
+        start = time.perf_counter()
+        candidates = name_resolver.resolve(name)
+        elapsed = (time.perf_counter() - start) * 1000
+        print(f"🔎 {name}: {candidates or '—'} ({elapsed:.2f} ms)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,201 @@
+# Tools_agent/openfda_client.py
+
+import asyncio
+import os
+import random
+import threading
+import time
+import weakref
+
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
+
+OPENFDA_API_URL = os.getenv("OPENFDA_API_URL", "https://api.fda.gov/drug/label.json")
+OPENFDA_POOL_SIZE = int(os.getenv("OPENFDA_POOL_SIZE", "10"))
+OPENFDA_MAX_RETRIES = int(os.getenv("OPENFDA_MAX_RETRIES", "4"))
+OPENFDA_DEADLINE_SECONDS = float(os.getenv("OPENFDA_DEADLINE_SECONDS", "15"))
+# OpenFDA allows 240 requests per minute per key (and per IP without a key)
+OPENFDA_REQUESTS_PER_MINUTE = int(os.getenv("OPENFDA_REQUESTS_PER_MINUTE", "240"))
+OPENFDA_BURST = int(os.getenv("OPENFDA_BURST", "10"))
+
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+
+class OpenFDAError(Exception):
+    pass
+
+class RateLimiter:
+    """Token bucket shared by all requests of a client; ``reserve`` returns how long to wait."""
+
+    def __init__(self, per_minute, burst=OPENFDA_BURST):
+        self.rate = per_minute / 60.0
+        self.capacity = max(1.0, float(burst))
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self, end=None):
+        """Take a token; returns the seconds until it is due, or None (taking nothing) if that is past ``end``."""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            wait = 0.0 if self._tokens >= 1 else (1 - self._tokens) / self.rate
+            if end is not None and now + wait >= end:
+                return None
+            self._tokens -= 1
+            return wait
+
+# One budget for all clients of the process, sync and async
+shared_rate_limiter = RateLimiter(OPENFDA_REQUESTS_PER_MINUTE)
+
+def backoff_delay(attempt, base=0.5, cap=8.0):
+    """Exponential backoff with full jitter."""
+    return random.uniform(0, min(cap, base * 2 ** attempt))
+
+def retry_after_seconds(headers):
+    try:
+        return max(0.0, float(headers.get("Retry-After", "")))
+    except ValueError:
+        return None
+
+class _BaseOpenFDAClient:
+    def __init__(self, base_url=OPENFDA_API_URL, api_key=None, pool_size=OPENFDA_POOL_SIZE,
+                 max_retries=OPENFDA_MAX_RETRIES, deadline=OPENFDA_DEADLINE_SECONDS,
+                 rate_limiter=None):
+        self.base_url = base_url
+        self.api_key = api_key
+        self.pool_size = pool_size
+        self.max_retries = max_retries
+        self.deadline = deadline
+        self.rate_limiter = rate_limiter or shared_rate_limiter
+
+    def _params(self, search, limit):
+        params = {"search": search, "limit": limit}
+        if self.api_key:
+            params["api_key"] = self.api_key
+        return params
+
+    def _next_delay(self, attempt, status_code=None, headers=None):
+        """Seconds to wait before the next attempt, or None if the response is final."""
+        if status_code is not None and status_code not in RETRY_STATUS_CODES:
+            return None
+        retry_after = retry_after_seconds(headers) if headers is not None else None
+        return retry_after if retry_after is not None else backoff_delay(attempt)
+
+    @staticmethod
+    def _results(response):
+        try:
+            return response.json().get("results", [])
+        except (ValueError, AttributeError) as e:
+            raise OpenFDAError(f"Ungültige Antwort der OpenFDA API: {e}") from e
+
+# === Sync Client ===
+class OpenFDAClient(_BaseOpenFDAClient):
+    """Pooled keep-alive client for the OpenFDA label endpoint with retries and a per-request deadline."""
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_size, max_retries=0)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    def search_labels(self, search, limit=3, deadline=None):
+        """Return the ``results`` list for an OpenFDA search expression ([] if nothing matches)."""
+        end = time.monotonic() + (deadline or self.deadline)
+        last_error = None
+
+        for attempt in range(self.max_retries + 1):
+            wait = self.rate_limiter.reserve(end)
+            if wait is None:
+                break
+            time.sleep(wait)
+
+            try:
+                response = self.session.get(
+                    self.base_url, params=self._params(search, limit), timeout=end - time.monotonic()
+                )
+            except requests.RequestException as e:
+                last_error = e
+                delay = self._next_delay(attempt)
+            else:
+                if response.status_code == 404:
+                    # OpenFDA answers "no matches" with 404
+                    return []
+                delay = self._next_delay(attempt, response.status_code, response.headers)
+                if delay is None:
+                    if response.status_code >= 400:
+                        raise OpenFDAError(f"OpenFDA-Anfrage fehlgeschlagen: HTTP {response.status_code}")
+                    return self._results(response)
+                last_error = OpenFDAError(f"HTTP {response.status_code}")
+
+            if time.monotonic() + delay >= end:
+                break
+            time.sleep(delay)
+
+        raise OpenFDAError(f"OpenFDA-Anfrage fehlgeschlagen: {last_error or 'Zeitlimit überschritten'}")
+
+    def close(self):
+        self.session.close()
+
+# === Async Client ===
+class AsyncOpenFDAClient(_BaseOpenFDAClient):
+    """Async counterpart of OpenFDAClient on a pooled httpx.AsyncClient.
+
+    An httpx.AsyncClient belongs to the event loop it was first used on, so
+    one is kept per running loop (e.g. the API's and an ``asyncio.run`` in a
+    script); it goes away with its loop.
+    """
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self._clients = weakref.WeakKeyDictionary()
+
+    def _http(self):
+        loop = asyncio.get_running_loop()
+        client = self._clients.get(loop)
+        if client is None:
+            client = self._clients[loop] = httpx.AsyncClient(
+                limits=httpx.Limits(max_connections=self.pool_size, max_keepalive_connections=self.pool_size),
+            )
+        return client
+
+    async def search_labels(self, search, limit=3, deadline=None):
+        end = time.monotonic() + (deadline or self.deadline)
+        last_error = None
+
+        for attempt in range(self.max_retries + 1):
+            wait = self.rate_limiter.reserve(end)
+            if wait is None:
+                break
+            await asyncio.sleep(wait)
+
+            try:
+                response = await self._http().get(
+                    self.base_url, params=self._params(search, limit), timeout=end - time.monotonic()
+                )
+            except httpx.HTTPError as e:
+                last_error = e
+                delay = self._next_delay(attempt)
+            else:
+                if response.status_code == 404:
+                    return []
+                delay = self._next_delay(attempt, response.status_code, response.headers)
+                if delay is None:
+                    if response.status_code >= 400:
+                        raise OpenFDAError(f"OpenFDA-Anfrage fehlgeschlagen: HTTP {response.status_code}")
+                    return self._results(response)
+                last_error = OpenFDAError(f"HTTP {response.status_code}")
+
+            if time.monotonic() + delay >= end:
+                break
+            await asyncio.sleep(delay)
+
+        raise OpenFDAError(f"OpenFDA-Anfrage fehlgeschlagen: {last_error or 'Zeitlimit überschritten'}")
+
+    async def aclose(self):
+        """Close the client of the running event loop."""
+        client = self._clients.pop(asyncio.get_running_loop(), None)
+        if client is not None:
+            await client.aclose()
@@ -2,27 +2,25 @@
 
 import os
 import json
-import requests
-import streamlit as st
-
-# tools/openfda_tool.py
-
-import os
-import json
-import requests
-import streamlit as st
+import threading
+from Tools_agent.config import get_secret, shared_client
+from Tools_agent.executor import run_blocking
+from Tools_agent.fda_store import fda_label_store
+from Tools_agent.name_resolver import NameResolver, normalize_text
+from Tools_agent.output_budget import TOOL_OUTPUT_TOKENS, budget_output, current_question_type
+from Tools_agent.singleflight import async_tool_flight, coalesce, coalesce_async, normalize_key, tool_flight
+from Tools_agent.openfda_client import OPENFDA_API_URL, AsyncOpenFDAClient, OpenFDAClient, OpenFDAError
 
 LOCAL_DATA_PATH = "data/dataset.json"
-OPENFDA_API_URL = "https://api.fda.gov/drug/label.json"
 
 # === Load Local FDA Data ===
-def load_local_fda_data():
-    if not os.path.exists(LOCAL_DATA_PATH):
+def load_local_fda_data(path=LOCAL_DATA_PATH):
+    if not os.path.exists(path):
         print("⚠️ Lokale FDA-Daten nicht gefunden.")
         return []
 
     try:
-        with open(LOCAL_DATA_PATH, "r", encoding="utf-8") as f:
+        with open(path, "r", encoding="utf-8") as f:
             data = json.load(f)
         if isinstance(data, dict):
             return data.get("results", [])
@@ -36,99 +34,343 @@ def load_local_fda_data():
         return []
 
 # === Combine all relevant fields nicely ===
-def format_full_fda_entry(entry):
-    """Format all important fields nicely together."""
-    sections = []
+FIELD_MAPPING = {
+    "indications_and_usage": "📖 Indikationen und Anwendungsgebiete",
+    "dosage_and_administration": "💉 Dosierung und Anwendung",
+    "warnings": "⚠️ Warnhinweise",
+    "pregnancy_or_breast_feeding": "🤰 Schwangerschaft / Stillzeit",
+    "storage_and_handling": "📦 Lagerung und Handhabung",
+    "adverse_reactions": "⚡ Nebenwirkungen",
+    "stop_use": "🛑 Anwendung stoppen wenn...",
+    "do_not_use": "🚫 Nicht verwenden wenn...",
+    "purpose": "🎯 Zweck der Behandlung",
+    "active_ingredient": "🧪 Aktive Inhaltsstoffe",
+    "inactive_ingredient": "🧪 Inaktive Inhaltsstoffe",
+    "questions": "❓ Fragen oder Kommentare",
+    "clinical_pharmacology": "🧬 Klinische Pharmakologie",
+    "contraindications": "❌ Kontraindikationen",
+    "how_supplied": "📦 Verpackung und Lieferung"
+}
+
+NO_SECTIONS_MESSAGE = "❗ Keine relevanten Informationen gefunden."
+
+# Keyword -> label sections that answer it, checked in order. A keyword matches the
+# beginning of whole words of the normalized question type ("warnung" matches
+# "Warnungen", "wirkung" does not match "Nebenwirkungen" or "Wechselwirkungen").
+# Question types without an entry get all sections.
+QUESTION_SECTIONS = [
+    ("nebenwirkung", ["adverse_reactions"]),
+    ("schwangerschaft", ["pregnancy_or_breast_feeding"]),
+    ("stillzeit", ["pregnancy_or_breast_feeding"]),
+    ("warnung", ["warnings", "do_not_use", "stop_use", "contraindications"]),
+    ("kontraindikation", ["contraindications", "do_not_use"]),
+    ("dosierung", ["dosage_and_administration"]),
+    ("inhaltsstoff", ["active_ingredient", "inactive_ingredient"]),
+    ("wirkstoff", ["active_ingredient"]),
+    ("lagern", ["storage_and_handling"]),
+    ("lagerung", ["storage_and_handling"]),
+    ("haltbar", ["storage_and_handling"]),
+    ("wirkung", ["indications_and_usage", "purpose"]),
+    ("anwendungsgebiet", ["indications_and_usage", "purpose"]),
+    ("wie wird", ["dosage_and_administration"]),
+]
+
+# Interaction questions need the whole label
+WHOLE_LABEL_KEYWORDS = ("interaktion", "wechselwirkung")
 
-    FIELD_MAPPING = {
-        "indications_and_usage": "📖 Indikationen und Anwendungsgebiete",
-        "dosage_and_administration": "💉 Dosierung und Anwendung",
-        "warnings": "⚠️ Warnhinweise",
-        "pregnancy_or_breast_feeding": "🤰 Schwangerschaft / Stillzeit",
-        "storage_and_handling": "📦 Lagerung und Handhabung",
-        "adverse_reactions": "⚡ Nebenwirkungen",
-        "stop_use": "🛑 Anwendung stoppen wenn...",
-        "do_not_use": "🚫 Nicht verwenden wenn...",
-        "purpose": "🎯 Zweck der Behandlung",
-        "active_ingredient": "🧪 Aktive Inhaltsstoffe",
-        "inactive_ingredient": "🧪 Inaktive Inhaltsstoffe",
-        "questions": "❓ Fragen oder Kommentare",
-        "clinical_pharmacology": "🧬 Klinische Pharmakologie",
-        "contraindications": "❌ Kontraindikationen",
-        "how_supplied": "📦 Verpackung und Lieferung"
-    }
-
-    for key, title in FIELD_MAPPING.items():
+def _has_keyword(words, keyword):
+    parts = keyword.split()
+    return any(
+        all(word.startswith(part) for word, part in zip(words[i:], parts))
+        for i in range(len(words) - len(parts) + 1)
+    )
+
+def sections_for(question_type):
+    """FIELD_MAPPING keys that answer a question type, or None if it needs the whole label."""
+    if not question_type:
+        return None
+    words = normalize_text(question_type).split()
+    if any(_has_keyword(words, keyword) for keyword in WHOLE_LABEL_KEYWORDS):
+        return None
+    for keyword, fields in QUESTION_SECTIONS:
+        if _has_keyword(words, keyword):
+            return fields
+    return None
+
+def render_sections(entry):
+    """Rendered sections of a label as (position, field, markdown), in FIELD_MAPPING order."""
+    sections = []
+    for position, (key, title) in enumerate(FIELD_MAPPING.items()):
         if key in entry and isinstance(entry[key], list):
             content = entry[key][0]  # Only the first item
-            sections.append(f"### {title}\n{content}")
+            sections.append((position, key, f"### {title}\n{content}"))
+    return sections
+
+def format_full_fda_entry(entry):
+    """Format all important fields nicely together."""
+    sections = [rendered for _, _, rendered in render_sections(entry)]
 
     if sections:
         return "\n\n".join(sections)
     else:
-        return "❗ Keine relevanten Informationen gefunden."
+        return NO_SECTIONS_MESSAGE
+
+# === Local Name Index ===
+def searchable_text(entry):
+    """Lowercased brand, generic and substance names of a label, as matched by the local search."""
+    openfda = entry.get("openfda", {})
+    searchable_fields = (
+        openfda.get("brand_name", []) +
+        openfda.get("generic_name", []) +
+        openfda.get("substance_name", [])
+    )
+    return " ".join(searchable_fields).lower()
+
+def _trigrams(text):
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+class LocalFDAIndex:
+    """Keep the local FDA labels in memory with a name index, reloaded when the file's mtime changes.
+
+    Identical name strings are stored once and mapped to the offsets of all
+    labels that share them. A trigram index narrows a query down to the few
+    names that can contain it, and a final substring check keeps the results
+    identical to a full scan.
+    """
+
+    def __init__(self, path=LOCAL_DATA_PATH):
+        self.path = path
+        self._mtime = None
+        self._lock = threading.Lock()
+        self._state = ([], [], [], {})
+
+    def _current_mtime(self):
+        try:
+            return os.path.getmtime(self.path)
+        except OSError:
+            return None
+
+    def _refresh(self):
+        mtime = self._current_mtime()
+        if mtime == self._mtime:
+            return
+        with self._lock:
+            if mtime == self._mtime:
+                return
+            entries = load_local_fda_data(self.path)
+            texts, offsets, trigrams = [], [], {}
+            text_ids = {}
+            for offset, entry in enumerate(entries):
+                text = searchable_text(entry)
+                text_id = text_ids.get(text)
+                if text_id is None:
+                    text_id = text_ids[text] = len(texts)
+                    texts.append(text)
+                    offsets.append([])
+                    for gram in _trigrams(text):
+                        trigrams.setdefault(gram, set()).add(text_id)
+                offsets[text_id].append(offset)
+            # Swap the whole state at once so concurrent searches never mix two versions
+            self._state = (entries, texts, offsets, trigrams)
+            self._mtime = mtime
+            print(f"📦 Lokale FDA-Daten indexiert: {len(entries)} Einträge, {len(texts)} Namen.")
+
+    def search(self, query):
+        """Return all entries whose names contain ``query`` (case-insensitive), in file order."""
+        self._refresh()
+        entries, texts, offsets, trigrams = self._state
+        query = query.lower()
+
+        if len(query) >= 3:
+            postings = sorted((trigrams.get(gram, set()) for gram in _trigrams(query)), key=len)
+            candidates = set.intersection(*postings) if postings[0] else set()
+        else:
+            candidates = range(len(texts))
+
+        matched = []
+        for text_id in candidates:
+            if query in texts[text_id]:
+                matched.extend(offsets[text_id])
+        return [entries[offset] for offset in sorted(matched)]
+
+    def version(self):
+        self._refresh()
+        return self._mtime
+
+    def names(self):
+        """All distinct label name strings."""
+        self._refresh()
+        return list(self._state[1])
+
+    def __len__(self):
+        self._refresh()
+        return len(self._state[0])
+
+local_fda_index = LocalFDAIndex()
+
+def _label_names():
+    """Names for the resolver, from whichever local source search_openfda_local uses."""
+    source = fda_label_store if fda_label_store.available() else local_fda_index
+    return (source, source.version()), source.names
+
+# Typos, Swiss brand names and INN spellings -> names as they appear on the US labels
+fda_name_resolver = NameResolver(names_source=_label_names)
 
 # === Local Search ===
+def _local_terms(query, exact_only=False):
+    """The query itself, then the US label names it resolves to (brand, typo, INN vs. USAN).
+
+    With ``exact_only`` nothing is returned unless the query is a known name
+    (alias, ingredient or label name), and spelling corrections are skipped.
+    """
+    if exact_only and not any(score == 1.0 for _, score in fda_name_resolver.resolve(query)):
+        return
+    yield query
+    normalized = normalize_text(query)
+    for term in fda_name_resolver.fda_terms(query, exact_only=exact_only):
+        if term != normalized:
+            yield term
+
 def search_openfda_local(query):
-    """Search locally stored OpenFDA data and format full document."""
-    results = load_local_fda_data()
-    if not results:
+    """Search locally stored OpenFDA data and format the matching labels.
+
+    Without a direct name match, the query is resolved to its active
+    ingredient (brand, typo, INN vs. USAN) and searched again under that
+    name. Within a question_context only the sections relevant to the
+    question type are returned; near-identical labels are listed once and
+    the output is cut to the tool token budget.
+    """
+    fields = sections_for(current_question_type())
+    term, labels, skipped_chars = _select_local_labels(query, fields)
+    if fields and not labels:
+        # None of the labels has the relevant sections, show everything instead
+        term, labels, skipped_chars = _select_local_labels(query, None)
+    if not labels:
         return None
 
-    query = query.lower()
-    matches = []
+    result = "\n\n---\n\n".join("\n\n".join(rendered for _, rendered in sections) for sections in labels)
+    if term != query:
+        print(f"🔎 '{query}' aufgelöst zu '{term}'.")
+        result = f"🔎 Ergebnisse für '{term}' (gesucht: '{query}')\n\n{result}"
+    return budget_output("OpenFDATool", result, skipped_tokens=skipped_chars // 4)
 
-    for entry in results:
-        openfda = entry.get("openfda", {})
-        searchable_fields = (
-            openfda.get("brand_name", []) +
-            openfda.get("generic_name", []) +
-            openfda.get("substance_name", [])
-        )
-        searchable_text = " ".join(searchable_fields).lower()
+def find_local_sections(query, fields, limit=3, exact_only=False):
+    """Selected FIELD_MAPPING sections of the local labels for a medication.
 
-        if query in searchable_text:
-            formatted = format_full_fda_entry(entry)
-            matches.append(formatted)
+    Returns ``(term, labels)``: the name that matched (see search_openfda_local)
+    and up to ``limit`` labels as lists of (field, rendered) that have at
+    least one of ``fields``. Near-identical labels are returned once. With
+    ``exact_only`` only known names count, no spelling corrections.
+    """
+    term, labels, _ = _select_local_labels(query, fields, limit=limit, exact_only=exact_only)
+    return term, labels
 
-    if matches:
-        return "\n\n---\n\n".join(matches)
-    return None
+def _select_local_labels(query, fields=None, limit=None, max_chars=None, exact_only=False):
+    """Distinct labels of the first matching name, until ``limit`` labels or ``max_chars`` are reached.
+
+    Returns ``(term, labels, skipped_chars)``, where skipped_chars estimates
+    how much of the full rendering of all matches was left out.
+    """
+    max_chars = max_chars or TOOL_OUTPUT_TOKENS * 4
+    fields = set(fields) if fields else None
+    for term in _local_terms(query, exact_only):
+        handles, sections_of = _local_labels(term)
+        labels, deduplicator = [], NearDuplicateFilter()
+        full_chars = output_chars = visited = 0
+        for handle in handles:
+            if output_chars >= max_chars or (limit and len(labels) >= limit):
+                break
+            visited += 1
+            sections = sections_of(handle)
+            full_chars += sum(len(rendered) + 2 for _, rendered in sections)
+            if fields is not None:
+                sections = [(field, rendered) for field, rendered in sections if field in fields]
+            text = "\n\n".join(rendered for _, rendered in sections)
+            if not sections or deduplicator.is_duplicate(text):
+                continue
+            labels.append(sections)
+            output_chars += len(text)
+        if labels:
+            # Labels that were never rendered are assumed to be as long as the average rendered one
+            full_chars += (len(handles) - visited) * full_chars // visited
+            return term, labels, max(0, full_chars - output_chars)
+    return None, [], 0
+
+def _local_labels(query):
+    """Matching labels as (handles, sections_of): sections_of(handle) renders one label lazily."""
+    if fda_label_store.available():
+        # Precompiled store (python -m Tools_agent.fda_store): no JSON parsing, sections already rendered
+        return fda_label_store.search_offsets(query), fda_label_store.sections
+    if len(local_fda_index):
+        return local_fda_index.search(query), lambda entry: [(key, rendered) for _, key, rendered in render_sections(entry)]
+    return [], None
+
+# === Near-Duplicate Labels ===
+# Labels (or their selected sections) sharing this fraction of word 5-grams count as the same text
+NEAR_DUPLICATE_SIMILARITY = float(os.getenv("NEAR_DUPLICATE_SIMILARITY", "0.85"))
+
+def _shingles(text, size=5):
+    words = text.lower().split()
+    return {" ".join(words[i:i + size]) for i in range(max(1, len(words) - size + 1))}
+
+class NearDuplicateFilter:
+    """Remembers the texts it has seen; the same label from another manufacturer is a duplicate."""
+
+    def __init__(self, threshold=NEAR_DUPLICATE_SIMILARITY):
+        self.threshold = threshold
+        self._seen = []
+
+    def is_duplicate(self, text):
+        shingles = _shingles(text)
+        for seen in self._seen:
+            if len(shingles & seen) / len(shingles | seen) >= self.threshold:
+                return True
+        self._seen.append(shingles)
+        return False
 
 # === Live OpenFDA API Search ===
-def search_openfda_api(query, limit=3):
-    print("🌐 Anfrage an OpenFDA API wird gestartet...")
+def get_openfda_client(kind="sync"):
+    """Shared pooled OpenFDA client (``"sync"`` or ``"async"``), built on first use."""
+    client_class = AsyncOpenFDAClient if kind == "async" else OpenFDAClient
+    return shared_client(
+        f"openfda_{kind}",
+        lambda: client_class(base_url=OPENFDA_API_URL, api_key=get_secret("openfda", "OPENFDA_API_KEY", required=False)),
+    )
 
-    params = {
-        "search": f'indications_and_usage:"{query}"',
-        "limit": limit
-    }
-    api_key = st.secrets["openfda"]["OPENFDA_API_KEY"]
-    if api_key:
-        params["api_key"] = api_key
+def _api_search(query):
+    return f'indications_and_usage:"{query}"'
 
+def _format_api_results(results):
+    """Full API labels, cut to the tool token budget like the local results."""
+    api_matches = [format_full_fda_entry(entry) for entry in results]
+    if api_matches:
+        return budget_output("OpenFDATool", "\n\n---\n\n".join(api_matches))
+    return None
+
+def search_openfda_api(query, limit=3):
+    print("🌐 Anfrage an OpenFDA API wird gestartet...")
     try:
-        response = requests.get(OPENFDA_API_URL, params=params, timeout=10)
-        response.raise_for_status()
-    except requests.RequestException as e:
+        results = get_openfda_client().search_labels(_api_search(query), limit=limit)
+    except OpenFDAError as e:
         print(f"❗ Fehler bei der OpenFDA API-Anfrage: {e}")
         return None
+    return _format_api_results(results)
 
-    data = response.json()
-    results = data.get("results", [])
-    if not results:
+async def asearch_openfda_api(query, limit=3):
+    print("🌐 Anfrage an OpenFDA API wird gestartet...")
+    try:
+        results = await get_openfda_client("async").search_labels(_api_search(query), limit=limit)
+    except OpenFDAError as e:
+        print(f"❗ Fehler bei der OpenFDA API-Anfrage: {e}")
         return None
-
-    api_matches = []
-    for entry in results:
-        formatted = format_full_fda_entry(entry)
-        api_matches.append(formatted)
-
-    if api_matches:
-        return "\n\n---\n\n".join(api_matches)
-    return None
+    return _format_api_results(results)
 
 # === Unified Search ===
+def _search_key(query, limit=3):
+    # The output depends on the question type (section selection), so it is part of the key
+    return normalize_key(query), limit, current_question_type()
+
+@coalesce(tool_flight, _search_key)
 def search_openfda(query, limit=3):
     """First search local data, then fallback to live OpenFDA API. Return full document formatted."""
     print(f"🧠 Suche nach '{query}' gestartet...")
@@ -147,3 +389,22 @@ def search_openfda(query, limit=3):
 
     print("❗ Keine Informationen gefunden.")
     return None
+
+@coalesce_async(async_tool_flight, _search_key)
+async def asearch_openfda(query, limit=3):
+    """Async variant of search_openfda: local lookup on the tool pool, API call on the async client."""
+    print(f"🧠 Suche nach '{query}' gestartet...")
+
+    local_result = await run_blocking(search_openfda_local, query)
+    if local_result:
+        print("✅ Treffer in lokalen FDA-Daten gefunden!")
+        return local_result
+
+    print("❌ Keine lokalen Treffer. Wechsle zur Online-Suche...")
+    online_result = await asearch_openfda_api(query, limit=limit)
+    if online_result:
+        print("✅ Treffer in OpenFDA API erhalten!")
+        return online_result
+
+    print("❗ Keine Informationen gefunden.")
+    return None
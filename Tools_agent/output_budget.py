@@ -0,0 +1,99 @@
+# Tools_agent/output_budget.py
+
+import contextvars
+import os
+from contextlib import contextmanager
+
+from Tools_agent.config import shared_client
+from Tools_agent.tracing import metrics
+
+# Tool outputs are cut to this many tokens before they reach the LLM (and its scratchpad)
+TOOL_OUTPUT_TOKENS = int(os.getenv("TOOL_OUTPUT_TOKENS", "1500"))
+TOKEN_MODEL = os.getenv("TOKEN_MODEL", "gpt-4o")
+TOKEN_BUCKETS = (50, 100, 250, 500, 1000, 1500, 2500, 5000, 10000, 25000, 50000)
+
+# === Request Context ===
+# Question type of the running query, so tools can pick the relevant sections;
+# and the per-request token tally, shared by reference with executor threads.
+_question_type = contextvars.ContextVar("question_type", default=None)
+_token_tally = contextvars.ContextVar("token_tally", default=None)
+
+@contextmanager
+def question_context(question_type):
+    """Make ``question_type`` visible to tools called inside the block; yields the request's token tally."""
+    tally = {"calls": 0, "tokens_in": 0, "tokens_out": 0, "saved": 0}
+    type_token = _question_type.set(question_type)
+    tally_token = _token_tally.set(tally)
+    try:
+        yield tally
+    finally:
+        _question_type.reset(type_token)
+        _token_tally.reset(tally_token)
+
+def current_question_type():
+    return _question_type.get()
+
+def log_token_savings(tally):
+    if tally["saved"]:
+        print(f"✂️ {tally['saved']} Tokens in {tally['calls']} Tool-Ausgaben eingespart "
+              f"({tally['tokens_in']} -> {tally['tokens_out']}).")
+
+# === Token Counting ===
+class _ApproxEncoding:
+    """Stand-in when the tiktoken encoding cannot be loaded: about four characters per token."""
+
+    def encode(self, text):
+        return range(0, len(text), 4)
+
+    def decode_prefix(self, text, tokens):
+        return text[:tokens * 4]
+
+def get_encoding():
+    def build():
+        try:
+            import tiktoken
+            return tiktoken.encoding_for_model(TOKEN_MODEL)
+        except Exception as e:
+            print(f"⚠️ tiktoken nicht verfügbar, Tokens werden geschätzt: {e}")
+            return _ApproxEncoding()
+    return shared_client("tiktoken_encoding", build)
+
+def count_tokens(text):
+    return len(get_encoding().encode(text))
+
+def truncate_tokens(text, max_tokens):
+    """``text`` cut to at most ``max_tokens`` tokens; returns (text, tokens before, tokens after)."""
+    encoding = get_encoding()
+    tokens = encoding.encode(text)
+    if len(tokens) <= max_tokens:
+        return text, len(tokens), len(tokens)
+    if isinstance(encoding, _ApproxEncoding):
+        return encoding.decode_prefix(text, max_tokens), len(tokens), max_tokens
+    return encoding.decode(tokens[:max_tokens]), len(tokens), max_tokens
+
+# === Budget ===
+def budget_output(tool, text, max_tokens=None, skipped_tokens=0):
+    """Cut a tool output to the token budget and record what was saved.
+
+    ``skipped_tokens`` counts content the tool already left out on its own
+    (e.g. unselected sections), so the savings include it.
+    """
+    if not text:
+        return text
+    max_tokens = max_tokens or TOOL_OUTPUT_TOKENS
+    budgeted, tokens_in, tokens_out = truncate_tokens(text, max_tokens)
+    if tokens_out < tokens_in:
+        budgeted = budgeted.rstrip() + f"\n\n… [gekürzt auf {tokens_out} von {tokens_in} Tokens]"
+    tokens_in += skipped_tokens
+
+    metrics.observe("tool_output_tokens", tokens_out, buckets=TOKEN_BUCKETS, tool=tool,
+                    help="Tokens of tool outputs after budgeting")
+    metrics.inc("tool_tokens_saved_total", tokens_in - tokens_out, tool=tool,
+                help="Tokens left out of tool outputs by section selection, deduplication and budget")
+    tally = _token_tally.get()
+    if tally is not None:
+        tally["calls"] += 1
+        tally["tokens_in"] += tokens_in
+        tally["tokens_out"] += tokens_out
+        tally["saved"] += tokens_in - tokens_out
+    return budgeted
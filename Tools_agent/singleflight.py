@@ -0,0 +1,125 @@
+# Tools_agent/singleflight.py
+
+import asyncio
+import functools
+import threading
+
+from Tools_agent.tracing import metrics
+
+# === Blocking Calls ===
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+
+class SingleFlight:
+    """Coalesce concurrent identical blocking calls: the first caller runs ``func``, the others wait for it.
+
+    Only calls that overlap in time are shared; nothing is cached afterwards.
+    Exceptions are raised in every caller.
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self._lock = threading.Lock()
+        self._calls = {}
+        self._counters = {"executed": 0, "shared": 0}
+
+    def do(self, key, func, *args, **kwargs):
+        """Return ``(value, shared)``; ``shared`` is True if another caller's execution was reused."""
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+            self._counters["executed" if leader else "shared"] += 1
+
+        if not leader:
+            metrics.inc("singleflight_shared_total", flight=self.name, help="Calls answered by an identical in-flight call")
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.value, True
+
+        try:
+            call.value = func(*args, **kwargs)
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.value, False
+
+    def stats(self):
+        with self._lock:
+            return {**self._counters, "in_flight": len(self._calls)}
+
+# === Coroutines ===
+class AsyncSingleFlight:
+    """Coalesce concurrent identical coroutines on one event loop.
+
+    The shared work runs as its own task, so a caller that is cancelled
+    (e.g. a client disconnect) does not cancel it for the others.
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self._tasks = {}
+        self._counters = {"executed": 0, "shared": 0}
+
+    async def do(self, key, factory):
+        """Await ``factory()`` once per key in flight; returns ``(value, shared)``."""
+        loop = asyncio.get_running_loop()
+        flight_key = (id(loop), key)
+        task = self._tasks.get(flight_key)
+        shared = task is not None
+        if shared:
+            self._counters["shared"] += 1
+            metrics.inc("singleflight_shared_total", flight=self.name, help="Calls answered by an identical in-flight call")
+        else:
+            self._counters["executed"] += 1
+            task = self._tasks[flight_key] = loop.create_task(factory())
+            task.add_done_callback(lambda _: self._tasks.pop(flight_key, None))
+        return await asyncio.shield(task), shared
+
+    def stats(self):
+        return {**self._counters, "in_flight": len(self._tasks)}
+
+def normalize_key(text):
+    return " ".join(str(text).casefold().split())
+
+def _default_key(args, kwargs):
+    return tuple(normalize_key(a) for a in args), tuple(sorted(kwargs.items()))
+
+def coalesce(flight, key_func=None):
+    """Decorator: concurrent calls of a blocking function with the same key share one execution.
+
+    ``key_func(*args, **kwargs)`` defaults to the normalized arguments; the
+    function's name is always part of the key.
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            key = (func.__qualname__, key_func(*args, **kwargs) if key_func else _default_key(args, kwargs))
+            value, _ = flight.do(key, func, *args, **kwargs)
+            return value
+        return wrapper
+    return decorator
+
+def coalesce_async(flight, key_func=None):
+    """Async counterpart of ``coalesce`` for coroutine functions."""
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            key = (func.__qualname__, key_func(*args, **kwargs) if key_func else _default_key(args, kwargs))
+            value, _ = await flight.do(key, lambda: func(*args, **kwargs))
+            return value
+        return wrapper
+    return decorator
+
+# Process-wide flights for tool calls
+tool_flight = SingleFlight("tools")
+async_tool_flight = AsyncSingleFlight("tools")
@@ -0,0 +1,189 @@
+# Tools_agent/tavily_cache.py
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from Tools_agent.singleflight import tool_flight
+from Tools_agent.tracing import record_cache
+
+TAVILY_CACHE_PATH = os.getenv("TAVILY_CACHE_PATH", "data/tavily_cache.sqlite")
+TAVILY_CACHE_SIZE = int(os.getenv("TAVILY_CACHE_SIZE", "512"))
+# Expired rows are deleted on write, at most this often
+TAVILY_CACHE_PURGE_SECONDS = int(os.getenv("TAVILY_CACHE_PURGE_SECONDS", "600"))
+
+# Seconds a cached response stays valid, per tool. Alerts and recalls change
+# much faster than Compendium monographs.
+TOOL_TTLS = {
+    "compendium": int(os.getenv("TAVILY_TTL_COMPENDIUM", str(7 * 24 * 3600))),
+    "tavily": int(os.getenv("TAVILY_TTL_WEB", str(24 * 3600))),
+    "alerts": int(os.getenv("TAVILY_TTL_ALERTS", str(3600))),
+}
+
+def normalize_query(query):
+    """Case-fold and collapse whitespace so trivially different queries share a cache entry."""
+    return " ".join(query.casefold().split())
+
+def make_cache_key(tool, query, **params):
+    payload = json.dumps(
+        {"tool": tool, "query": normalize_query(query), "params": params},
+        sort_keys=True,
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+# === Two-tier Cache ===
+class TavilyCache:
+    """In-memory LRU in front of a SQLite table, both with per-entry expiry.
+
+    The LRU and the SQLite connection have separate locks, so memory hits
+    never wait for a disk read or write of another thread.
+    """
+
+    def __init__(self, path=TAVILY_CACHE_PATH, max_entries=TAVILY_CACHE_SIZE, purge_interval=TAVILY_CACHE_PURGE_SECONDS):
+        self.path = path
+        self.max_entries = max_entries
+        self.purge_interval = purge_interval
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._db_lock = threading.Lock()
+        self._conn = None
+        self._last_purge = 0.0
+        self._counters = {
+            "hits": 0,
+            "memory_hits": 0,
+            "disk_hits": 0,
+            "misses": 0,
+            "evictions": 0,
+            "expired": 0,
+            "purged": 0,
+        }
+
+    def _db(self):
+        if self._conn is None:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS tavily_cache ("
+                "key TEXT PRIMARY KEY, tool TEXT, created_at REAL, expires_at REAL, response TEXT)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS tavily_cache_expires_at ON tavily_cache (expires_at)")
+            conn.commit()
+            self._conn = conn
+        return self._conn
+
+    def _remember(self, key, expires_at, value):
+        self._memory[key] = (expires_at, value)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+            self._counters["evictions"] += 1
+
+    def get(self, key):
+        now = time.time()
+        with self._lock:
+            cached = self._memory.get(key)
+            if cached is not None:
+                expires_at, value = cached
+                if expires_at > now:
+                    self._memory.move_to_end(key)
+                    self._counters["hits"] += 1
+                    self._counters["memory_hits"] += 1
+                    return value
+                del self._memory[key]
+                self._counters["expired"] += 1
+
+        with self._db_lock:
+            try:
+                row = self._db().execute(
+                    "SELECT expires_at, response FROM tavily_cache WHERE key = ?", (key,)
+                ).fetchone()
+            except sqlite3.Error as e:
+                print(f"❗ Fehler beim Lesen des Tavily-Caches: {e}")
+                row = None
+
+        value = json.loads(row[1]) if row is not None and row[0] > now else None
+        with self._lock:
+            if value is not None:
+                self._remember(key, row[0], value)
+                self._counters["hits"] += 1
+                self._counters["disk_hits"] += 1
+                return value
+            if row is not None:
+                self._counters["expired"] += 1
+            self._counters["misses"] += 1
+            return None
+
+    def set(self, key, tool, value, ttl):
+        now = time.time()
+        expires_at = now + ttl
+        with self._lock:
+            self._remember(key, expires_at, value)
+        with self._db_lock:
+            try:
+                self._purge_expired(now)
+                self._db().execute(
+                    "INSERT OR REPLACE INTO tavily_cache (key, tool, created_at, expires_at, response) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    (key, tool, now, expires_at, json.dumps(value, ensure_ascii=False)),
+                )
+                self._db().commit()
+            except sqlite3.Error as e:
+                print(f"❗ Fehler beim Schreiben des Tavily-Caches: {e}")
+
+    def _purge_expired(self, now):
+        """Delete expired rows; runs on write, at most every ``purge_interval`` seconds."""
+        if now - self._last_purge < self.purge_interval:
+            return
+        self._last_purge = now
+        deleted = self._db().execute("DELETE FROM tavily_cache WHERE expires_at <= ?", (now,)).rowcount
+        with self._lock:
+            self._counters["purged"] += deleted
+
+    def clear(self, tool=None):
+        """Drop all cached responses, or only those of one tool."""
+        with self._lock:
+            self._memory.clear()
+        with self._db_lock:
+            try:
+                if tool is None:
+                    self._db().execute("DELETE FROM tavily_cache")
+                else:
+                    self._db().execute("DELETE FROM tavily_cache WHERE tool = ?", (tool,))
+                self._db().commit()
+            except sqlite3.Error as e:
+                print(f"❗ Fehler beim Leeren des Tavily-Caches: {e}")
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._counters)
+            stats["memory_entries"] = len(self._memory)
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = stats["hits"] / lookups if lookups else 0.0
+        return stats
+
+tavily_cache = TavilyCache()
+
+def cached_search(client, tool, query, **params):
+    """Call ``client.search`` through the cache so repeated queries never reach the network.
+
+    Concurrent misses for the same key share one request.
+    """
+    key = make_cache_key(tool, query, **params)
+    results = tavily_cache.get(key)
+    record_cache(f"tavily_{tool}", results is not None)
+    if results is not None:
+        return results
+
+    def fetch():
+        results = client.search(query=query, **params)
+        tavily_cache.set(key, tool, results, TOOL_TTLS[tool])
+        return results
+
+    results, _ = tool_flight.do(("tavily", key), fetch)
+    return results
@@ -0,0 +1,276 @@
+# Tools_agent/tracing.py
+
+import contextvars
+import os
+import threading
+import time
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+METRICS_PREFIX = os.getenv("METRICS_PREFIX", "compendium_bot")
+
+# Bucket upper bounds: seconds for durations, characters for payload sizes
+SECONDS_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 40)
+CHARS_BUCKETS = (100, 500, 1000, 2500, 5000, 10000, 25000, 50000, 100000)
+
+# === Metrics Registry ===
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.count += 1
+        self.sum += value
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+
+class MetricsRegistry:
+    """Process-wide counters and histograms, rendered in the Prometheus text format."""
+
+    def __init__(self, prefix=METRICS_PREFIX):
+        self.prefix = prefix
+        self._lock = threading.Lock()
+        self._histograms = {}
+        self._counters = {}
+        self._gauges = {}
+        self._help = {}
+
+    def observe(self, name, value, buckets=SECONDS_BUCKETS, help="", **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            if key not in self._histograms:
+                self._histograms[key] = Histogram(buckets)
+                self._help.setdefault(name, ("histogram", help))
+            self._histograms[key].observe(value)
+
+    def inc(self, name, value=1, help="", **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+            self._help.setdefault(name, ("counter", help))
+
+    def set_gauge(self, name, value, help="", **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._gauges[key] = value
+            self._help.setdefault(name, ("gauge", help))
+
+    def _labels(self, labels, extra=()):
+        items = list(labels) + list(extra)
+        if not items:
+            return ""
+        escaped = (str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, v in items)
+        return "{" + ",".join(f'{k}="{v}"' for (k, _), v in zip(items, escaped)) + "}"
+
+    def render(self):
+        with self._lock:
+            histograms = sorted(self._histograms.items())
+            counters = sorted(self._counters.items()) + sorted(self._gauges.items())
+            lines, described = [], set()
+
+            def describe(name):
+                full = f"{self.prefix}_{name}"
+                if name not in described:
+                    kind, help = self._help[name]
+                    if help:
+                        lines.append(f"# HELP {full} {help}")
+                    lines.append(f"# TYPE {full} {kind}")
+                    described.add(name)
+                return full
+
+            for (name, labels), value in counters:
+                lines.append(f"{describe(name)}{self._labels(labels)} {value}")
+
+            for (name, labels), histogram in histograms:
+                full = describe(name)
+                cumulative = 0
+                for bound, count in zip(histogram.buckets, histogram.counts):
+                    cumulative += count
+                    lines.append(f"{full}_bucket{self._labels(labels, [('le', f'{bound:g}')])} {cumulative}")
+                lines.append(f"{full}_bucket{self._labels(labels, [('le', '+Inf')])} {histogram.count}")
+                lines.append(f"{full}_sum{self._labels(labels)} {histogram.sum:.6f}")
+                lines.append(f"{full}_count{self._labels(labels)} {histogram.count}")
+        return "\n".join(lines) + "\n"
+
+metrics = MetricsRegistry()
+
+# === Cache Hit/Miss Recording ===
+# Cache lookups inside a tool call are attached to its span; the list is
+# shared by reference, so lookups from executor threads end up there too.
+_cache_events = contextvars.ContextVar("cache_events", default=None)
+
+def capture_cache_events():
+    """Start collecting cache lookups of the current context into a fresh list and return it."""
+    events = []
+    _cache_events.set(events)
+    return events
+
+def record_cache(cache, hit):
+    """Count one cache lookup and attach it to the tool span that is currently running, if any."""
+    result = "hit" if hit else "miss"
+    metrics.inc("cache_requests_total", cache=cache, result=result, help="Cache lookups by cache and result")
+    events = _cache_events.get()
+    if events is not None:
+        events.append((cache, result))
+
+# === Spans ===
+def _summarize_cache(events):
+    summary = {}
+    for cache, result in events:
+        counts = summary.setdefault(cache, {"hit": 0, "miss": 0})
+        counts[result] += 1
+    return summary
+
+def record_tool_span(span):
+    metrics.observe("tool_duration_seconds", span["seconds"], tool=span["name"], help="Tool call duration")
+    metrics.observe("tool_output_chars", span["output_chars"], buckets=CHARS_BUCKETS, tool=span["name"],
+                    help="Size of tool outputs")
+    if span.get("error"):
+        metrics.inc("tool_errors_total", tool=span["name"], help="Failed tool calls")
+
+def record_llm_span(span):
+    metrics.observe("llm_duration_seconds", span["seconds"], model=span["name"], help="LLM call duration")
+    metrics.observe("llm_prompt_chars", span["input_chars"], buckets=CHARS_BUCKETS, model=span["name"],
+                    help="Size of LLM prompts")
+    for kind in ("prompt_tokens", "completion_tokens"):
+        if span.get(kind):
+            metrics.inc("llm_tokens_total", span[kind], model=span["name"], type=kind.split("_")[0],
+                        help="LLM tokens (provider usage, else counted with tiktoken)")
+    if span.get("error"):
+        metrics.inc("llm_errors_total", model=span["name"], help="Failed LLM calls")
+
+class TracingCallbackHandler(BaseCallbackHandler):
+    """Record a span for every LLM call and tool invocation of one agent run.
+
+    Each span is fed into the process-wide ``metrics``; ``timings()`` returns
+    the per-run breakdown.
+    """
+
+    # Run synchronously in the caller's context so the cache contextvar
+    # set in on_tool_start is visible to the tool
+    run_inline = True
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.spans = []
+        self._open = {}
+
+    def elapsed(self):
+        return time.perf_counter() - self.started
+
+    def _start(self, run_id, kind, name, input_chars):
+        self._open[run_id] = {"kind": kind, "name": name, "input_chars": input_chars, "start": time.perf_counter()}
+
+    def _finish(self, run_id, **fields):
+        span = self._open.pop(run_id, None)
+        if span is None:
+            return None
+        span["offset"] = round(span["start"] - self.started, 4)
+        span["seconds"] = round(time.perf_counter() - span.pop("start"), 4)
+        span.update(fields)
+        self.spans.append(span)
+        return span
+
+    # --- LLM ---
+    def on_llm_start(self, serialized, prompts, *, run_id, **kwargs):
+        self._start(run_id, "llm", _model_name(serialized, kwargs), sum(len(p) for p in prompts))
+        self._open[run_id]["prompts"] = prompts
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, **kwargs):
+        chars = sum(len(str(m.content)) for batch in messages for m in batch)
+        self._start(run_id, "llm", _model_name(serialized, kwargs), chars)
+        self._open[run_id]["prompts"] = [str(m.content) for batch in messages for m in batch]
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        text = "".join(g.text for generations in response.generations for g in generations)
+        prompts = (self._open.get(run_id) or {}).pop("prompts", [])
+        usage = _token_usage(response)
+        fields = {"prompt_tokens": usage.get("prompt_tokens", 0), "completion_tokens": usage.get("completion_tokens", 0)}
+        if not fields["prompt_tokens"] and not fields["completion_tokens"]:
+            # Streamed responses usually come without usage: count the tokens ourselves
+            fields = _count_usage(prompts, text)
+            fields["tokens_estimated"] = True
+        span = self._finish(run_id, output_chars=len(text), **fields)
+        if span is not None:
+            record_llm_span(span)
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        (self._open.get(run_id) or {}).pop("prompts", None)
+        span = self._finish(run_id, output_chars=0, error=str(error))
+        if span is not None:
+            record_llm_span(span)
+
+    # --- Tools ---
+    def on_tool_start(self, serialized, input_str, *, run_id, **kwargs):
+        self._start(run_id, "tool", (serialized or {}).get("name", "tool"), len(str(input_str)))
+        self._open[run_id]["cache_events"] = capture_cache_events()
+
+    def _finish_tool(self, run_id, **fields):
+        _cache_events.set(None)
+        span = self._finish(run_id, **fields)
+        if span is not None:
+            span["cache"] = _summarize_cache(span.pop("cache_events", []))
+            record_tool_span(span)
+
+    def on_tool_end(self, output, *, run_id, **kwargs):
+        self._finish_tool(run_id, output_chars=len(str(output)))
+
+    def on_tool_error(self, error, *, run_id, **kwargs):
+        self._finish_tool(run_id, output_chars=0, error=str(error))
+
+    def add_tool_span(self, name, start, input_chars=0, output_chars=0, cache_events=(), error=None):
+        """Record a tool span for work done outside LangChain tools (e.g. fan-out source calls)."""
+        span = {"kind": "tool", "name": name, "input_chars": input_chars, "offset": round(start - self.started, 4),
+                "seconds": round(time.perf_counter() - start, 4), "output_chars": output_chars,
+                "cache": _summarize_cache(cache_events)}
+        if error:
+            span["error"] = error
+        self.spans.append(span)
+        record_tool_span(span)
+        return span
+
+    def timings(self):
+        """Per-run breakdown: total seconds, seconds per kind and per tool/model, and all spans."""
+        by_name = {}
+        totals = {"llm": 0.0, "tool": 0.0}
+        for span in self.spans:
+            totals[span["kind"]] = totals.get(span["kind"], 0.0) + span["seconds"]
+            entry = by_name.setdefault(span["name"], {"calls": 0, "seconds": 0.0})
+            entry["calls"] += 1
+            entry["seconds"] = round(entry["seconds"] + span["seconds"], 4)
+        total = time.perf_counter() - self.started
+        return {
+            "total_seconds": round(total, 4),
+            "llm_seconds": round(totals["llm"], 4),
+            "tool_seconds": round(totals["tool"], 4),
+            "by_name": by_name,
+            "spans": self.spans,
+        }
+
+def _model_name(serialized, kwargs):
+    params = kwargs.get("invocation_params") or {}
+    return params.get("model_name") or params.get("model") or (serialized or {}).get("name") or "llm"
+
+def _token_usage(response):
+    usage = (response.llm_output or {}).get("token_usage") or {}
+    if usage:
+        return usage
+    # Streaming chat models report usage on the message instead
+    totals = {}
+    for generations in response.generations:
+        for generation in generations:
+            metadata = getattr(getattr(generation, "message", None), "usage_metadata", None) or {}
+            totals["prompt_tokens"] = totals.get("prompt_tokens", 0) + metadata.get("input_tokens", 0)
+            totals["completion_tokens"] = totals.get("completion_tokens", 0) + metadata.get("output_tokens", 0)
+    return totals
+
+def _count_usage(prompts, text):
+    """Prompt and completion tokens counted with tiktoken, for responses without provider usage."""
+    from Tools_agent.output_budget import count_tokens
+
+    return {"prompt_tokens": sum(count_tokens(prompt) for prompt in prompts), "completion_tokens": count_tokens(text)}
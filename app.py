@@ -11,6 +11,12 @@ from Tools_agent.faiss_tool import search_faiss
 from Tools_agent.openfda_tool import search_openfda
 from Tools_agent.tavily_tool import smart_tavily_answer
 from Tools_agent.alerts_tool import search_medication_alerts
+from Tools_agent.fanout import run_fanout
+from Tools_agent.fast_path import run_fast_path
+from Tools_agent.output_budget import log_token_savings, question_context
+from Tools_agent.answer_cache import answer_cache
+from Tools_agent.tracing import TracingCallbackHandler
+from Tools_agent.config import get_secret
 from langchain.callbacks.streamlit import (
     StreamlitCallbackHandler,
 )
@@ -40,7 +46,7 @@ tools = [
     Tool(name="MedicationAlertsTool", func=search_medication_alerts, description="Suche Medikamentenwarnungen"),
 ]
 
-openai_key = st.secrets["openai"]["OPENAI_KEY"]
+openai_key = get_secret("openai", "OPENAI_KEY")
 llm = ChatOpenAI(
     model="gpt-4o",
     temperature=0.2,
@@ -54,6 +60,8 @@ agent = initialize_agent(
     agent=AgentType.ZERO_SHOT_REACT_DESCRIPTION,
     verbose=True,
     handle_parsing_errors=True,
+    return_intermediate_steps=True,
+    max_iterations=5,
     agent_kwargs={
         "system_message": (
             "Du bist ein klinischer Assistent. "
@@ -62,8 +70,6 @@ agent = initialize_agent(
             "Fokussiere auf relevante Informationen. "
             "Antworte auf Deutsch und präzise."
         ),
-        "return_intermediate_steps": True,
-        "max_iterations": 5,
     }
 )
 
@@ -97,6 +103,7 @@ with col2:
     input_type = st.selectbox("Art der Eingabe:", list(input_type_options.keys()))
 
 medication_name = st.text_input("Name des Medikaments oder Wirkstoffs", placeholder="z.B. Dafalgan, Anthim, etc.")
+fanout_mode = st.checkbox("⚡ Schnellmodus: alle Quellen parallel abfragen", value=False)
 run_button = st.button("🚀 Anfrage starten")
 st_callback = StreamlitCallbackHandler(st.container())
 
@@ -114,19 +121,52 @@ if run_button and medication_name:
     st.markdown('<div class="subheader">🧠 Frage-Formulierung</div>', unsafe_allow_html=True)
     st.info(f"**🧠 Frage:** {full_prompt}")
 
-    with st.status("🔍 Agent denkt...", expanded=True) as status:
+    intermediate_steps = []
+    tracer = TracingCallbackHandler()
+    with st.status("🔍 Agent denkt...", expanded=True) as status, question_context(query_prefix) as tally:
         try:
-            result = agent.invoke({"input": full_prompt}, callbacks=[st_callback], return_only_outputs=False)
-            final_answer = result["output"]
-            intermediate_steps = result.get("intermediate_steps", [])
-            
+            cache_mode = "fanout" if fanout_mode else "agent"
+            cached = answer_cache.get(query_prefix, input_type_str, medication_name, cache_mode)
+            fast = None
+            if cached is None:
+                # Menu questions the local label sections answer directly skip the agent
+                try:
+                    fast = run_fast_path(llm, query_prefix, medication_name, full_prompt, tracer=tracer)
+                except Exception as e:
+                    # Label store or LLM errors: the agent answers instead, as in main._run_fast_path
+                    print(f"⚠️ Fast Path fehlgeschlagen, Agent übernimmt: {e}")
+            if cached is not None:
+                final_answer = cached["final_answer"]
+                intermediate_steps = cached["steps"]
+                st.caption(f"⚡ Antwort aus dem Cache (vor {cached['cache_age_seconds'] / 60:.0f} Minuten)")
+            elif fast is not None:
+                final_answer = fast["final_answer"]
+                intermediate_steps = fast["steps"]
+                st.caption("⚡ Antwort direkt aus den lokalen OpenFDA-Daten")
+            elif fanout_mode:
+                result = run_fanout(llm, full_prompt, medication_name, tracer=tracer)
+                final_answer = result["final_answer"]
+                intermediate_steps = result["steps"]
+            else:
+                result = agent.invoke({"input": full_prompt}, config={"callbacks": [st_callback, tracer]},
+                                      return_only_outputs=False)
+                final_answer = result["output"]
+                intermediate_steps = [
+                    {"thought": action.log, "tool": action.tool, "input": action.tool_input, "output": observation}
+                    for action, observation in result.get("intermediate_steps", [])
+                ]
+            if cached is None:
+                answer_cache.set(query_prefix, input_type_str, medication_name,
+                                 {"final_answer": final_answer, "steps": intermediate_steps}, cache_mode)
+
             for idx, step in enumerate(intermediate_steps):
                 with st.chat_message("assistant"):
-                    st.markdown(f"🧠 **Gedanke {idx+1}:** {step[0].log}")
-                    st.markdown(f"🔧 **Aktion:** {step[1].tool}")
-                    st.markdown(f"📥 **Eingabe:** {step[1].tool_input}")
+                    st.markdown(f"🧠 **Gedanke {idx+1}:** {step['thought']}")
+                    st.markdown(f"🔧 **Aktion:** {step['tool']}")
+                    st.markdown(f"📥 **Eingabe:** {step['input']}")
 
             status.update(label="✅ Denken abgeschlossen", state="complete")
+            log_token_savings(tally)
         
         except Exception as e:
             st.error(f"❌ Fehler: {e}")
@@ -140,24 +180,31 @@ if run_button and medication_name:
         for url in urls_in_answer:
             st.markdown(f"🔗 **Links:** [{url}]({url})")
             
+    if tracer.spans:
+        timings = tracer.timings()
+        with st.expander(f"⏱️ Laufzeit: {timings['total_seconds']:.1f}s "
+                         f"(LLM {timings['llm_seconds']:.1f}s, Tools {timings['tool_seconds']:.1f}s)"):
+            for name, entry in timings["by_name"].items():
+                st.markdown(f"- **{name}**: {entry['calls']}× in {entry['seconds']:.2f}s")
+            if tally["saved"]:
+                st.markdown(f"- ✂️ **Tool-Ausgaben**: {tally['saved']} Tokens eingespart "
+                            f"({tally['tokens_in']} -> {tally['tokens_out']})")
+
     if intermediate_steps:
         st.markdown('<div class="subheader">🧰 Verwendete Tools & Schritte</div>', unsafe_allow_html=True)
         for idx, step in enumerate(intermediate_steps):
-            thought = step[0].log
-            tool = step[1].tool
-            tool_input = step[1].tool_input
-            tool_output = step[1].tool_response
-
-        st.markdown(f'<div class="thought-box">🧠 <b>Gedanke {idx+1}</b>: {thought}<br>'
-                    f'🔧 <b>Tool</b>: {tool}<br>'
-                    f'📥 <b>Eingabe</b>: {tool_input}<br>'
-                    f'📤 <b>Antwort</b>: {tool_output}</div>', unsafe_allow_html=True)
-
-        # Optional: extract and highlight URLs
-        if isinstance(tool_output, str) and "http" in tool_output:
-            urls = [word for word in tool_output.split() if word.startswith("http")]
-            for url in urls:
-                st.markdown(f"🔗 **Gefundener Link:** [{url}]({url})")
+            tool_output = step["output"]
+
+            st.markdown(f'<div class="thought-box">🧠 <b>Gedanke {idx+1}</b>: {step["thought"]}<br>'
+                        f'🔧 <b>Tool</b>: {step["tool"]}<br>'
+                        f'📥 <b>Eingabe</b>: {step["input"]}<br>'
+                        f'📤 <b>Antwort</b>: {tool_output}</div>', unsafe_allow_html=True)
+
+            # Optional: extract and highlight URLs
+            if isinstance(tool_output, str) and "http" in tool_output:
+                urls = [word for word in tool_output.split() if word.startswith("http")]
+                for url in urls:
+                    st.markdown(f"🔗 **Gefundener Link:** [{url}]({url})")
 
 elif run_button:
     st.warning("⚠️ Bitte gib den Namen eines Medikaments oder Wirkstoffs ein.")
@@ -0,0 +1,102 @@
+# benchmarks/bench_browser_pool.py
+"""Time-to-ready of a browser context: fresh browser per question vs. the warmed BrowserPool.
+
+    python -m benchmarks.bench_browser_pool --runs 10
+
+Runs headless against the static stand-in in benchmarks/compendium_stub
+(served locally, with the same kind of cookie banner), so neither
+compendium.ch nor an LLM is involved. Needs browser-use and the
+Playwright browsers (`playwright install chromium`).
+"""
+
+import argparse
+import asyncio
+import functools
+import os
+import statistics
+import sys
+import threading
+import time
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+from browser_use import Browser, BrowserConfig  # noqa: E402
+from browser_pool import BrowserPool, accept_consent  # noqa: E402
+
+STUB_FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), "compendium_stub")
+
+class QuietHandler(SimpleHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+def serve_stub():
+    handler = functools.partial(QuietHandler, directory=STUB_FOLDER)
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_port}/index.html"
+
+async def check_ready(context, base_url):
+    """What an agent run needs: the start page loaded and the cookie banner gone."""
+    page = await context.get_current_page()
+    assert page.url.startswith(base_url.rsplit("/", 1)[0]), page.url
+    assert "consent=1" in await page.evaluate("document.cookie"), "Cookie-Banner nicht akzeptiert"
+    assert await page.locator("#consent").is_hidden()
+    # Simulated agent work: follow a link, which the pool has to undo on release
+    await page.click("text=Dafalgan")
+    await page.wait_for_selector("#title")
+
+async def cold_run(base_url):
+    """The previous behaviour: a new browser, page load and banner for every question."""
+    browser = Browser(config=BrowserConfig(headless=True))
+    try:
+        context = await browser.new_context()
+        page = await context.get_current_page()
+        await page.goto(base_url, wait_until="domcontentloaded")
+        await accept_consent(page)
+        await check_ready(context, base_url)
+        await context.close()
+    finally:
+        await browser.close()
+
+def summarize(durations):
+    return {
+        "p50_ms": round(statistics.median(durations) * 1000, 1),
+        "max_ms": round(max(durations) * 1000, 1),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Browser-Pool gegen Kaltstart messen.")
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--size", type=int, default=2)
+    parser.add_argument("--max-uses", type=int, default=5)
+    args = parser.parse_args()
+
+    server, base_url = serve_stub()
+
+    cold = []
+    for _ in range(args.runs):
+        start = time.perf_counter()
+        asyncio.run(cold_run(base_url))
+        cold.append(time.perf_counter() - start)
+    print(f"🥶 Kaltstart: {summarize(cold)}")
+
+    pool = BrowserPool(size=args.size, base_url=base_url, max_uses=args.max_uses, headless=True).start()
+    deadline = time.monotonic() + 60
+    while pool.stats()["created"] < args.size and time.monotonic() < deadline:
+        time.sleep(0.1)
+
+    warm = []
+    for _ in range(args.runs):
+        start = time.perf_counter()
+        pool.run(lambda context: check_ready(context, base_url), timeout=60)
+        warm.append(time.perf_counter() - start)
+    print(f"🔥 Pool: {summarize(warm)}")
+    print(f"📊 Pool-Statistik: {pool.stats()}")
+
+    pool.close()
+    server.shutdown()
+
+if __name__ == "__main__":
+    main()
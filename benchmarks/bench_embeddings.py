@@ -0,0 +1,86 @@
+# benchmarks/bench_embeddings.py
+"""Query latency and batch throughput of an embedding backend.
+
+    python -m benchmarks.bench_embeddings --backend local --threads 4
+    python -m benchmarks.bench_embeddings --backend local --int8 --max-query-ms 10
+
+Measures the uncached backend (no embedding cache): single query
+embeddings, as search_faiss does them, and document batches, as ingestion
+does them. ``--backend hash`` runs the hashed benchmark embeddings as a
+reference without any model. Exits with status 1 if ``--max-query-ms`` is
+given and the p50 query latency exceeds it.
+"""
+
+import argparse
+import os
+import sys
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+from benchmarks.datagen import synthetic_chunks  # noqa: E402
+from benchmarks.run_benchmarks import rss_mb, summarize  # noqa: E402
+
+QUERIES = [
+    "Welche Dosierung gilt für Ibuprofen bei Kindern?",
+    "Darf Paracetamol in der Schwangerschaft eingenommen werden?",
+    "Wie muss das Präparat gelagert werden?",
+    "Welche Wechselwirkungen hat Clarithromycin?",
+    "Nebenwirkungen von Metformin",
+]
+
+def build(backend, args):
+    if backend == "hash":
+        from benchmarks.fakes import HashEmbeddings
+        return HashEmbeddings()
+    if backend == "local":
+        from Tools_agent.embedding_backend import LocalEmbeddings
+        return LocalEmbeddings(args.model, threads=args.threads, batch_size=args.batch_size, int8=args.int8)
+    from Tools_agent.embedding_backend import build_embeddings
+    return build_embeddings(backend)
+
+def main():
+    from Tools_agent.embedding_backend import EMBEDDING_BACKEND, EMBEDDING_BATCH_SIZE, EMBEDDING_THREADS, LOCAL_EMBEDDING_MODEL
+
+    parser = argparse.ArgumentParser(description="Latenz und Durchsatz eines Embedding-Backends messen.")
+    parser.add_argument("--backend", choices=["local", "openai", "hash"], default=EMBEDDING_BACKEND)
+    parser.add_argument("--model", default=LOCAL_EMBEDDING_MODEL, help="sentence-transformers Modell (nur local)")
+    parser.add_argument("--threads", type=int, default=EMBEDDING_THREADS, help="Torch-Threads (0: Standard)")
+    parser.add_argument("--batch-size", type=int, default=EMBEDDING_BATCH_SIZE)
+    parser.add_argument("--int8", action="store_true", help="Lineare Schichten dynamisch auf int8 quantisieren")
+    parser.add_argument("--queries", type=int, default=200, help="Anzahl einzelner Query-Embeddings")
+    parser.add_argument("--documents", type=int, default=2000, help="Anzahl Abschnitte für den Durchsatz")
+    parser.add_argument("--max-query-ms", type=float, default=None, help="Budget für die p50-Latenz einer Query")
+    args = parser.parse_args()
+
+    rss_before = rss_mb()
+    start = time.perf_counter()
+    embeddings = build(args.backend, args)
+    load_seconds = time.perf_counter() - start
+    embeddings.embed_query(QUERIES[0])  # warm-up
+
+    durations = []
+    for i in range(args.queries):
+        start = time.perf_counter()
+        embeddings.embed_query(f"{QUERIES[i % len(QUERIES)]} ({i})")
+        durations.append(time.perf_counter() - start)
+    queries = summarize(durations)
+
+    chunks = synthetic_chunks(args.documents)
+    start = time.perf_counter()
+    for i in range(0, len(chunks), args.batch_size):
+        dimension = len(embeddings.embed_documents(chunks[i:i + args.batch_size])[0])
+    batch_seconds = time.perf_counter() - start
+
+    print(f"🧮 {args.backend}{' int8' if args.int8 else ''}: Dimension {dimension}, geladen in {load_seconds:.2f}s, "
+          f"RSS +{rss_mb() - rss_before:.1f} MB")
+    print(f"   Query: p50 {queries['p50_ms']:.2f} ms, p95 {queries['p95_ms']:.2f} ms")
+    print(f"   Abschnitte: {len(chunks) / batch_seconds:.0f}/s (Batches à {args.batch_size})")
+
+    if args.max_query_ms is not None and queries["p50_ms"] > args.max_query_ms:
+        print(f"❗ p50 {queries['p50_ms']:.2f} ms über dem Budget von {args.max_query_ms} ms")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
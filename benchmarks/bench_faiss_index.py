@@ -0,0 +1,139 @@
+# benchmarks/bench_faiss_index.py
+"""Recall@k against latency for the FAISS serving index types, compared to the flat baseline.
+
+    python -m benchmarks.bench_faiss_index
+    python -m benchmarks.bench_faiss_index --vectors 200000 --dim 1536 --types ivfpq hnsw
+
+Vectors are drawn from Gaussian clusters (closer to real embeddings than
+uniform noise), queries are perturbed held-out points. The ground truth
+is exact search with IndexFlatL2. Every index is built with
+Tools_agent.faiss_index.build_index, written to disk and opened memory-
+mapped like the API does; for each nprobe / efSearch setting it reports
+recall@k, single-query latency, build time, file size and the memory
+added by opening it.
+"""
+
+import argparse
+import gc
+import json
+import os
+import sys
+import tempfile
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+from benchmarks.run_benchmarks import rss_mb, summarize  # noqa: E402
+
+SWEEPS = {
+    "flat": [None],
+    "ivfflat": [1, 4, 16, 64],
+    "ivfpq": [1, 4, 16, 64],
+    "hnsw": [16, 32, 64, 128],
+}
+
+def clustered_vectors(n, d, clusters, seed):
+    import numpy as np
+
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(clusters, d)).astype(np.float32)
+    labels = rng.integers(0, clusters, size=n)
+    vectors = centers[labels] + 0.35 * rng.normal(size=(n, d)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+def recall_at_k(found, truth, k):
+    return sum(len(set(f[:k]) & set(t[:k])) for f, t in zip(found, truth)) / (len(truth) * k)
+
+def bench_type(kind, vectors, queries, truth, k, workdir, **params):
+    import faiss
+    from Tools_agent.faiss_index import apply_search_params, build_index
+
+    start = time.perf_counter()
+    index, kind = build_index(vectors, kind, **params)
+    build_seconds = time.perf_counter() - start
+    path = os.path.join(workdir, f"{kind}.faiss")
+    faiss.write_index(index, path)
+    del index
+    gc.collect()
+
+    rss_before = rss_mb()
+    index = faiss.read_index(path, faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY)
+    rss_open = rss_mb()
+
+    rows = []
+    for value in SWEEPS[kind]:
+        apply_search_params(index, kind, nprobe=value, ef_search=value)
+        durations, found = [], []
+        for query in queries:
+            start = time.perf_counter()
+            _, ids = index.search(query[None, :], k)
+            durations.append(time.perf_counter() - start)
+            found.append(ids[0].tolist())
+        row = {
+            "type": kind,
+            "param": {"ivfflat": "nprobe", "ivfpq": "nprobe", "hnsw": "efSearch"}.get(kind),
+            "value": value,
+            f"recall@{k}": round(recall_at_k(found, truth, k), 4),
+            **summarize(durations),
+        }
+        rows.append(row)
+    for row in rows:
+        row.update(
+            build_seconds=round(build_seconds, 2),
+            file_mb=round(os.path.getsize(path) / 1e6, 1),
+            open_rss_mb=round(rss_open - rss_before, 1),
+            search_rss_mb=round(rss_mb() - rss_before, 1),
+        )
+    del index
+    os.remove(path)
+    return rows
+
+def main():
+    parser = argparse.ArgumentParser(description="Recall@k und Latenz der FAISS-Indextypen gegenüber Flat messen.")
+    parser.add_argument("--vectors", type=int, default=100000)
+    parser.add_argument("--dim", type=int, default=256)
+    parser.add_argument("--clusters", type=int, default=1000, help="Anzahl Gauss-Cluster der synthetischen Vektoren")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--types", nargs="+", default=list(SWEEPS), choices=list(SWEEPS))
+    parser.add_argument("--threads", type=int, default=1, help="OpenMP-Threads pro Suche (1 wie im API-Worker)")
+    parser.add_argument("--output", default=None, help="Ergebnisse zusätzlich als JSON speichern")
+    args = parser.parse_args()
+
+    import faiss
+    import numpy as np
+
+    faiss.omp_set_num_threads(args.threads)
+    data = clustered_vectors(args.vectors + args.queries, args.dim, args.clusters, seed=0)
+    vectors, held_out = data[:args.vectors], data[args.vectors:]
+    rng = np.random.default_rng(1)
+    queries = held_out + 0.05 * rng.normal(size=held_out.shape).astype(np.float32)
+
+    exact = faiss.IndexFlatL2(args.dim)
+    exact.add(vectors)
+    _, truth = exact.search(queries, args.k)
+    truth = truth.tolist()
+    del exact
+
+    print(f"📐 {args.vectors} Vektoren, Dimension {args.dim}, {args.queries} Anfragen, k={args.k}")
+    results = []
+    with tempfile.TemporaryDirectory(prefix="kings-faiss-index-") as workdir:
+        for kind in args.types:
+            rows = bench_type(kind, vectors, queries, truth, args.k, workdir)
+            results.extend(rows)
+            for row in rows:
+                setting = f"{row['param']}={row['value']}" if row["param"] else "exakt"
+                print(f"  {row['type']:8} {setting:13} recall@{args.k} {row[f'recall@{args.k}']:.3f}  "
+                      f"p50 {row['p50_ms']:8.3f} ms  p95 {row['p95_ms']:8.3f} ms  "
+                      f"Build {row['build_seconds']:6.2f}s  Datei {row['file_mb']:7.1f} MB  "
+                      f"RSS +{row['open_rss_mb']:.1f}/+{row['search_rss_mb']:.1f} MB")
+
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"vectors": args.vectors, "dim": args.dim, "k": args.k, "results": results}, f, indent=2)
+        print(f"💾 Ergebnisse gespeichert: {args.output}")
+
+if __name__ == "__main__":
+    main()
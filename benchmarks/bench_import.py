@@ -0,0 +1,105 @@
+# benchmarks/bench_import.py
+"""Cold-import time and memory of the API and the tool modules.
+
+    python -m benchmarks.bench_import
+    python -m benchmarks.bench_import --max-seconds 4 --max-rss-mb 150
+
+Every module is imported in a fresh interpreter, in an empty working
+directory without .streamlit/secrets.toml, so a module that reads secrets
+or opens clients at import time fails here. Exits with status 1 if a
+budget is exceeded or a module pulls in one of HEAVY_MODULES.
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+TARGETS = [
+    "main",
+    "Tools_agent.faiss_tool",
+    "Tools_agent.openfda_tool",
+    "Tools_agent.compendium_tool",
+    "Tools_agent.tavily_tool",
+    "Tools_agent.alerts_tool",
+    "Tools_agent.fanout",
+]
+
+# Must only be imported on first use, never by importing the app
+HEAVY_MODULES = ["faiss", "fitz", "numpy", "tavily", "streamlit", "langchain_openai", "tiktoken"]
+
+PROBE = """
+import json, resource, sys, time, warnings
+warnings.simplefilter("ignore")
+sys.path.insert(0, {root!r})
+start = time.perf_counter()
+import {module}
+seconds = time.perf_counter() - start
+print(json.dumps({{
+    "seconds": seconds,
+    "rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    "heavy": [name for name in {heavy!r} if name in sys.modules],
+}}))
+"""
+
+def probe(module, workdir):
+    env = {k: v for k, v in os.environ.items() if k not in ("TAVILY_API_KEY", "OPENFDA_API_KEY")}
+    # main builds the chat model at import time, which needs a key (but no network)
+    env.setdefault("OPENAI_KEY", "sk-import-benchmark")
+    completed = subprocess.run(
+        [sys.executable, "-c", PROBE.format(root=REPO_ROOT, module=module, heavy=HEAVY_MODULES)],
+        cwd=workdir, env=env, capture_output=True, text=True,
+    )
+    if completed.returncode != 0:
+        return {"error": completed.stderr.strip().splitlines()[-1] if completed.stderr.strip() else "failed"}
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+def main():
+    parser = argparse.ArgumentParser(description="Importzeit und Speicherbedarf der Module messen.")
+    parser.add_argument("--runs", type=int, default=3, help="Messungen pro Modul (Median wird berichtet)")
+    parser.add_argument("--max-seconds", type=float, default=None, help="Budget für 'import main'")
+    parser.add_argument("--max-rss-mb", type=float, default=None, help="Speicherbudget für 'import main'")
+    parser.add_argument("--output", default=None, help="Ergebnisse zusätzlich als JSON speichern")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="kings-import-")
+    results, failed = {}, False
+    for module in TARGETS:
+        runs = [probe(module, workdir) for _ in range(args.runs)]
+        errors = [run["error"] for run in runs if "error" in run]
+        if errors:
+            results[module] = {"error": errors[0]}
+            print(f"❗ {module}: {errors[0]}")
+            failed = True
+            continue
+
+        results[module] = {
+            "seconds": round(statistics.median(run["seconds"] for run in runs), 3),
+            "rss_mb": round(statistics.median(run["rss_mb"] for run in runs), 1),
+            "heavy_modules": runs[0]["heavy"],
+        }
+        heavy = f" ⚠️ lädt {', '.join(runs[0]['heavy'])}" if runs[0]["heavy"] else ""
+        print(f"📦 {module}: {results[module]['seconds']:.2f}s, {results[module]['rss_mb']:.0f} MB{heavy}")
+        failed = failed or bool(runs[0]["heavy"])
+
+    api = results.get("main", {})
+    if args.max_seconds is not None and api.get("seconds", float("inf")) > args.max_seconds:
+        print(f"❗ import main dauert länger als {args.max_seconds}s")
+        failed = True
+    if args.max_rss_mb is not None and api.get("rss_mb", float("inf")) > args.max_rss_mb:
+        print(f"❗ import main braucht mehr als {args.max_rss_mb} MB")
+        failed = True
+
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+    sys.exit(1 if failed else 0)
+
+if __name__ == "__main__":
+    main()
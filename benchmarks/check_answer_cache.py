@@ -0,0 +1,53 @@
+# benchmarks/check_answer_cache.py
+"""Answer cache keys and expiry.
+
+    python -m benchmarks.check_answer_cache
+
+An answer cached for one mode (agent, fanout) or with the fast path on
+must not be served for another combination of the same question, and
+rows past the TTL are deleted on a later write. Exits with status 1 if
+any case fails.
+"""
+
+import os
+import sqlite3
+import time
+
+from benchmarks.checks import check, finish, temporary_workdir
+from Tools_agent.answer_cache import AnswerCache
+
+QUESTION = ("Welche Nebenwirkungen hat", "Medikament", "Ibuprofen")
+
+def answer(cache, mode, fast_path):
+    cached = cache.get(*QUESTION, mode, fast_path)
+    return cached and cached["final_answer"]
+
+def run_checks(path):
+    cache = AnswerCache(path, ttl=3600, purge_interval=0)
+    results = []
+
+    cache.set(*QUESTION, {"final_answer": "Fast-Path", "steps": []}, "agent", True)
+    cache.set(*QUESTION, {"final_answer": "Agent", "steps": []}, "agent", False)
+    cache.set(*QUESTION, {"final_answer": "Fanout", "steps": []}, "fanout", False)
+    for mode, fast_path, expected in [("agent", True, "Fast-Path"), ("agent", False, "Agent"),
+                                      ("fanout", False, "Fanout"), ("fanout", True, None)]:
+        found = answer(cache, mode, fast_path)
+        results.append(check(f"get(mode={mode}, fast_path={fast_path})", found == expected, found or "kein Treffer"))
+
+    # Age two rows past the TTL; the next write deletes them
+    with sqlite3.connect(path) as conn:
+        conn.execute("UPDATE answer_cache SET created_at = ? WHERE answer != 'Fanout'", (time.time() - 7200,))
+    cache.set("Wie wird", "Medikament", "Ibuprofen", {"final_answer": "Dosierung", "steps": []})
+    with sqlite3.connect(path) as conn:
+        answers = sorted(row[0] for row in conn.execute("SELECT answer FROM answer_cache"))
+    results.append(check("abgelaufene Einträge gelöscht", answers == ["Dosierung", "Fanout"], answers))
+    results.append(check("stats['expired']", cache.stats()["expired"] == 2, cache.stats()["expired"]))
+    return results
+
+def main():
+    with temporary_workdir("kings-answer-cache-") as workdir:
+        results = run_checks(os.path.join(workdir, "answers.sqlite"))
+    finish(results)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+# benchmarks/check_embedding_cache.py
+"""Cross-process check of the on-disk embedding cache.
+
+    python -m benchmarks.check_embedding_cache
+
+A reader opens the cache folder while it is still empty, then a separate
+process writes vectors into it. The reader must see them (the dimension
+comes from meta.json written by the other process), and vectors it writes
+itself afterwards must land behind the other process's rows. Exits with
+status 1 if any case fails.
+"""
+
+import multiprocessing
+
+import numpy as np
+
+from benchmarks.checks import check, finish, temporary_workdir
+from Tools_agent.embedding_cache import EmbeddingCache
+
+def write(folder, items):
+    EmbeddingCache(folder).put_many(items)
+
+def run_checks(folder):
+    reader = EmbeddingCache(folder)
+    results = [check("leerer Cache", reader.get_many(["a"]) == {}, "keine Treffer")]
+
+    writer = multiprocessing.Process(target=write, args=(folder, [("a", [1.0, 2.0, 3.0]), ("b", [4.0, 5.0, 6.0])]))
+    writer.start()
+    writer.join()
+
+    try:
+        cached = reader.get_many(["a", "b"])
+        ok = set(cached) == {"a", "b"} and np.allclose(cached["b"], [4.0, 5.0, 6.0])
+        detail = {key: vector.tolist() for key, vector in cached.items()}
+    except Exception as e:
+        ok, detail = False, f"{type(e).__name__}: {e}"
+    results.append(check("Lesen nach fremdem Schreiben", ok, detail))
+
+    reader.put_many([("c", [7.0, 8.0, 9.0])])
+    cached = EmbeddingCache(folder).get_many(["a", "c"])
+    ok = set(cached) == {"a", "c"} and np.allclose(cached["a"], [1.0, 2.0, 3.0]) and np.allclose(cached["c"], [7.0, 8.0, 9.0])
+    results.append(check("Schreiben nach fremdem Schreiben", ok, f"{len(EmbeddingCache(folder))} Zeilen"))
+    return results
+
+def main():
+    with temporary_workdir("kings-embedding-cache-") as folder:
+        results = run_checks(folder)
+    finish(results)
+
+if __name__ == "__main__":
+    main()
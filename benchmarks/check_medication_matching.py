@@ -0,0 +1,106 @@
+# benchmarks/check_medication_matching.py
+"""Safety check: medication names never resolve to a different substance.
+
+    python -m benchmarks.check_medication_matching
+
+Runs against a local label file with only the diazepam and citalopram
+labels. Look-alike names (lorazepam, escitalopram, Celebrex) must find
+nothing locally instead of another drug's label, while real typos are
+still corrected. The fast path must only answer for known names, and
+menu question types must map to the right label sections. Exits with
+status 1 if any case fails.
+"""
+
+import asyncio
+import json
+import os
+
+from benchmarks.checks import check, finish, temporary_workdir
+
+# name -> canonical ingredients the resolver may return
+RESOLVER_CASES = {
+    "lorazepam": ["lorazepam"],
+    "metoprolol": ["metoprolol"],
+    "citalopram": ["citalopram"],
+    "Celebrex": [],
+    "Dafalgan 500 mg Tabletten": ["paracetamol"],
+    "ibuprofn": ["ibuprofen"],
+    "diazepan": ["diazepam"],
+}
+
+# query -> substance whose label may be shown (None: nothing local)
+LOCAL_CASES = {
+    "Celebrex": None,
+    "Lorazepam": None,
+    "escitalopram": None,
+    "Diazepam": "DIAZEPAM",
+    "Diazepan": "DIAZEPAM",
+    "Citalopram": "CITALOPRAM",
+}
+
+# question type -> sections (None: whole label)
+SECTION_CASES = {
+    "Welche Wechselwirkungen hat": None,
+    "Welche Interaktionen gibt es bei": None,
+    "Gibt es Interaktionen mit internationalen Medikamenten für": None,
+    "Was ist die Wirkung von": ["indications_and_usage", "purpose"],
+    "Welche Nebenwirkungen hat": ["adverse_reactions"],
+    "Welche Warnungen gibt es für": ["warnings", "do_not_use", "stop_use", "contraindications"],
+    "Welche Wirkstoffe enthält": ["active_ingredient"],
+    "Wie wird": ["dosage_and_administration"],
+    "Wie sollte man lagern": ["storage_and_handling"],
+}
+
+# medication -> substance the fast path may answer from (None: agent)
+FAST_PATH_CASES = {
+    "Lorazepam": None,
+    "Celebrex": None,
+    "Diazepan": None,
+    "Diazepam": "DIAZEPAM",
+    "Valium": "DIAZEPAM",
+}
+
+def label(brand, substance):
+    return {
+        "openfda": {"brand_name": [brand], "generic_name": [substance], "substance_name": [substance]},
+        "adverse_reactions": [f"{substance} adverse reactions"],
+        "indications_and_usage": [f"{substance} indications"],
+    }
+
+def run_checks():
+    os.makedirs("data")
+    with open(os.path.join("data", "dataset.json"), "w", encoding="utf-8") as f:
+        json.dump({"results": [label("Valium", "DIAZEPAM"), label("Celexa", "CITALOPRAM HYDROBROMIDE")]}, f)
+
+    from Tools_agent.fast_path import answer_fast_path
+    from Tools_agent.name_resolver import name_resolver
+    from Tools_agent.openfda_tool import search_openfda_local, sections_for
+
+    results = []
+    for name, expected in RESOLVER_CASES.items():
+        resolved = [canonical for canonical, _ in name_resolver.resolve(name)]
+        results.append(check(f"resolve({name!r})", resolved == expected, resolved))
+
+    for query, substance in LOCAL_CASES.items():
+        output = search_openfda_local(query)
+        found = next((s for s in ("DIAZEPAM", "CITALOPRAM") if output and s in output), None)
+        results.append(check(f"search_openfda_local({query!r})", found == substance, found or "lokal nichts gefunden"))
+
+    for question_type, expected in SECTION_CASES.items():
+        fields = sections_for(question_type)
+        results.append(check(f"sections_for({question_type!r})", fields == expected, fields or "ganzes Label"))
+
+    for medication, substance in FAST_PATH_CASES.items():
+        answer = asyncio.run(answer_fast_path(None, "Welche Nebenwirkungen hat", medication,
+                                              f"Welche Nebenwirkungen hat {medication}?", summarize=False))
+        found = next((s for s in ("DIAZEPAM", "CITALOPRAM") if answer and s in answer["final_answer"]), None)
+        results.append(check(f"answer_fast_path({medication!r})", found == substance, found or "Agent"))
+    return results
+
+def main():
+    with temporary_workdir("kings-matching-"):
+        results = run_checks()
+    finish(results)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+# benchmarks/check_singleflight.py
+"""Concurrency check: N identical concurrent requests cause exactly one backend call.
+
+    python -m benchmarks.check_singleflight --concurrency 16
+
+Runs offline against the same stubs as run_benchmarks (scripted LLM,
+local Tavily/OpenFDA server, hashed embeddings). Checks the /query level
+(one agent run for N identical queries) and the tool level
+(get_compendium_info, search_openfda, search_faiss). Exits with status 1
+if any of them reaches the backend more than once.
+"""
+
+import argparse
+import asyncio
+import random
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.checks import check, finish, temporary_workdir
+from benchmarks.datagen import synthetic_label
+from benchmarks.fakes import FakeBackendServer, HashEmbeddings, ScriptedReActChatModel
+from benchmarks.run_benchmarks import install_fakes, prepare_workdir, use_faiss_corpus, use_fda_dataset
+
+class CountingChatModel(ScriptedReActChatModel):
+    calls: int = 0
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs):
+        self.calls += 1
+        return await super()._agenerate(messages, stop, run_manager, **kwargs)
+
+class CountingEmbeddings(HashEmbeddings):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.query_calls = 0
+
+    def embed_query(self, text):
+        self.query_calls += 1
+        return super().embed_query(text)
+
+def concurrently(func, arg, concurrency):
+    """Call ``func(arg)`` from ``concurrency`` threads released at the same moment."""
+    barrier = threading.Barrier(concurrency)
+
+    def call(_):
+        barrier.wait()
+        return func(arg)
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        return list(pool.map(call, range(concurrency)))
+
+async def identical_queries(main, concurrency):
+    import httpx
+
+    body = {"question_type": "Welche Interaktionen gibt es bei", "input_type": "Medikament",
+            "medication_name": "Rueckrufmittel", "fast_path": False}
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://check", timeout=120) as client:
+        responses = await asyncio.gather(*(client.post("/query", json=body) for _ in range(concurrency)))
+    return [response.json() for response in responses]
+
+def check_once(name, calls, results):
+    ok = calls == 1 and len({str(result) for result in results}) == 1
+    return check(name, ok, f"{len(results)} gleichzeitige Aufrufe -> {calls} Backend-Aufruf(e)")
+
+def run_checks(args, workdir):
+    backend = FakeBackendServer(latency=args.latency, fda_results=[synthetic_label(random.Random(1), 0)])
+    backend.start()
+    prepare_workdir(workdir, backend)
+
+    embeddings = CountingEmbeddings(latency=args.latency)
+    import main as app_main
+    from Tools_agent.compendium_tool import get_compendium_info
+    from Tools_agent.faiss_tool import search_faiss
+    from Tools_agent.openfda_tool import search_openfda
+
+    install_fakes(backend, embeddings)
+    use_fda_dataset(200)
+    use_faiss_corpus(200, embeddings)
+    results = []
+
+    # /query: one agent run (two LLM calls: one action, one final answer) with one Compendium search
+    app_main.llm = CountingChatModel(latency=args.latency, tool_plan=["CompendiumTool"])
+    app_main.agent = app_main.build_agent(app_main.llm, verbose=False)
+    answers = asyncio.run(identical_queries(app_main, args.concurrency))
+    runs = app_main.llm.calls // 2
+    coalesced = sum(1 for answer in answers if answer.get("coalesced"))
+    results.append(check_once("/query Agent-Läufe", runs, [answer.get("final_answer") for answer in answers]))
+    print(f"   {coalesced} Antworten aus einem gemeinsamen Lauf, Tavily-Anfragen: {backend.requests['tavily']}")
+
+    before = dict(backend.requests)
+    outputs = concurrently(get_compendium_info, "Rueckruf Testpraeparat", args.concurrency)
+    results.append(check_once("get_compendium_info", backend.requests["tavily"] - before["tavily"], outputs))
+
+    outputs = concurrently(search_openfda, "Gibtesnichtlokal", args.concurrency)
+    results.append(check_once("search_openfda", backend.requests["openfda"] - before["openfda"], outputs))
+
+    embeddings.query_calls = 0
+    outputs = concurrently(search_faiss, "Lagerung Testpraeparat", args.concurrency)
+    results.append(check_once("search_faiss", embeddings.query_calls, outputs))
+
+    backend.stop()
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description="Prüfen, dass gleichzeitige identische Anfragen nur einmal ausgeführt werden.")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--latency", type=float, default=0.3, help="Latenz von LLM und Backends (s)")
+    args = parser.parse_args()
+
+    with temporary_workdir("kings-singleflight-") as workdir:
+        results = run_checks(args, workdir)
+    finish(results)
+
+if __name__ == "__main__":
+    main()
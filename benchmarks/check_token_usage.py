@@ -0,0 +1,45 @@
+# benchmarks/check_token_usage.py
+"""Token counts of traced LLM calls, with and without provider usage data.
+
+    python -m benchmarks.check_token_usage
+
+A streamed response from the chat model in main.py carries no usage data
+(neither ``llm_output["token_usage"]`` nor ``usage_metadata``); the
+tracing callback must then count prompt and completion tokens itself
+instead of reporting 0. Usage the provider does report is taken as is.
+Exits with status 1 if any case fails.
+"""
+
+from langchain_core.messages import HumanMessage
+
+from benchmarks.checks import check, finish
+from benchmarks.fakes import ScriptedReActChatModel
+from Tools_agent.tracing import TracingCallbackHandler, metrics
+
+PROMPT = "Welche Nebenwirkungen hat Ibuprofen? Bitte kurz und auf Deutsch antworten."
+
+def traced_span(llm):
+    tracer = TracingCallbackHandler()
+    llm.invoke([HumanMessage(content=PROMPT)], config={"callbacks": [tracer]})
+    return tracer.spans[-1]
+
+def main():
+    results = []
+
+    span = traced_span(ScriptedReActChatModel(streaming=True))
+    detail = {key: span.get(key) for key in ("prompt_tokens", "completion_tokens", "tokens_estimated")}
+    results.append(check("Streaming ohne Usage", span["prompt_tokens"] > 0 and span["completion_tokens"] > 0
+                         and span.get("tokens_estimated") is True, detail))
+
+    span = traced_span(ScriptedReActChatModel(streaming=False))
+    expected = len(PROMPT.split())  # the fake reports whitespace-separated words as tokens
+    detail = {key: span.get(key) for key in ("prompt_tokens", "completion_tokens", "tokens_estimated")}
+    results.append(check("Usage des Providers", span["prompt_tokens"] == expected
+                         and "tokens_estimated" not in span, detail))
+
+    rendered = metrics.render()
+    results.append(check("llm_tokens_total", "llm_tokens_total" in rendered, "in /metrics"))
+    finish(results)
+
+if __name__ == "__main__":
+    main()
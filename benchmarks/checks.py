@@ -0,0 +1,31 @@
+# benchmarks/checks.py
+"""Shared helpers of the benchmarks/check_*.py scripts.
+
+Run the checks as modules from the repository root
+(``python -m benchmarks.check_...``), so the repository is on sys.path.
+"""
+
+import os
+import sys
+import tempfile
+from contextlib import contextmanager
+
+def check(name, ok, detail):
+    """Print one result line; returns ``ok``."""
+    print(f"{'✅' if ok else '❗'} {name}: {detail}")
+    return ok
+
+@contextmanager
+def temporary_workdir(prefix):
+    """Run the block in a fresh temporary directory that is removed afterwards."""
+    previous = os.getcwd()
+    with tempfile.TemporaryDirectory(prefix=prefix, ignore_cleanup_errors=True) as workdir:
+        os.chdir(workdir)
+        try:
+            yield workdir
+        finally:
+            os.chdir(previous)
+
+def finish(results):
+    """Exit with status 0 if every check passed, 1 otherwise."""
+    sys.exit(0 if all(results) else 1)
@@ -0,0 +1,11 @@
+// Cookie banner that stays hidden once accepted, like the real site's
+(function () {
+  var banner = document.getElementById("consent");
+  if (document.cookie.indexOf("consent=1") === -1) {
+    banner.hidden = false;
+  }
+  document.getElementById("onetrust-accept-btn-handler").addEventListener("click", function () {
+    document.cookie = "consent=1; path=/; max-age=31536000";
+    banner.hidden = true;
+  });
+})();
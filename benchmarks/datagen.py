@@ -0,0 +1,82 @@
+# benchmarks/datagen.py
+"""Synthetic FDA label datasets and FAISS corpora of configurable size."""
+
+import json
+import os
+import random
+
+SUBSTANCES = [
+    "ACETAMINOPHEN", "IBUPROFEN", "NAPROXEN SODIUM", "ASPIRIN", "DICLOFENAC SODIUM",
+    "LORATADINE", "CETIRIZINE HYDROCHLORIDE", "DIPHENHYDRAMINE HYDROCHLORIDE", "OMEPRAZOLE",
+    "RANITIDINE", "LOPERAMIDE HYDROCHLORIDE", "DEXTROMETHORPHAN HYDROBROMIDE", "GUAIFENESIN",
+    "PHENYLEPHRINE HYDROCHLORIDE", "CAFFEINE", "MENTHOL", "BENZOCAINE", "LIDOCAINE", "ZINC OXIDE",
+    "OCTINOXATE", "AVOBENZONE", "HYDROCORTISONE", "MICONAZOLE NITRATE", "CLOTRIMAZOLE",
+]
+BRAND_PARTS = ["Dafal", "Algi", "Pana", "Bru", "Vol", "Cla", "Zyr", "Nex", "Imo", "Muci", "Sud", "Tyle", "Adv", "Ben"]
+BRAND_SUFFIXES = ["gan", "for", "dol", "fen", "taren", "ritin", "tec", "ium", "dium", "nex", "afed", "nol", "il", "uron"]
+SENTENCES = [
+    "Nicht mehr als die empfohlene Dosis einnehmen.",
+    "Bei Raumtemperatur lagern und vor Feuchtigkeit schützen.",
+    "Vor der Anwendung in Schwangerschaft und Stillzeit einen Arzt fragen.",
+    "Bei allergischen Reaktionen die Anwendung sofort beenden.",
+    "Kann Schläfrigkeit verursachen, Vorsicht beim Führen von Fahrzeugen.",
+    "Ausser Reichweite von Kindern aufbewahren.",
+    "Temporarily relieves minor aches and pains due to headache and muscular aches.",
+    "Adults and children 12 years and over: take 1 tablet every 4 to 6 hours.",
+    "Stop use and ask a doctor if pain gets worse or lasts more than 10 days.",
+    "Liver warning: this product contains acetaminophen.",
+]
+LABEL_FIELDS = [
+    "indications_and_usage", "dosage_and_administration", "warnings", "pregnancy_or_breast_feeding",
+    "storage_and_handling", "adverse_reactions", "stop_use", "do_not_use", "purpose",
+    "active_ingredient", "inactive_ingredient", "questions",
+]
+
+def brand_name(rng):
+    return rng.choice(BRAND_PARTS) + rng.choice(BRAND_SUFFIXES)
+
+def paragraph(rng, sentences=4):
+    return " ".join(rng.choice(SENTENCES) for _ in range(sentences))
+
+def synthetic_label(rng, index):
+    substances = rng.sample(SUBSTANCES, rng.randint(1, 2))
+    label = {
+        "id": f"synthetic-{index}",
+        "openfda": {
+            "brand_name": [f"{brand_name(rng)} {rng.choice(['Forte', 'Junior', '500', 'Plus', ''])}".strip()],
+            "generic_name": [" AND ".join(substances)],
+            "substance_name": substances,
+        },
+    }
+    for field in rng.sample(LABEL_FIELDS, rng.randint(5, len(LABEL_FIELDS))):
+        label[field] = [paragraph(rng, rng.randint(2, 8))]
+    return label
+
+def generate_fda_dataset(path, size, seed=0):
+    """Write ``{"results": [...]}`` with ``size`` synthetic labels to ``path``."""
+    rng = random.Random(seed)
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"results": [synthetic_label(rng, i) for i in range(size)]}, f)
+    return path
+
+def synthetic_chunks(size, seed=0):
+    """``size`` chunk texts of roughly the ingestion chunk size (500 characters)."""
+    rng = random.Random(seed)
+    chunks = []
+    for i in range(size):
+        substance = rng.choice(SUBSTANCES).lower()
+        text = f"{brand_name(rng)} ({substance}), Abschnitt {i}: {paragraph(rng, 5)}"
+        chunks.append(text[:500])
+    return chunks
+
+def generate_faiss_corpus(folder, size, embeddings, seed=0):
+    """Build and save a FAISS index over ``size`` synthetic chunks with the given embeddings."""
+    from langchain_community.vectorstores import FAISS
+
+    texts = synthetic_chunks(size, seed)
+    metadatas = [{"doc_id": f"synthetic-{i // 20}", "source": f"synthetic-{i // 20}.pdf", "page": i % 20 + 1,
+                  "chunk_offset": 0} for i in range(size)]
+    vs = FAISS.from_texts(texts, embeddings, metadatas=metadatas)
+    vs.save_local(folder)
+    return vs
@@ -0,0 +1,129 @@
+# benchmarks/eval_retrieval.py
+"""Retrieval quality of search_faiss: dense only, BM25 only, hybrid (RRF) and hybrid with reranker.
+
+    python -m benchmarks.eval_retrieval
+    python -m benchmarks.eval_retrieval --backend local --reranker cross-encoder/mmarco-mMiniLMv2-L12-H384-v1
+
+The chunks and questions of benchmarks/retrieval_eval.json (drug names,
+doses, ATC codes) are hidden among ``--distractors`` synthetic chunks.
+For every mode it reports recall@k, MRR and the questions without a
+relevant chunk in the top k; the agent falls back to a web search
+(Tavily) for those, so they estimate the extra tool calls. ``--backend
+hash`` (the default) runs offline with the hashed benchmark embeddings,
+which are weaker than a real model; use ``local`` or ``openai`` for
+representative dense numbers.
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+from benchmarks.datagen import synthetic_chunks  # noqa: E402
+from benchmarks.run_benchmarks import summarize  # noqa: E402
+
+EVAL_SET = os.path.join(os.path.dirname(os.path.abspath(__file__)), "retrieval_eval.json")
+
+def build_corpus(folder, eval_set, distractors, embeddings):
+    """Save a FAISS index (with its BM25 index) over the eval chunks and the distractors."""
+    from langchain_community.vectorstores import FAISS
+    from Tools_agent.faiss_tool import save_faiss_index
+
+    ids = [document["id"] for document in eval_set["documents"]]
+    texts = [document["text"] for document in eval_set["documents"]]
+    for i, text in enumerate(synthetic_chunks(distractors)):
+        ids.append(f"distractor-{i}")
+        texts.append(text)
+    vs = FAISS.from_texts(texts, embeddings, ids=ids)
+    save_faiss_index(vs, folder)
+
+def evaluate(search, queries, k):
+    """``search(query)`` returns ranked docstore ids; recall@k, MRR and the misses."""
+    hits, reciprocal_ranks, misses, durations = 0, 0.0, [], []
+    for item in queries:
+        start = time.perf_counter()
+        ranking = search(item["query"])
+        durations.append(time.perf_counter() - start)
+        rank = next((i for i, doc_id in enumerate(ranking[:k], start=1) if doc_id in item["relevant"]), None)
+        if rank is None:
+            misses.append(item["query"])
+        else:
+            hits += 1
+            reciprocal_ranks += 1 / rank
+    return {
+        f"recall@{k}": round(hits / len(queries), 3),
+        "mrr": round(reciprocal_ranks / len(queries), 3),
+        "fallback_calls": len(misses),
+        "misses": misses,
+        "latency": summarize(durations),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Dense-, BM25- und hybride Suche auf einem Evaluationsset vergleichen.")
+    parser.add_argument("--backend", choices=["hash", "local", "openai"], default="hash", help="Embedding-Backend")
+    parser.add_argument("--distractors", type=int, default=5000, help="Synthetische Abschnitte neben dem Evaluationsset")
+    parser.add_argument("--k", type=int, default=3, help="Abschnitte, die search_faiss zurückgibt")
+    parser.add_argument("--reranker", default=None, help="Cross-Encoder-Modell für den Modus hybrid+rerank")
+    parser.add_argument("--output", default=None, help="Ergebnisse zusätzlich als JSON speichern")
+    args = parser.parse_args()
+
+    with open(EVAL_SET, encoding="utf-8") as f:
+        eval_set = json.load(f)
+
+    workdir = tempfile.mkdtemp(prefix="kings-retrieval-eval-")
+    os.chdir(workdir)
+    if args.reranker:
+        os.environ["RERANKER_MODEL"] = args.reranker
+    from Tools_agent import bm25_index, faiss_tool
+    from Tools_agent.config import override_client
+
+    if args.backend == "hash":
+        from benchmarks.fakes import HashEmbeddings
+        embeddings = HashEmbeddings()
+    else:
+        from Tools_agent.embedding_backend import build_embeddings
+        embeddings = build_embeddings(args.backend)
+    override_client("embeddings", embeddings)
+    faiss_tool.RERANKER_MODEL = args.reranker or ""
+
+    folder = os.path.join(workdir, "faiss_index")
+    start = time.perf_counter()
+    build_corpus(folder, eval_set, args.distractors, embeddings)
+    print(f"📚 {len(eval_set['documents'])} Eval-Abschnitte + {args.distractors} Distraktoren indexiert "
+          f"in {time.perf_counter() - start:.1f}s, {len(eval_set['queries'])} Fragen")
+    faiss_tool.faiss_store = faiss_tool.ResidentFAISSStore(folder)
+    bm25_index.lexical_index = bm25_index.ResidentBM25(folder)
+    lexical = bm25_index.lexical_index.get()
+
+    def ids(chunks):
+        return [doc_id for doc_id, _ in chunks]
+
+    modes = {
+        "dense": lambda query: ids(faiss_tool.retrieve(query, args.k, hybrid=False, reranker=False)),
+        "bm25": lambda query: [doc_id for doc_id, _ in lexical.search(query, args.k)],
+        "hybrid": lambda query: ids(faiss_tool.retrieve(query, args.k, hybrid=True, reranker=False)),
+    }
+    if args.reranker:
+        modes["hybrid+rerank"] = lambda query: ids(faiss_tool.retrieve(query, args.k, hybrid=True, reranker=True))
+
+    results = {}
+    for mode, search in modes.items():
+        search(eval_set["queries"][0]["query"])  # warm-up (lazy loads, compiled posting lists)
+        result = results[mode] = evaluate(search, eval_set["queries"], args.k)
+        print(f"  {mode:14} recall@{args.k} {result[f'recall@{args.k}']:.3f}  MRR {result['mrr']:.3f}  "
+              f"Web-Fallbacks {result['fallback_calls']:2d}  p50 {result['latency']['p50_ms']:.3f} ms")
+
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"backend": args.backend, "distractors": args.distractors, "results": results}, f, indent=2,
+                      ensure_ascii=False)
+        print(f"💾 Ergebnisse gespeichert: {args.output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,190 @@
+# benchmarks/fakes.py
+"""Deterministic stand-ins for the LLM, Tavily, OpenFDA and the embedding model."""
+
+import asyncio
+import hashlib
+import json
+import re
+import threading
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import numpy as np
+import requests
+from langchain_core.embeddings import Embeddings
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+# === Scripted ReAct LLM ===
+class ScriptedReActChatModel(BaseChatModel):
+    """Chat model that replays a fixed ReAct trace: one Action per tool in ``tool_plan``, then a Final Answer.
+
+    The current step is derived from the number of observations already in
+    the agent scratchpad, so the same model works for any number of
+    concurrent agent runs. Prompts that are not ReAct prompts (e.g. the
+    fan-out summary) get the final answer directly.
+    """
+
+    tool_plan: list = ["OpenFDATool", "CompendiumTool"]
+    latency: float = 0.0
+    final_answer: str = "Dies ist eine synthetische Antwort für den Benchmark."
+    streaming: bool = False
+
+    @property
+    def _llm_type(self):
+        return "scripted-react"
+
+    def _should_stream(self, *, async_api, run_manager=None, **kwargs):
+        return self.streaming
+
+    def _reply(self, messages):
+        prompt = messages[-1].content
+        question = prompt.rsplit("Question:", 1)[-1]
+        if "Question:" not in prompt:
+            return f"Final Answer: {self.final_answer}"
+
+        step = question.count("Observation:")
+        medication = re.search(r"(\S+)\?", question)
+        medication = medication.group(1) if medication else question.strip().split("\n")[0]
+        if step < len(self.tool_plan):
+            return (
+                f"Ich sollte {self.tool_plan[step]} verwenden.\n"
+                f"Action: {self.tool_plan[step]}\n"
+                f"Action Input: {medication}"
+            )
+        return f"Ich kenne jetzt die Antwort.\nFinal Answer: {self.final_answer}"
+
+    def _result(self, text, messages):
+        prompt_tokens = sum(len(m.content.split()) for m in messages)
+        usage = {"prompt_tokens": prompt_tokens, "completion_tokens": len(text.split()),
+                 "total_tokens": prompt_tokens + len(text.split())}
+        return ChatResult(
+            generations=[ChatGeneration(message=AIMessage(content=text))],
+            llm_output={"token_usage": usage, "model_name": self._llm_type},
+        )
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        time.sleep(self.latency)
+        return self._result(self._reply(messages), messages)
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs):
+        await asyncio.sleep(self.latency)
+        return self._result(self._reply(messages), messages)
+
+    def _stream(self, messages, stop=None, run_manager=None, **kwargs):
+        time.sleep(self.latency)
+        for word in re.findall(r"\S+\s*", self._reply(messages)):
+            yield ChatGenerationChunk(message=AIMessageChunk(content=word))
+
+    async def _astream(self, messages, stop=None, run_manager=None, **kwargs):
+        await asyncio.sleep(self.latency)
+        for word in re.findall(r"\S+\s*", self._reply(messages)):
+            yield ChatGenerationChunk(message=AIMessageChunk(content=word))
+
+# === Embeddings ===
+class HashEmbeddings(Embeddings):
+    """Bag-of-words hashing embeddings: deterministic, offline and similar texts end up close."""
+
+    def __init__(self, dim=256, latency=0.0):
+        self.dim = dim
+        self.latency = latency
+        self.model = f"hash-{dim}"
+
+    def _vector(self, text):
+        vector = np.zeros(self.dim, dtype=np.float32)
+        for word in re.findall(r"\w+", text.lower()):
+            vector[int(hashlib.md5(word.encode("utf-8")).hexdigest()[:8], 16) % self.dim] += 1.0
+        norm = np.linalg.norm(vector)
+        return (vector / norm if norm else vector).tolist()
+
+    def embed_documents(self, texts):
+        time.sleep(self.latency)
+        return [self._vector(text) for text in texts]
+
+    def embed_query(self, text):
+        time.sleep(self.latency)
+        return self._vector(text)
+
+# === Fake Tavily / OpenFDA Backends ===
+class FakeBackendServer:
+    """Local HTTP server answering Tavily ``POST /search`` and OpenFDA ``GET /drug/label.json`` with fixed latency."""
+
+    def __init__(self, latency=0.05, fda_results=None):
+        self.latency = latency
+        self.fda_results = fda_results or []
+        self.requests = {"tavily": 0, "openfda": 0}
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self._server.server_port}"
+
+    def _count(self, backend):
+        with self._lock:
+            self.requests[backend] += 1
+
+    def _handler(self):
+        backend = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            wbufsize = -1
+
+            def log_message(self, *args):
+                pass
+
+            def _send(self, status, payload):
+                body = json.dumps(payload).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+                self.wfile.flush()
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length", 0))
+                query = json.loads(self.rfile.read(length) or b"{}").get("query", "")
+                backend._count("tavily")
+                time.sleep(backend.latency)
+                self._send(200, {
+                    "answer": f"Synthetische Antwort zu {query}.",
+                    "results": [{"url": f"https://example.org/{i}/{zlib.crc32(query.encode('utf-8')) % 10000}"} for i in range(5)],
+                })
+
+            def do_GET(self):
+                params = parse_qs(urlparse(self.path).query)
+                backend._count("openfda")
+                time.sleep(backend.latency)
+                limit = int(params.get("limit", ["3"])[0])
+                if not backend.fda_results:
+                    self._send(404, {"error": {"code": "NOT_FOUND"}})
+                else:
+                    self._send(200, {"results": backend.fda_results[:limit]})
+
+        return Handler
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+class HTTPTavilyClient:
+    """Drop-in for ``TavilyClient.search`` that talks to FakeBackendServer over a pooled session."""
+
+    def __init__(self, base_url):
+        self.base_url = base_url
+        self.session = requests.Session()
+
+    def search(self, query, **kwargs):
+        response = self.session.post(f"{self.base_url}/search", json={"query": query, **kwargs}, timeout=30)
+        response.raise_for_status()
+        return response.json()
@@ -0,0 +1,334 @@
+# benchmarks/run_benchmarks.py
+"""Offline performance benchmarks for the agent API and the local data tools.
+
+    python -m benchmarks.run_benchmarks --output data/benchmarks/latest.json
+    python -m benchmarks.run_benchmarks --quick --compare data/benchmarks/baseline.json
+
+Runs without network access or API credits: the LLM is a scripted ReAct
+model, Tavily and OpenFDA are served by a local HTTP server with
+configurable latency, embeddings are hashed and the FDA dataset and FAISS
+corpora are generated. Everything is written to a temporary working
+directory, never to the repository's ``data/`` folder.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import resource
+import sys
+import tempfile
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+from benchmarks.datagen import generate_faiss_corpus, generate_fda_dataset, synthetic_label  # noqa: E402
+from benchmarks.fakes import FakeBackendServer, HashEmbeddings, HTTPTavilyClient, ScriptedReActChatModel  # noqa: E402
+
+SECRETS_TOML = """
+[openai]
+OPENAI_KEY = "sk-benchmark"
+open_ai_key = "sk-benchmark"
+[tavily]
+TAVILY_API_KEY = "tvly-benchmark"
+[openfda]
+OPENFDA_API_KEY = ""
+"""
+
+# === Measurement Helpers ===
+def percentile(values, p):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(p / 100 * (len(ordered) - 1))))]
+
+def summarize(durations):
+    if not durations:
+        return {"n": 0}
+    return {
+        "n": len(durations),
+        "mean_ms": round(sum(durations) / len(durations) * 1000, 3),
+        "p50_ms": round(percentile(durations, 50) * 1000, 3),
+        "p95_ms": round(percentile(durations, 95) * 1000, 3),
+        "p99_ms": round(percentile(durations, 99) * 1000, 3),
+    }
+
+def rss_mb():
+    try:
+        with open("/proc/self/statm") as f:
+            return round(int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 1e6, 1)
+    except (OSError, ValueError):
+        return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+
+def timed(func, *args):
+    start = time.perf_counter()
+    func(*args)
+    return time.perf_counter() - start
+
+# === Setup ===
+def prepare_workdir(workdir, backend):
+    """Point the app at the fake backends and a throwaway working directory (before importing it)."""
+    os.makedirs(os.path.join(workdir, ".streamlit"), exist_ok=True)
+    with open(os.path.join(workdir, ".streamlit", "secrets.toml"), "w", encoding="utf-8") as f:
+        f.write(SECRETS_TOML)
+    os.environ.update({
+        "OPENAI_KEY": "sk-benchmark",
+        "TAVILY_API_KEY": "tvly-benchmark",
+        "OPENFDA_API_URL": f"{backend.url}/drug/label.json",
+        "OPENFDA_REQUESTS_PER_MINUTE": "1000000",
+        "OPENFDA_BURST": "100000",
+    })
+    os.chdir(workdir)
+
+def install_fakes(backend, embeddings):
+    from Tools_agent.config import override_client
+
+    override_client("tavily", HTTPTavilyClient(backend.url))
+    override_client("embeddings", embeddings)
+
+def use_fda_dataset(size, compiled=False):
+    """Point the local FDA search at a generated dataset, optionally through a compiled store."""
+    from Tools_agent import openfda_tool
+    from Tools_agent.fda_store import FDALabelStore, compile_store
+
+    path = os.path.join("data", f"dataset-{size}.json")
+    if not os.path.exists(path):
+        generate_fda_dataset(path, size)
+    store_path = os.path.join("data", f"fda_labels-{size}.sqlite")
+    if compiled and not os.path.exists(store_path):
+        compile_store(path, store_path)
+    openfda_tool.local_fda_index = openfda_tool.LocalFDAIndex(path)
+    openfda_tool.fda_label_store = FDALabelStore(store_path if compiled else os.path.join("data", "none.sqlite"), path)
+    return openfda_tool.fda_label_store if compiled else openfda_tool.local_fda_index
+
+def use_faiss_corpus(size, embeddings):
+    from Tools_agent import faiss_tool
+
+    folder = os.path.join("data", f"faiss-{size}")
+    generate_faiss_corpus(folder, size, embeddings)
+    faiss_tool.faiss_store = faiss_tool.ResidentFAISSStore(folder)
+    return faiss_tool.faiss_store
+
+# === Benchmarks ===
+def bench_tools(iterations):
+    """Cold (unique query, backend hit) and warm (repeated query) latency of every tool function."""
+    from Tools_agent.alerts_tool import search_medication_alerts
+    from Tools_agent.compendium_tool import get_compendium_info
+    from Tools_agent.faiss_tool import search_faiss
+    from Tools_agent.openfda_tool import search_openfda
+    from Tools_agent.tavily_tool import smart_tavily_answer
+
+    tools = {
+        "CompendiumTool": get_compendium_info,
+        "TavilySearchTool": smart_tavily_answer,
+        "MedicationAlertsTool": search_medication_alerts,
+        "OpenFDATool": search_openfda,
+        "FAISSRetrieverTool": search_faiss,
+    }
+    results = {}
+    for name, func in tools.items():
+        cold = [timed(func, f"Kaltstart{name}{i}") for i in range(iterations)]
+        warm = [timed(func, "ibuprofen") for _ in range(iterations)]
+        results[name] = {"cold": summarize(cold), "warm": summarize(warm)}
+    return results
+
+def bench_agent_overhead(main, iterations):
+    """Time of an agent run that is not spent inside tools (LLM latency is zero here)."""
+    from langchain_core.callbacks import BaseCallbackHandler
+
+    class ToolTimer(BaseCallbackHandler):
+        def __init__(self):
+            self.started = {}
+            self.total = 0.0
+
+        def on_tool_start(self, serialized, input_str, *, run_id, **kwargs):
+            self.started[run_id] = time.perf_counter()
+
+        def on_tool_end(self, output, *, run_id, **kwargs):
+            self.total += time.perf_counter() - self.started.pop(run_id, time.perf_counter())
+
+    totals, overheads = [], []
+    for i in range(iterations):
+        timer = ToolTimer()
+        start = time.perf_counter()
+        main.agent.invoke({"input": f"Dosierung Overhead{i}? (Medikament)"}, config={"callbacks": [timer]})
+        total = time.perf_counter() - start
+        totals.append(total)
+        overheads.append(total - timer.total)
+    return {"total": summarize(totals), "overhead": summarize(overheads)}
+
+async def _query_load(main, concurrency, requests_total, prefix):
+    import httpx
+
+    transport = httpx.ASGITransport(app=main.app)
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies, statuses = [], {}
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=300) as client:
+        async def one(i):
+            async with semaphore:
+                body = {"question_type": "Wie lautet die empfohlene Dosierung von", "input_type": "Medikament",
+                        "medication_name": f"{prefix}{i}"}
+                start = time.perf_counter()
+                response = await client.post("/query", json=body)
+                latencies.append(time.perf_counter() - start)
+                statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+
+        start = time.perf_counter()
+        await asyncio.gather(*(one(i) for i in range(requests_total)))
+        elapsed = time.perf_counter() - start
+
+    return {
+        "concurrency": concurrency,
+        "requests": requests_total,
+        "requests_per_second": round(requests_total / elapsed, 2),
+        "latency": summarize(latencies),
+        "status_codes": statuses,
+        "rss_mb": rss_mb(),
+    }
+
+def bench_query_load(main, concurrency_levels, requests_total):
+    """Throughput and latency of POST /query with distinct medications (no answer cache hits)."""
+    return [
+        asyncio.run(_query_load(main, concurrency, requests_total, f"Last{concurrency}x"))
+        for concurrency in concurrency_levels
+    ]
+
+MENU_QUESTIONS = [
+    "Welche Nebenwirkungen hat", "Wie lautet die empfohlene Dosierung von", "Wie sollte man lagern",
+    "Ist sicher in der Schwangerschaft und Stillzeit von", "Welche Inhaltsstoffe sind in",
+]
+
+def bench_fast_path(main, medications=("Dafalgan", "ibuprofen", "Aspirin", "loratadin")):
+    """Menu questions through answer_query with and without the fast path (answer cache bypassed)."""
+    results = {}
+    for label, fast_path in (("agent", False), ("fast_path", True)):
+        durations, routes = [], {}
+        for question_type in MENU_QUESTIONS:
+            for medication in medications:
+                main.answer_cache.invalidate(medication)
+                q = main.Query(question_type=question_type, input_type="Medikament", medication_name=medication,
+                               fast_path=fast_path)
+                start = time.perf_counter()
+                result = asyncio.run(main.answer_query(q))
+                durations.append(time.perf_counter() - start)
+                route = result.get("route", "agent")
+                routes[route] = routes.get(route, 0) + 1
+        results[label] = {"latency": summarize(durations), "routes": routes}
+    return results
+
+def bench_openfda_scaling(sizes, queries=("acetaminophen", "dafalgan", "sodium", "gibtesnicht")):
+    from Tools_agent import openfda_tool
+
+    curve = []
+    for size in sizes:
+        for backend in ("json", "store"):
+            index = use_fda_dataset(size, compiled=backend == "store")
+            load = timed(len, index)
+            lookups = [timed(openfda_tool.search_openfda_local, q) for q in queries for _ in range(20)]
+            curve.append({"labels": size, "backend": backend, "load_seconds": round(load, 3),
+                          "search": summarize(lookups), "rss_mb": rss_mb()})
+    return curve
+
+def bench_faiss_scaling(sizes, embeddings, queries=("Dosierung Ibuprofen", "Lagerung", "Schwangerschaft")):
+    from Tools_agent import faiss_tool
+
+    curve = []
+    for size in sizes:
+        store = use_faiss_corpus(size, embeddings)
+        load = timed(store.get)
+        lookups = [timed(faiss_tool.search_faiss, q) for q in queries for _ in range(20)]
+        curve.append({"chunks": size, "load_seconds": round(load, 3), "search": summarize(lookups), "rss_mb": rss_mb()})
+    return curve
+
+# === Reporting ===
+def flatten(results, prefix=""):
+    flat = {}
+    if isinstance(results, dict):
+        for key, value in results.items():
+            flat.update(flatten(value, f"{prefix}{key}."))
+    elif isinstance(results, list):
+        for i, value in enumerate(results):
+            flat.update(flatten(value, f"{prefix}{i}."))
+    elif isinstance(results, (int, float)) and not isinstance(results, bool):
+        flat[prefix[:-1]] = results
+    return flat
+
+def compare(results, baseline_path):
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = flatten(json.load(f))
+    current = flatten(results)
+    print(f"\n📊 Vergleich mit {baseline_path}")
+    for key, value in current.items():
+        if key.startswith("meta.") or key not in baseline or not baseline[key]:
+            continue
+        change = (value - baseline[key]) / baseline[key] * 100
+        if abs(change) >= 5:
+            print(f"  {key}: {baseline[key]} -> {value} ({change:+.0f}%)")
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline Benchmarks mit simuliertem LLM und simulierten Backends.")
+    parser.add_argument("--output", default=os.path.join(REPO_ROOT, "data", "benchmarks", "latest.json"))
+    parser.add_argument("--compare", default=None, help="Früheres Ergebnis-JSON zum Vergleich")
+    parser.add_argument("--quick", action="store_true", help="Kleine Grössen für einen schnellen Durchlauf")
+    parser.add_argument("--backend-latency", type=float, default=0.05, help="Latenz der simulierten Tavily/OpenFDA-Server (s)")
+    parser.add_argument("--llm-latency", type=float, default=0.2, help="Latenz pro simuliertem LLM-Aufruf (s)")
+    parser.add_argument("--concurrency", default="1,4,16", help="Parallelität für die /query-Last")
+    parser.add_argument("--requests", type=int, default=32, help="Anfragen pro Parallelitätsstufe")
+    args = parser.parse_args()
+
+    output = os.path.abspath(args.output)
+    baseline = os.path.abspath(args.compare) if args.compare else None
+    fda_sizes = [500, 2000] if args.quick else [1000, 10000, 50000]
+    faiss_sizes = [500, 2000] if args.quick else [1000, 10000, 50000]
+    iterations = 5 if args.quick else 20
+
+    backend = FakeBackendServer(latency=args.backend_latency, fda_results=[synthetic_label(__import__("random").Random(1), 0)])
+    backend.start()
+    workdir = tempfile.mkdtemp(prefix="kings-bench-")
+    prepare_workdir(workdir, backend)
+
+    embeddings = HashEmbeddings()
+    import main as app_main
+    install_fakes(backend, embeddings)
+    use_fda_dataset(fda_sizes[0])
+    use_faiss_corpus(faiss_sizes[0], embeddings)
+
+    results = {"meta": {"created_at": time.time(), "quick": args.quick, "backend_latency": args.backend_latency,
+                        "llm_latency": args.llm_latency, "workdir": workdir}}
+
+    print("🔧 Tool-Latenzen...")
+    results["tools"] = bench_tools(iterations)
+
+    print("🤖 Agent-Overhead...")
+    app_main.llm = ScriptedReActChatModel(latency=0.0)
+    app_main.agent = app_main.build_agent(app_main.llm, verbose=False)
+    results["agent"] = bench_agent_overhead(app_main, iterations)
+
+    print("🚦 /query unter Last...")
+    app_main.llm = ScriptedReActChatModel(latency=args.llm_latency)
+    app_main.agent = app_main.build_agent(app_main.llm, verbose=False)
+    levels = [int(level) for level in args.concurrency.split(",")]
+    results["query_load"] = bench_query_load(app_main, levels, args.requests)
+
+    print("⚡ Fast Path für Menüfragen...")
+    results["fast_path"] = bench_fast_path(app_main)
+
+    print("📦 Skalierung lokale FDA-Suche...")
+    results["openfda_local_scaling"] = bench_openfda_scaling(fda_sizes)
+
+    print("📚 Skalierung FAISS-Suche...")
+    results["faiss_scaling"] = bench_faiss_scaling(faiss_sizes, embeddings)
+
+    results["backend_requests"] = dict(backend.requests)
+    backend.stop()
+
+    os.makedirs(os.path.dirname(output), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+    print(f"✅ Ergebnisse gespeichert: {output}")
+
+    if baseline:
+        compare(results, baseline)
+
+if __name__ == "__main__":
+    main()
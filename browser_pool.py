@@ -0,0 +1,223 @@
+import asyncio
+import os
+import threading
+import time
+from contextlib import asynccontextmanager
+
+from browser_use import Browser, BrowserConfig
+from browser_use.browser.context import BrowserContextConfig
+
+# Point this at a local stand-in (e.g. benchmarks/compendium_stub) to run headless without the real site
+COMPENDIUM_BASE_URL = os.getenv("COMPENDIUM_BASE_URL", "https://compendium.ch/")
+BROWSER_POOL_SIZE = int(os.getenv("BROWSER_POOL_SIZE", "2"))
+# A context is closed and replaced after this many agent runs
+BROWSER_CONTEXT_MAX_USES = int(os.getenv("BROWSER_CONTEXT_MAX_USES", "20"))
+BROWSER_LEASE_TIMEOUT = float(os.getenv("BROWSER_LEASE_TIMEOUT", "60"))
+BROWSER_HEADLESS = os.getenv("BROWSER_HEADLESS", "1") != "0"
+
+# Buttons that accept the cookie banner; the first visible one is clicked
+CONSENT_SELECTORS = [
+    s.strip() for s in os.getenv(
+        "BROWSER_CONSENT_SELECTORS",
+        "#onetrust-accept-btn-handler, button:has-text('Alle akzeptieren'), "
+        "button:has-text('Akzeptieren'), button:has-text('Accept all')",
+    ).split(",")
+    if s.strip()
+]
+
+class BrowserPoolError(Exception):
+    pass
+
+class PooledContext:
+    def __init__(self, context):
+        self.context = context
+        self.uses = 0
+        self.created_at = time.time()
+
+class BrowserPool:
+    """Warmed browser-use contexts, already on the start page with the cookie banner accepted.
+
+    One browser and all its contexts live on a dedicated event loop thread,
+    so they survive Streamlit reruns. Callers lease a context for one agent
+    run; on return it is reset to the start page, and it is replaced when it
+    fails its health check or has reached ``max_uses``.
+    """
+
+    def __init__(self, size=BROWSER_POOL_SIZE, base_url=COMPENDIUM_BASE_URL, max_uses=BROWSER_CONTEXT_MAX_USES,
+                 headless=BROWSER_HEADLESS, context_config=None):
+        self.size = size
+        self.base_url = base_url
+        self.max_uses = max_uses
+        self.headless = headless
+        self.context_config = context_config or BrowserContextConfig()
+        self.browser = None
+        self._loop = None
+        self._thread = None
+        self._available = None
+        self._counters = {"leases": 0, "created": 0, "recycled": 0, "unhealthy": 0, "failed": 0}
+
+    # === Event Loop Thread ===
+    def start(self):
+        """Start the loop thread and warm all contexts in the background; returns the pool."""
+        if self._thread is not None:
+            return self
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name="browser-pool", daemon=True)
+        self._thread.start()
+        asyncio.run_coroutine_threadsafe(self._fill(), self._loop).result()
+        return self
+
+    def run(self, func, timeout=None):
+        """Run ``await func(context)`` with a leased browser-use context on the pool loop and return its result.
+
+        Blocking; meant for callers without their own event loop (Streamlit).
+        """
+        if self._thread is None:
+            raise BrowserPoolError("Browser-Pool wurde nicht gestartet.")
+        future = asyncio.run_coroutine_threadsafe(self._run_leased(func), self._loop)
+        return future.result(timeout)
+
+    async def _run_leased(self, func):
+        async with self.lease() as context:
+            return await func(context)
+
+    # === Contexts ===
+    async def _fill(self):
+        self.browser = Browser(config=BrowserConfig(headless=self.headless))
+        self._available = asyncio.Queue()
+        # Placeholders are turned into contexts by the first lease if warming did not finish or failed
+        for _ in range(self.size):
+            self._available.put_nowait(None)
+        for _ in range(self.size):
+            asyncio.ensure_future(self._warm_one())
+
+    async def _warm_one(self):
+        item = await self._available.get()
+        if item is None:
+            try:
+                item = await self._new_context()
+            except Exception as e:
+                print(f"❗ Browser-Kontext konnte nicht vorgewärmt werden: {e}")
+        self._available.put_nowait(item)
+
+    async def _new_context(self):
+        context = await self.browser.new_context(config=self.context_config)
+        try:
+            page = await context.get_current_page()
+            await page.goto(self.base_url, wait_until="domcontentloaded")
+            await accept_consent(page)
+        except Exception:
+            self._counters["failed"] += 1
+            await _close_quietly(context)
+            raise
+        self._counters["created"] += 1
+        return PooledContext(context)
+
+    async def _healthy(self, item):
+        try:
+            page = await item.context.get_current_page()
+            await page.evaluate("1")
+            return not page.is_closed()
+        except Exception:
+            return False
+
+    async def _reset(self, item):
+        """Close extra tabs and go back to the start page; the cookies (and consent) stay."""
+        session = await item.context.get_session()
+        pages = session.context.pages
+        for page in pages[1:]:
+            await page.close()
+        page = pages[0] if pages else await session.context.new_page()
+        await page.goto(self.base_url, wait_until="domcontentloaded")
+        await accept_consent(page, timeout_ms=200)
+
+    @asynccontextmanager
+    async def lease(self, timeout=BROWSER_LEASE_TIMEOUT):
+        """Lease a warmed context on the pool loop; it is reset or replaced when released."""
+        try:
+            item = await asyncio.wait_for(self._available.get(), timeout)
+        except asyncio.TimeoutError:
+            raise BrowserPoolError(f"Kein Browser-Kontext innerhalb von {timeout:g}s frei.")
+
+        try:
+            if item is not None and not await self._healthy(item):
+                self._counters["unhealthy"] += 1
+                await _close_quietly(item.context)
+                item = None
+            if item is None:
+                item = await self._new_context()
+        except Exception:
+            self._available.put_nowait(None)
+            raise
+
+        self._counters["leases"] += 1
+        try:
+            yield item.context
+        finally:
+            item.uses += 1
+            asyncio.ensure_future(self._release(item))
+
+    async def _release(self, item):
+        if item.uses >= self.max_uses:
+            self._counters["recycled"] += 1
+            await _close_quietly(item.context)
+            item = None
+        else:
+            try:
+                await self._reset(item)
+            except Exception as e:
+                print(f"⚠️ Browser-Kontext wird ersetzt: {e}")
+                self._counters["unhealthy"] += 1
+                await _close_quietly(item.context)
+                item = None
+
+        if item is None:
+            try:
+                item = await self._new_context()
+            except Exception as e:
+                print(f"❗ Browser-Kontext konnte nicht ersetzt werden: {e}")
+        self._available.put_nowait(item)
+
+    # === Housekeeping ===
+    def stats(self):
+        available = self._available.qsize() if self._available is not None else 0
+        return {"size": self.size, "available": available, "base_url": self.base_url,
+                "max_uses": self.max_uses, **self._counters}
+
+    def close(self, timeout=30):
+        if self._thread is None:
+            return
+
+        async def shutdown():
+            while not self._available.empty():
+                item = self._available.get_nowait()
+                if item is not None:
+                    await _close_quietly(item.context)
+            if self.browser is not None:
+                await self.browser.close()
+
+        try:
+            asyncio.run_coroutine_threadsafe(shutdown(), self._loop).result(timeout)
+        finally:
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join(timeout)
+            self._thread = None
+
+async def accept_consent(page, timeout_ms=2000):
+    """Click the cookie banner's accept button if one shows up; returns whether one was clicked."""
+    for selector in CONSENT_SELECTORS:
+        try:
+            button = page.locator(selector).first
+            await button.wait_for(state="visible", timeout=timeout_ms)
+            await button.click()
+            return True
+        except Exception:
+            # Only wait the full time for the first selector; the banner is either there or not
+            timeout_ms = 200
+    return False
+
+async def _close_quietly(context):
+    try:
+        await context.close()
+    except Exception as e:
+        print(f"⚠️ Browser-Kontext konnte nicht geschlossen werden: {e}")
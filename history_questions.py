@@ -1,47 +1,147 @@
 import os
+import sqlite3
+import threading
+import time
+
+# Next to the other local databases, not in the repository root
+HISTORY_DB_PATH = os.getenv("HISTORY_DB_PATH", "data/history.sqlite")
+
+def normalize_question(question):
+    """Case- and whitespace-insensitive form used to count repeated questions."""
+    return " ".join(question.casefold().split())
 
 class HistoryQuestions:
-    def __init__(self, history_file="history.txt"):
+    """Question history in SQLite: appends are single inserts and reads are paginated.
+
+    Every question is stored as its own row, so the order is kept and new
+    entries can be read incrementally by id. A second table keeps the count
+    per normalized question. WAL mode lets several Streamlit processes write
+    while others read.
+    """
+
+    def __init__(self, db_path=HISTORY_DB_PATH, history_file="history.txt"):
+        self.db_path = db_path
+        # Old text-file history, imported once into the database
         self.history_file = history_file
-        self.history = []
-        self.load_history()
+        self._lock = threading.Lock()
+        self._conn = None
+
+    def _db(self):
+        if self._conn is None:
+            os.makedirs(os.path.dirname(os.path.abspath(self.db_path)), exist_ok=True)
+            conn = sqlite3.connect(self.db_path, timeout=30, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS questions ("
+                "id INTEGER PRIMARY KEY AUTOINCREMENT, question TEXT, normalized TEXT, asked_at REAL)"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS question_counts ("
+                "normalized TEXT PRIMARY KEY, question TEXT, count INTEGER, last_asked REAL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS question_counts_count ON question_counts (count)")
+            conn.execute("CREATE TABLE IF NOT EXISTS history_meta (key TEXT PRIMARY KEY, value TEXT)")
+            conn.commit()
+            self._conn = conn
+            self._import_text_history()
+        return self._conn
+
+    def _import_text_history(self):
+        """Copy history.txt into the database the first time it is opened."""
+        conn = self._conn
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            done = conn.execute("SELECT value FROM history_meta WHERE key = 'imported_text_history'").fetchone()
+            if done is not None:
+                return
+            imported = 0
+            if os.path.exists(self.history_file):
+                try:
+                    with open(self.history_file, "r", encoding="utf-8") as f:
+                        lines = [line.strip() for line in f if line.strip()]
+                except Exception as e:
+                    print(f"Error loading file: {e}")
+                    lines = []
+                now = time.time()
+                for question in lines:
+                    self._insert(conn, question, now)
+                imported = len(lines)
+            conn.execute(
+                "INSERT INTO history_meta (key, value) VALUES ('imported_text_history', ?)", (str(imported),)
+            )
+
+    def _insert(self, conn, question, asked_at):
+        normalized = normalize_question(question)
+        cursor = conn.execute(
+            "INSERT INTO questions (question, normalized, asked_at) VALUES (?, ?, ?)",
+            (question, normalized, asked_at),
+        )
+        conn.execute(
+            "INSERT INTO question_counts (normalized, question, count, last_asked) VALUES (?, ?, 1, ?) "
+            "ON CONFLICT(normalized) DO UPDATE SET count = count + 1, question = excluded.question, "
+            "last_asked = excluded.last_asked",
+            (normalized, question, asked_at),
+        )
+        return cursor.lastrowid
 
     def add_question(self, question: str):
-        """Add a non-empty question to both the in-memory list and file."""
+        """Store a non-empty question; returns its id (or None)."""
         question = question.strip()
-        if question:
-            self.history.append(question)
+        if not question:
+            return None
+        with self._lock:
             try:
-                with open(self.history_file, "a", encoding="utf-8") as f:
-                    f.write(question + "\n")
-            except Exception as e:
-                print(f"Error writing to file: {e}")
+                conn = self._db()
+                with conn:
+                    return self._insert(conn, question, time.time())
+            except sqlite3.Error as e:
+                print(f"Error writing to history: {e}")
+                return None
 
-    def get_history(self):
-        """Return the latest in-memory list of questions."""
-        # Reload to ensure we pick up any external changes
-        self.load_history()
-        return self.history
+    def get_history(self, limit=50, offset=0):
+        """Return one page of questions, newest first."""
+        return [row["question"] for row in self.get_entries(limit, offset)]
+
+    def get_entries(self, limit=50, offset=0):
+        """Like get_history, with id and timestamp per entry."""
+        return self._select(
+            "SELECT id, question, asked_at FROM questions ORDER BY id DESC LIMIT ? OFFSET ?", (limit, offset)
+        )
+
+    def tail(self, after_id=0, limit=100):
+        """Entries added after ``after_id``, oldest first, for incremental reads."""
+        return self._select(
+            "SELECT id, question, asked_at FROM questions WHERE id > ? ORDER BY id LIMIT ?", (after_id, limit)
+        )
+
+    def _select(self, sql, params):
+        with self._lock:
+            try:
+                rows = self._db().execute(sql, params).fetchall()
+            except sqlite3.Error as e:
+                print(f"Error reading history: {e}")
+                return []
+        return [{"id": row[0], "question": row[1], "asked_at": row[2]} for row in rows]
+
+    def frequencies(self, limit=10):
+        """Most frequently asked questions as (question, count), grouped by normalized text."""
+        with self._lock:
+            try:
+                return self._db().execute(
+                    "SELECT question, count FROM question_counts ORDER BY count DESC, last_asked DESC LIMIT ?",
+                    (limit,),
+                ).fetchall()
+            except sqlite3.Error as e:
+                print(f"Error reading history: {e}")
+                return []
 
     def clear_history(self):
-        """Clear the entire history and empty the file."""
-        self.history = []
-        try:
-            with open(self.history_file, "w", encoding="utf-8") as f:
-                f.write("")
-        except Exception as e:
-            print(f"Error clearing file: {e}")
-
-    def load_history(self):
-        """Load questions from the file into memory."""
-        if not os.path.exists(self.history_file):
-            self.history = []
-            return
-
-        try:
-            with open(self.history_file, "r", encoding="utf-8") as f:
-                lines = f.readlines()
-            self.history = [line.strip() for line in lines if line.strip()]
-        except Exception as e:
-            print(f"Error loading file: {e}")
-            self.history = []
+        """Delete the entire history."""
+        with self._lock:
+            try:
+                conn = self._db()
+                with conn:
+                    conn.execute("DELETE FROM questions")
+                    conn.execute("DELETE FROM question_counts")
+            except sqlite3.Error as e:
+                print(f"Error clearing history: {e}")
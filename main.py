@@ -1,17 +1,34 @@
 from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
 from pydantic import BaseModel
+from typing import List, Optional
 from langchain.chat_models import ChatOpenAI
 from langchain.agents import initialize_agent, AgentType
 from langchain.tools import Tool
+from langchain_core.callbacks import AsyncCallbackHandler
 import os
+import json
+import asyncio
+from contextlib import asynccontextmanager
 from dotenv import load_dotenv
 
 from Tools_agent.compendium_tool import get_compendium_info
-from Tools_agent.faiss_tool import search_faiss
-from Tools_agent.openfda_tool import search_openfda
+from Tools_agent.faiss_tool import search_faiss, faiss_store, get_embedding_model
+from Tools_agent.faiss_index import serving_index
+from Tools_agent import bm25_index
+from Tools_agent.openfda_tool import search_openfda, asearch_openfda
 from Tools_agent.tavily_tool import smart_tavily_answer
 from Tools_agent.alerts_tool import search_medication_alerts
+from Tools_agent.tavily_cache import tavily_cache
+from Tools_agent.config import get_secret
+from Tools_agent.executor import to_async
+from Tools_agent.fanout import answer_with_fanout
+from Tools_agent.fast_path import answer_fast_path
+from Tools_agent.output_budget import log_token_savings, question_context
+from Tools_agent.singleflight import AsyncSingleFlight, async_tool_flight, tool_flight
+from Tools_agent.answer_cache import answer_cache, query_key
+from Tools_agent.tracing import TracingCallbackHandler, metrics
 
 load_dotenv()
 
@@ -26,68 +43,395 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Per-worker limits: queries beyond MAX_CONCURRENT_QUERIES wait in a queue of
+# MAX_QUEUED_QUERIES, everything beyond that is rejected with 503 + Retry-After.
+MAX_CONCURRENT_QUERIES = int(os.getenv("MAX_CONCURRENT_QUERIES", "8"))
+MAX_QUEUED_QUERIES = int(os.getenv("MAX_QUEUED_QUERIES", "32"))
+QUERY_RETRY_AFTER_SECONDS = int(os.getenv("QUERY_RETRY_AFTER_SECONDS", "10"))
+
+class QueueFullError(Exception):
+    pass
+
+class QueryLimiter:
+    """Bound the number of agent runs per worker and the number of requests waiting for one."""
+
+    def __init__(self, max_concurrent, max_queued):
+        self._semaphore = asyncio.Semaphore(max_concurrent)
+        self.max_concurrent = max_concurrent
+        self.max_queued = max_queued
+        self.active = 0
+        self.waiting = 0
+
+    def is_full(self):
+        return self._semaphore.locked() and self.waiting >= self.max_queued
+
+    @asynccontextmanager
+    async def slot(self, enforce_queue_limit=True):
+        if enforce_queue_limit and self.is_full():
+            raise QueueFullError()
+        self.waiting += 1
+        try:
+            await self._semaphore.acquire()
+        finally:
+            self.waiting -= 1
+        self.active += 1
+        try:
+            yield
+        finally:
+            self.active -= 1
+            self._semaphore.release()
+
+query_limiter = QueryLimiter(MAX_CONCURRENT_QUERIES, MAX_QUEUED_QUERIES)
+
+@app.exception_handler(QueueFullError)
+async def queue_full_handler(request: Request, exc: QueueFullError):
+    return JSONResponse(
+        status_code=503,
+        content={"error": "Zu viele gleichzeitige Anfragen, bitte später erneut versuchen."},
+        headers={"Retry-After": str(QUERY_RETRY_AFTER_SECONDS)},
+    )
+
 class Query(BaseModel):
     question_type: str
     input_type: str
     medication_name: str
+    # "agent" runs the ReAct loop, "fanout" queries all sources in parallel and answers in one LLM call
+    mode: str = "agent"
+    # Add a per-request breakdown of LLM and tool time to the response
+    include_timings: bool = False
+    # Answer menu questions straight from the local label sections when possible
+    fast_path: bool = True
 
 # Define tools
 tools = [
-    Tool(name="CompendiumTool", func=get_compendium_info, description="Medikamenteninfos von Compendium.ch"),
-    Tool(name="FAISSRetrieverTool", func=search_faiss, description="Lokale medizinische FAISS-Datenbank"),
-    Tool(name="OpenFDATool", func=search_openfda, description="OpenFDA-Datenbank"),
-    Tool(name="TavilySearchTool", func=smart_tavily_answer, description="Websuche"),
-    Tool(name="MedicationAlertsTool", func=search_medication_alerts, description="Medikamentenwarnungen"),
+    Tool(name="CompendiumTool", func=get_compendium_info, coroutine=to_async(get_compendium_info), description="Medikamenteninfos von Compendium.ch"),
+    Tool(name="FAISSRetrieverTool", func=search_faiss, coroutine=to_async(search_faiss), description="Lokale medizinische FAISS-Datenbank"),
+    Tool(name="OpenFDATool", func=search_openfda, coroutine=asearch_openfda, description="OpenFDA-Datenbank"),
+    Tool(name="TavilySearchTool", func=smart_tavily_answer, coroutine=to_async(smart_tavily_answer), description="Websuche"),
+    Tool(name="MedicationAlertsTool", func=search_medication_alerts, coroutine=to_async(search_medication_alerts), description="Medikamentenwarnungen"),
 ]
 
 # LangChain agent setup
 llm = ChatOpenAI(
     model="gpt-4o",
     temperature=0.2,
-    openai_api_key=os.getenv("OPENAI_KEY"),
+    streaming=True,
+    openai_api_key=get_secret("openai", "OPENAI_KEY"),
 )
 
-agent = initialize_agent(
-    tools=tools,
-    llm=llm,
-    agent=AgentType.ZERO_SHOT_REACT_DESCRIPTION,
-    verbose=True,
-    handle_parsing_errors=True,
-    agent_kwargs={
-        "system_message": (
-            "Du bist ein klinischer Assistent. Nutze Tools. "
-            "Lies sorgfältig Antworten. Antworte auf Deutsch und präzise."
-        ),
-        "return_intermediate_steps": True,
-        "max_iterations": 5,
+def build_agent(llm, verbose=True):
+    return initialize_agent(
+        tools=tools,
+        llm=llm,
+        agent=AgentType.ZERO_SHOT_REACT_DESCRIPTION,
+        verbose=verbose,
+        handle_parsing_errors=True,
+        return_intermediate_steps=True,
+        max_iterations=5,
+        agent_kwargs={
+            "system_message": (
+                "Du bist ein klinischer Assistent. Nutze Tools. "
+                "Lies sorgfältig Antworten. Antworte auf Deutsch und präzise."
+            ),
+        }
+    )
+
+agent = build_agent(llm)
+
+# Tool output sent per step in the SSE stream is cut to this many characters
+STREAM_OUTPUT_CHARS = int(os.getenv("STREAM_OUTPUT_CHARS", "1000"))
+FINAL_ANSWER_MARKER = "Final Answer:"
+
+def build_prompt(q: Query):
+    return f"{q.question_type} {q.medication_name}? ({q.input_type})"
+
+def format_step(action, tool_output, max_output_chars=None):
+    """Structured view of one (AgentAction, observation) pair."""
+    output = str(tool_output)
+    return {
+        "thought": action.log,
+        "tool": action.tool,
+        "input": action.tool_input,
+        "output": output if max_output_chars is None else output[:max_output_chars],
+        "links": [w for w in output.split() if w.startswith("http")]
     }
-)
 
 @app.post("/query")
 async def query_agent(q: Query):
-    prompt = f"{q.question_type} {q.medication_name}? ({q.input_type})"
+    return await answer_query(q)
+
+# Concurrent identical queries (same normalized key, mode and routing) share one run
+query_flight = AsyncSingleFlight("queries")
 
+async def answer_query(q: Query, enforce_queue_limit=True):
+    """Answer one structured query from the answer cache or by running the agent."""
+    tracer = TracingCallbackHandler()
+    queue_seconds = 0.0
+    result = answer_cache.get(q.question_type, q.input_type, q.medication_name, q.mode, q.fast_path)
+
+    tally = None
+    if result is None:
+        key, _ = query_key(q.question_type, q.input_type, q.medication_name, q.mode, q.fast_path)
+        (result, queue_seconds, tally), shared = await query_flight.do(
+            (key, q.mode, q.fast_path), lambda: _answer_uncached(q, tracer, enforce_queue_limit)
+        )
+        # Every caller gets its own copy; only the one that ran it reports timings and token savings
+        result = dict(result)
+        if shared:
+            result["coalesced"] = True
+            queue_seconds, tally = 0.0, None
+
+    metrics.observe("query_duration_seconds", tracer.elapsed(), mode=result.get("route", q.mode), cached=str(result.get("cached", False)).lower(),
+                    help="End-to-end /query duration")
+    if q.include_timings:
+        result["timings"] = {**tracer.timings(), "queue_seconds": round(queue_seconds, 4), "tool_tokens": tally}
+    return result
+
+async def _answer_uncached(q, tracer, enforce_queue_limit):
+    """Run the fast path, fan-out or agent for a cache miss; returns (result, queue seconds, token tally)."""
+    prompt = build_prompt(q)
+    async with query_limiter.slot(enforce_queue_limit):
+        queue_seconds = tracer.elapsed()
+        # Tools see the question type and select only the relevant label sections
+        with question_context(q.question_type) as tally:
+            result = None
+            if q.fast_path:
+                result = await _run_fast_path(q, prompt, tracer)
+            if result is None:
+                if q.mode == "fanout":
+                    result = await _run_fanout(prompt, q.medication_name, tracer)
+                else:
+                    result = await _run_agent(prompt, tracer)
+        log_token_savings(tally)
+
+    if "error" not in result:
+        answer_cache.set(q.question_type, q.input_type, q.medication_name, result, q.mode, q.fast_path)
+        result["cached"] = False
+    return result, queue_seconds, tally
+
+async def _run_fast_path(q, prompt, tracer=None):
+    """Fast-path answer for a menu question, or None to fall back to the agent (also on errors)."""
+    try:
+        return await answer_fast_path(llm, q.question_type, q.medication_name, prompt, tracer=tracer)
+    except Exception as e:
+        print(f"⚠️ Fast Path fehlgeschlagen, Agent übernimmt: {e}")
+        return None
+
+async def _run_fanout(prompt, medication_name, tracer=None):
+    try:
+        return await answer_with_fanout(llm, prompt, medication_name, tracer=tracer)
+    except Exception as e:
+        return {"error": str(e)}
+
+async def _run_agent(prompt, tracer=None):
     try:
-        result = agent.invoke({"input": prompt}, return_only_outputs=False)
+        config = {"callbacks": [tracer]} if tracer is not None else None
+        result = await agent.ainvoke({"input": prompt}, config=config, return_only_outputs=False)
 
         # Prepare structured response
         final = result["output"]
-        steps = []
-        for step in result.get("intermediate_steps", []):
-            thought = step[0].log
-            tool = step[1].tool
-            tool_input = step[1].tool_input
-            tool_output = step[1].tool_response
-
-            steps.append({
-                "thought": thought,
-                "tool": tool,
-                "input": tool_input,
-                "output": str(tool_output),
-                "links": [w for w in str(tool_output).split() if w.startswith("http")]
-            })
+        steps = [format_step(action, output) for action, output in result.get("intermediate_steps", [])]
 
         return {"final_answer": final, "steps": steps}
 
     except Exception as e:
-        return {"error": str(e)}
\ No newline at end of file
+        return {"error": str(e)}
+
+# === Batch ===
+MAX_BATCH_ITEMS = int(os.getenv("MAX_BATCH_ITEMS", "500"))
+BATCH_PARALLELISM = int(os.getenv("BATCH_PARALLELISM", "4"))
+
+class BatchQuery(BaseModel):
+    items: List[Query]
+    parallelism: Optional[int] = None
+
+@app.post("/query/batch")
+async def query_agent_batch(batch: BatchQuery):
+    """Answer many queries at once, streamed back as NDJSON lines in completion order.
+
+    Identical items (after normalization) run once and their result is sent
+    for every index they appear at. A failing item only fails its own line.
+    """
+    if len(batch.items) > MAX_BATCH_ITEMS:
+        return JSONResponse(status_code=413, content={"error": f"Maximal {MAX_BATCH_ITEMS} Einträge pro Batch."})
+    if query_limiter.is_full():
+        raise QueueFullError()
+
+    groups = {}
+    for index, item in enumerate(batch.items):
+        # Same grouping as the singleflight key in answer_query
+        key, _ = query_key(item.question_type, item.input_type, item.medication_name, item.mode, item.fast_path)
+        groups.setdefault((key, item.mode, item.fast_path), []).append(index)
+
+    parallelism = max(1, min(batch.parallelism or BATCH_PARALLELISM, MAX_CONCURRENT_QUERIES))
+    semaphore = asyncio.Semaphore(parallelism)
+
+    async def run(indices):
+        async with semaphore:
+            try:
+                # Batch items wait for a slot instead of being rejected by the queue limit
+                result = await answer_query(batch.items[indices[0]], enforce_queue_limit=False)
+            except Exception as e:
+                result = {"error": str(e)}
+        return indices, result
+
+    async def lines():
+        tasks = [asyncio.create_task(run(indices)) for indices in groups.values()]
+        try:
+            for finished in asyncio.as_completed(tasks):
+                indices, result = await finished
+                for index in indices:
+                    item = batch.items[index]
+                    line = {"index": index, "query": item.model_dump(), **result}
+                    yield json.dumps(line, ensure_ascii=False, default=str) + "\n"
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+# === Streaming ===
+class AgentStreamHandler(AsyncCallbackHandler):
+    """Turn agent callbacks into SSE events: one per finished step, then the final answer tokens."""
+
+    def __init__(self):
+        self.queue = asyncio.Queue()
+        self._action = None
+        self._llm_text = {}
+        self._answer_runs = set()
+
+    async def on_agent_action(self, action, **kwargs):
+        self._action = action
+
+    async def on_tool_end(self, output, **kwargs):
+        if self._action is not None:
+            await self.queue.put(("step", format_step(self._action, output, STREAM_OUTPUT_CHARS)))
+            self._action = None
+
+    async def on_tool_error(self, error, **kwargs):
+        if self._action is not None:
+            await self.queue.put(("step", format_step(self._action, f"❗ Fehler: {error}", STREAM_OUTPUT_CHARS)))
+            self._action = None
+
+    async def on_llm_new_token(self, token, *, run_id, **kwargs):
+        if run_id in self._answer_runs:
+            await self.queue.put(("token", {"token": token}))
+            return
+
+        # Only the text after "Final Answer:" belongs to the answer, everything before is a thought
+        text = self._llm_text.get(run_id, "") + token
+        self._llm_text[run_id] = text
+        if FINAL_ANSWER_MARKER in text:
+            rest = text.split(FINAL_ANSWER_MARKER, 1)[1].lstrip()
+            if rest:
+                self._answer_runs.add(run_id)
+                await self.queue.put(("token", {"token": rest}))
+
+def sse_event(name, data):
+    return f"event: {name}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+@app.get("/query/stream")
+async def query_agent_stream(question_type: str, input_type: str, medication_name: str):
+    """Server-Sent Events variant of /query: emits `step`, `token`, `final`/`error` and `done` events."""
+    q = Query(question_type=question_type, input_type=input_type, medication_name=medication_name)
+    prompt = build_prompt(q)
+
+    cached = answer_cache.get(q.question_type, q.input_type, q.medication_name, q.mode, q.fast_path)
+    if cached is None and query_limiter.is_full():
+        raise QueueFullError()
+
+    async def events():
+        if cached is not None:
+            for step in cached["steps"]:
+                yield sse_event("step", {**step, "output": step["output"][:STREAM_OUTPUT_CHARS]})
+            yield sse_event("final", {k: cached[k] for k in ("final_answer", "cached", "cache_age_seconds")})
+            yield sse_event("done", {})
+            return
+
+        handler = AgentStreamHandler()
+        tracer = TracingCallbackHandler()
+        try:
+            # One slot for the whole request, so a stream that has started never hits a full queue
+            async with query_limiter.slot():
+                with question_context(q.question_type):
+                    fast = await _run_fast_path(q, prompt, tracer)
+                if fast is not None:
+                    answer_cache.set(q.question_type, q.input_type, q.medication_name, fast, q.mode, q.fast_path)
+                    for step in fast["steps"]:
+                        yield sse_event("step", {**step, "output": step["output"][:STREAM_OUTPUT_CHARS]})
+                    metrics.observe("query_duration_seconds", tracer.elapsed(), mode="fast_path", cached="false",
+                                    help="End-to-end /query duration")
+                    yield sse_event("final", {"final_answer": fast["final_answer"], "cached": False})
+                    yield sse_event("done", {})
+                    return
+
+                # The task copies the context, so its tools see the question type after the block is left
+                with question_context(q.question_type) as tally:
+                    task = asyncio.create_task(agent.ainvoke({"input": prompt}, config={"callbacks": [handler, tracer]}))
+                task.add_done_callback(lambda _: handler.queue.put_nowait(None))
+                try:
+                    while True:
+                        event = await handler.queue.get()
+                        if event is None:
+                            break
+                        yield sse_event(*event)
+                    result = task.result()
+                finally:
+                    if not task.done():
+                        task.cancel()
+            log_token_savings(tally)
+            steps = [format_step(action, output) for action, output in result.get("intermediate_steps", [])]
+            answer_cache.set(q.question_type, q.input_type, q.medication_name,
+                             {"final_answer": result["output"], "steps": steps}, q.mode, q.fast_path)
+            metrics.observe("query_duration_seconds", tracer.elapsed(), mode="stream", cached="false",
+                            help="End-to-end /query duration")
+            yield sse_event("final", {"final_answer": result["output"], "cached": False})
+        except QueueFullError:
+            yield sse_event("error", {"error": "Zu viele gleichzeitige Anfragen, bitte später erneut versuchen."})
+        except Exception as e:
+            yield sse_event("error", {"error": str(e)})
+        yield sse_event("done", {})
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+@app.get("/faiss/stats")
+async def faiss_stats():
+    return {**faiss_store.stats(), "serving": serving_index.stats(), "bm25": bm25_index.lexical_index.stats()}
+
+@app.get("/cache/stats")
+async def cache_stats():
+    return {
+        "tavily": tavily_cache.stats(),
+        "embeddings": get_embedding_model().stats(),
+        "answers": answer_cache.stats(),
+        "coalesced": {"queries": query_flight.stats(), "tools": tool_flight.stats(),
+                      "async_tools": async_tool_flight.stats()},
+    }
+
+@app.delete("/cache/answers/{medication_name}")
+async def invalidate_answers(medication_name: str):
+    return {"medication": medication_name, "invalidated": answer_cache.invalidate(medication_name)}
+
+@app.get("/metrics")
+async def prometheus_metrics():
+    """Span histograms, cache counters and current load in the Prometheus text format."""
+    metrics.set_gauge("queries_active", query_limiter.active, help="Agent runs in progress")
+    metrics.set_gauge("queries_waiting", query_limiter.waiting, help="Queries waiting for a slot")
+    faiss = faiss_store.stats()
+    if faiss["loaded"]:
+        metrics.set_gauge("faiss_vectors", faiss["vectors"], help="Vectors in the resident FAISS index")
+        metrics.set_gauge("faiss_resident_bytes", faiss["resident_bytes"], help="Memory held by the FAISS index")
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+@app.get("/query/status")
+async def query_status():
+    return {
+        "active": query_limiter.active,
+        "waiting": query_limiter.waiting,
+        "max_concurrent": query_limiter.max_concurrent,
+        "max_queued": query_limiter.max_queued,
+    }
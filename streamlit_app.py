@@ -1,10 +1,9 @@
 import streamlit as st
 import os
-import asyncio
 from dotenv import load_dotenv
 from history_questions import HistoryQuestions
-from browser_use import BrowserConfig, Agent, Browser
-from browser_use.browser.context import BrowserContextConfig
+from browser_use import Agent
+from browser_pool import BrowserPool
 from langchain_openai import ChatOpenAI
 
 # Load environment variables
@@ -38,10 +37,18 @@ st.markdown("""
 st.markdown('<div class="main-header">💊 Compendium Bot</div>', unsafe_allow_html=True)
 st.markdown("Dieser Bot kann im Compendium nach Medikamenteninformationen suchen. Stelle eine Frage zu einem Medikament, um zu beginnen.")
 
-# Browser and history
-config = BrowserConfig(headless=True)
-browser = Browser(config=config)
-history_service = HistoryQuestions()
+# Browser pool and history
+@st.cache_resource
+def get_browser_pool():
+    # Shared by all sessions and reruns; contexts are warmed on compendium.ch in the background
+    return BrowserPool().start()
+
+@st.cache_resource
+def get_history_service():
+    return HistoryQuestions()
+
+history_service = get_history_service()
+HISTORY_PAGE_SIZE = 20
 
 # Layout
 col1, col2 = st.columns([3, 1])
@@ -51,41 +58,58 @@ with col2:
     st.markdown("<br>", unsafe_allow_html=True)
     run_button = st.button("🚀 Anfrage starten")
 
-# Save question
+# Save question (only when it is actually sent, not on every rerun)
 if question:
-    history_service.add_question(question)
     st.session_state.question = question
     st.write(f"Du hast gefragt: *{question}*")
+if run_button and question:
+    history_service.add_question(question)
 
 # Tabs
 tab1, tab2 = st.tabs(["Resultate", "Fragenverlauf (History)"])
 
 with tab2:
     st.markdown('<div class="subheader">📜 Vergangene Fragen</div>', unsafe_allow_html=True)
-    history = history_service.get_history()
+    page = st.session_state.get("history_page", 0)
+    # One extra row tells whether there is a next page
+    history = history_service.get_history(limit=HISTORY_PAGE_SIZE + 1, offset=page * HISTORY_PAGE_SIZE)
     if history:
-        for i, q in enumerate(history, start=1):
+        for i, q in enumerate(history[:HISTORY_PAGE_SIZE], start=page * HISTORY_PAGE_SIZE + 1):
             st.markdown(f"**{i}.** {q}")
+        prev_col, next_col = st.columns(2)
+        with prev_col:
+            if page > 0 and st.button("⬅️ Neuere"):
+                st.session_state.history_page = page - 1
+                st.rerun()
+        with next_col:
+            if len(history) > HISTORY_PAGE_SIZE and st.button("Ältere ➡️"):
+                st.session_state.history_page = page + 1
+                st.rerun()
+
+        st.markdown('<div class="subheader">🔁 Häufigste Fragen</div>', unsafe_allow_html=True)
+        for q, count in history_service.frequencies(limit=5):
+            st.markdown(f"- {q} ({count}×)")
     else:
         st.info("Es gibt noch keinen Frageverlauf.")
     if st.button("🗑️ Leere den Frageverlauf"):
         history_service.clear_history()
+        st.session_state.history_page = 0
         st.success("Fragenverlauf wurde geleert!")
 
-# Async agent function
-async def run_agent(task):
-    initial_actions = [{'open_tab': {'url': 'https://compendium.ch/'}}]
+# Agent run on a leased browser context (already on compendium.ch)
+def run_agent(task):
     openai_key = st.secrets["openai"]["open_ai_key"]
     llm = ChatOpenAI(model="gpt-4o", openai_api_key=openai_key)
 
-    agent = Agent(
-        task=task,
-        initial_actions=initial_actions,
-        llm=llm,
-        browser=browser
-    )
+    async def run(browser_context):
+        agent = Agent(
+            task=task,
+            llm=llm,
+            browser_context=browser_context
+        )
+        return await agent.run()
 
-    return await agent.run()
+    return get_browser_pool().run(run)
 
 # Agent run block
 if run_button:
@@ -93,10 +117,7 @@ if run_button:
         if "question" in st.session_state:
             with st.spinner("🔍 Suche läuft..."):
                 try:
-                    loop = asyncio.new_event_loop()
-                    asyncio.set_event_loop(loop)
-                    result_history = loop.run_until_complete(run_agent(st.session_state.question))
-                    loop.close()
+                    result_history = run_agent(st.session_state.question)
                 except Exception as e:
                     st.error(f"❌ Fehler beim Agentenlauf: {e}")
                     result_history = None